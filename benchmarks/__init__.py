@@ -0,0 +1 @@
+"""Headless benchmarks for AI Hub; run with ``python -m benchmarks`` after ``pip install -e .``."""
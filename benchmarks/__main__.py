@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+from pathlib import Path
+from typing import Optional, Sequence
+
+from .suites import BENCHMARKS, Metrics, Options, higher_is_better
+
+
+DEFAULT_BASELINE = Path(__file__).with_name("baselines.json")
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Headless AI Hub benchmarks against a local mock API.")
+    parser.add_argument("names", nargs="*", help=f"Benchmarks to run (default: all of {', '.join(BENCHMARKS)}).")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations; for smoke runs, not for baselines.")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline file to compare against or save to.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Relative change reported as a regression (default 0.25).")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 when any metric regressed.")
+    return parser.parse_args(argv)
+
+
+def _compare(name: str, metrics: Metrics, baseline: Metrics, tolerance: float) -> list[str]:
+    regressions = []
+    for metric, value in metrics.items():
+        reference = baseline.get(metric)
+        if not reference:
+            print(f"  {metric:<28} {value:>12.3f}")
+            continue
+        change = (value - reference) / reference
+        worse = -change if higher_is_better(metric) else change
+        flag = "REGRESSION" if worse > tolerance else ("improved" if worse < -tolerance else "")
+        print(f"  {metric:<28} {value:>12.3f}   baseline {reference:>12.3f}   {change:+7.1%}  {flag}")
+        if flag == "REGRESSION":
+            regressions.append(f"{name}.{metric}")
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = _parse_args(argv)
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmark(s): {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    stored = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else {}
+    baselines: dict[str, Metrics] = stored.get("results", {})
+    options = Options(quick=args.quick)
+    results: dict[str, Metrics] = {}
+    regressions: list[str] = []
+    for name in args.names or BENCHMARKS:
+        print(name)
+        results[name] = BENCHMARKS[name](options)
+        regressions += _compare(name, results[name], baselines.get(name, {}), args.tolerance)
+
+    if args.save_baseline:
+        merged = {**baselines, **{name: {key: round(value, 3) for key, value in metrics.items()} for name, metrics in results.items()}}
+        document = {"machine": f"{platform.system()} {platform.machine()}, Python {platform.python_version()}", "results": merged}
+        args.baseline.write_text(json.dumps(document, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"Saved baseline to {args.baseline}")
+    if regressions:
+        print(f"Regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1 if args.check else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
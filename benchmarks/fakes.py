@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator
+
+from ai_hub.config import SelectionSettings
+from ai_hub.services import selection
+
+
+@dataclass(slots=True, frozen=True)
+class KeyEvent:
+    """The two attributes of ``keyboard.KeyboardEvent`` that ``InputDispatcher`` reads."""
+
+    name: str
+    event_type: str
+
+
+def press(combo: str) -> list[KeyEvent]:
+    """Down/up events for ``"ctrl+alt+j"``: modifiers down, key down, key up, modifiers up."""
+    keys = [part.strip() for part in combo.split("+")]
+    return (
+        [KeyEvent(key, "down") for key in keys]
+        + [KeyEvent(keys[-1], "up")]
+        + [KeyEvent(key, "up") for key in reversed(keys[:-1])]
+    )
+
+
+def typed(text: str) -> list[KeyEvent]:
+    events = []
+    for char in text:
+        name = "space" if char == " " else char
+        events.extend((KeyEvent(name, "down"), KeyEvent(name, "up")))
+    return events
+
+
+class FakeDesktop:
+    """A focused text field plus a clipboard, answering the keystrokes the selection helpers send.
+
+    The foreground app updates the clipboard *copy_latency* seconds after Ctrl+C, like a real one.
+    """
+
+    def __init__(self, text: str = "", *, copy_latency: float = 0.005) -> None:
+        self.document = text
+        self.selected = text
+        self.clipboard = ""
+        self.copy_latency = copy_latency
+        self.pasted = threading.Event()
+        self._lock = threading.Lock()
+
+    # ``keyboard`` surface
+    def send(self, combo: str) -> None:
+        if combo == "ctrl+c":
+            threading.Timer(self.copy_latency, self._copy).start()
+        elif combo == "ctrl+a":
+            self.selected = self.document
+        elif combo == "ctrl+v":
+            with self._lock:
+                self.document = self.document.replace(self.selected, self.clipboard, 1) if self.selected else self.clipboard
+                self.selected = ""
+            self.pasted.set()
+
+    # ``pyperclip`` surface
+    def paste(self) -> str:
+        with self._lock:
+            return self.clipboard
+
+    def copy(self, text: str) -> None:
+        with self._lock:
+            self.clipboard = text
+
+    def select(self, text: str) -> None:
+        with self._lock:
+            self.document = text
+            self.selected = text
+        self.pasted.clear()
+
+    def _copy(self) -> None:
+        with self._lock:
+            self.clipboard = self.selected
+
+
+@contextmanager
+def installed(desktop: FakeDesktop, settings: SelectionSettings | None = None) -> Iterator[FakeDesktop]:
+    """Route the selection helpers' keyboard and clipboard calls to *desktop* for the duration."""
+    saved = (selection.keyboard, selection.pyperclip if selection.HAVE_PYPERCLIP else None, selection.HAVE_WIN32, selection.HAVE_PYPERCLIP)
+    selection.keyboard = desktop
+    selection.pyperclip = desktop
+    selection.HAVE_WIN32 = False
+    selection.HAVE_PYPERCLIP = True
+    selection.configure(settings or SelectionSettings(backend="clipboard"))
+    try:
+        yield desktop
+    finally:
+        selection.keyboard, pyperclip, selection.HAVE_WIN32, selection.HAVE_PYPERCLIP = saved
+        if pyperclip is not None:
+            selection.pyperclip = pyperclip
+        selection.configure(SelectionSettings())
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import json
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+_CHAT_PATH = "/v1/chat/completions"
+
+
+@dataclass(slots=True)
+class MockProfile:
+    """How the stand-in endpoint behaves; change fields between runs to model different servers."""
+
+    latency_ms: float = 40.0
+    tokens_per_second: float = 400.0
+    completion_tokens: int = 24
+    # Reply with the whole user message, as a rewrite prompt does, instead of completion_tokens of it.
+    echo_input: bool = False
+    error_rate: float = 0.0
+    error_status: int = 503
+    # Enforced over one-second windows, the way real servers quantize per-minute limits; None disables it.
+    requests_per_minute: Optional[int] = None
+    seed: int = 1
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    profile: MockProfile
+    rng: random.Random
+    lock: threading.Lock
+    requests: int
+    errors: int
+    rate_limited: int
+    bucket: float
+    bucket_updated: float
+
+    def get_request(self):
+        conn, addr = super().get_request()
+        # Small SSE writes must not wait on Nagle + delayed ACK, or streaming numbers measure the kernel.
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return conn, addr
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: _Server
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_HEAD(self) -> None:
+        # Keep-alive pings; answer without closing the connection, as the real API does.
+        self.send_response(405)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        self._limit_headers: dict[str, str] = {}
+        if self.path != _CHAT_PATH:
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+
+        profile = self.server.profile
+        with self.server.lock:
+            self.server.requests += 1
+            self._limit_headers, wait = self._take_request(profile)
+            failed = not wait and self.server.rng.random() < profile.error_rate
+            if wait:
+                self.server.rate_limited += 1
+            elif failed:
+                self.server.errors += 1
+        if wait:
+            self._limit_headers["retry-after-ms"] = str(round(wait * 1000))
+            self._send_json(429, {"error": {"message": "rate limit reached", "type": "requests"}})
+            return
+        time.sleep(profile.latency_ms / 1000)
+        if failed:
+            self._send_json(profile.error_status, {"error": {"message": "injected failure"}})
+            return
+
+        tokens = _reply_tokens(body, profile)
+        if body.get("stream"):
+            self._stream(tokens, profile)
+        else:
+            time.sleep(len(tokens) / profile.tokens_per_second)
+            self._send_json(
+                200,
+                {
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}}],
+                    "usage": {"prompt_tokens": _prompt_tokens(body), "completion_tokens": len(tokens)},
+                },
+            )
+
+    def _take_request(self, profile: MockProfile) -> tuple[dict[str, str], float]:
+        """Spend one request from the server's bucket; returns the rate-limit headers and, if refused, the wait."""
+        limit = profile.requests_per_minute
+        if not limit:
+            return {}, 0.0
+        server = self.server
+        rate = limit / 60
+        now = time.monotonic()
+        server.bucket = min(max(1.0, rate), server.bucket + (now - server.bucket_updated) * rate)
+        server.bucket_updated = now
+        wait = 0.0
+        if server.bucket >= 1:
+            server.bucket -= 1
+        else:
+            wait = (1 - server.bucket) / rate
+        headers = {
+            "x-ratelimit-limit-requests": str(limit),
+            "x-ratelimit-remaining-requests": str(int(server.bucket)),
+            "x-ratelimit-reset-requests": f"{round((max(1.0, rate) - server.bucket) / rate * 1000)}ms",
+        }
+        return headers, wait
+
+    def _send_limit_headers(self) -> None:
+        for name, value in self._limit_headers.items():
+            self.send_header(name, value)
+
+    def _stream(self, tokens: list[str], profile: MockProfile) -> None:
+        self.send_response(200)
+        self._send_limit_headers()
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        interval = 1 / profile.tokens_per_second
+        for token in tokens:
+            self._chunk(json.dumps({"choices": [{"index": 0, "delta": {"content": token}}]}))
+            time.sleep(interval)
+        self._chunk(json.dumps({"choices": [], "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens)}}))
+        self._chunk("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, data: str) -> None:
+        payload = f"data: {data}\n\n".encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(payload), payload))
+
+    def _send_json(self, status: int, data: dict) -> None:
+        payload = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self._send_limit_headers()
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def _prompt_tokens(body: dict) -> int:
+    return sum(len(str(message.get("content", "")).split()) for message in body.get("messages") or ())
+
+
+def _reply_tokens(body: dict, profile: MockProfile) -> list[str]:
+    """Echo the last user message (so replace workflows round-trip), padded or cut to ``completion_tokens``.
+
+    Requests for edit operations get one no-op edit anchored on the message's last words instead.
+    """
+    messages = body.get("messages") or [{}]
+    words = str(messages[-1].get("content", "")).split() or ["ok"]
+    system = next((str(message.get("content", "")) for message in messages if message.get("role") == "system"), "")
+    if '{"edits"' in system:
+        anchor = " ".join(words[-6:])
+        return [json.dumps({"edits": [{"find": anchor, "replace": anchor}]})]
+    count = len(words) if profile.echo_input else profile.completion_tokens
+    return [(" " if index else "") + words[index % len(words)] for index in range(count)]
+
+
+class MockChatServer:
+    """Local stand-in for ``/v1/chat/completions`` on an ephemeral port; use as a context manager."""
+
+    def __init__(self, profile: Optional[MockProfile] = None) -> None:
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self.profile = profile or MockProfile()
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-chat-server", daemon=True)
+
+    @property
+    def profile(self) -> MockProfile:
+        return self._server.profile
+
+    @profile.setter
+    def profile(self, profile: MockProfile) -> None:
+        self._server.profile = profile
+        self._server.rng = random.Random(profile.seed)
+        self._server.lock = threading.Lock()
+        self._server.requests = 0
+        self._server.errors = 0
+        self._server.rate_limited = 0
+        self._server.bucket = max(1.0, (profile.requests_per_minute or 0) / 60)
+        self._server.bucket_updated = time.monotonic()
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{_CHAT_PATH}"
+
+    @property
+    def requests(self) -> int:
+        return self._server.requests
+
+    @property
+    def errors(self) -> int:
+        return self._server.errors
+
+    @property
+    def rate_limited(self) -> int:
+        """Requests refused with 429 under ``requests_per_minute``."""
+        return self._server.rate_limited
+
+    def __enter__(self) -> MockChatServer:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,516 @@
+from __future__ import annotations
+
+import os
+import random
+import string
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Callable
+
+from ai_hub.config import CacheSettings, NavigatorSettings, OpenAISettings, SchedulerSettings, SpellingSettings
+from ai_hub.hotkeys.hotstrings import HotstringEngine
+from ai_hub.hotkeys.input_dispatcher import InputDispatcher
+from ai_hub.hotkeys.trigger_matcher import TriggerAutomaton
+from ai_hub.services import spelling
+from ai_hub.services.openai_client import OpenAIClient, is_error_reply
+from ai_hub.services.prompt_library import PromptLibrary
+from ai_hub.services.prompt_manager import OUTPUT_EDITS, OUTPUT_TEXT, Prompt, default_prompts
+from ai_hub.services.response_cache import ResponseCache
+from ai_hub.services.scheduler import RequestScheduler
+from ai_hub.services.selection import get_selection, replace_selection
+from ai_hub.services.tracing import tracer
+
+from .fakes import FakeDesktop, installed, press, typed
+from .mock_server import MockChatServer, MockProfile
+
+
+Metrics = dict[str, float]
+
+
+@dataclass(slots=True, frozen=True)
+class Options:
+    quick: bool = False
+
+    def scale(self, full: int, quick: int) -> int:
+        return quick if self.quick else full
+
+
+BENCHMARKS: dict[str, Callable[[Options], Metrics]] = {}
+
+
+def benchmark(name: str) -> Callable[[Callable[[Options], Metrics]], Callable[[Options], Metrics]]:
+    def register(fn: Callable[[Options], Metrics]) -> Callable[[Options], Metrics]:
+        BENCHMARKS[name] = fn
+        return fn
+
+    return register
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_s") or metric.endswith("_rate")
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _latency(prefix: str, samples: list[float]) -> Metrics:
+    return {f"{prefix}p50_ms": _percentile(samples, 50) * 1000, f"{prefix}p95_ms": _percentile(samples, 95) * 1000}
+
+
+def _client(server: MockChatServer, **overrides) -> OpenAIClient:
+    settings = OpenAISettings(api_key="benchmark", endpoint=server.endpoint, model="mock", timeout=10, **overrides)
+    return OpenAIClient(settings)
+
+
+def _large_library(rng: random.Random) -> tuple[PromptLibrary, list[str]]:
+    """The built-ins plus 10k generated prompts, and the vocabulary their names were drawn from."""
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(3000)]
+    library = PromptLibrary(default_prompts())
+    library.extend(Prompt(" ".join(rng.choices(words, k=rng.randint(2, 5))), "", "", "", False) for _ in range(10_000))
+    return library, words
+
+
+def _timed(fn: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+@benchmark("client.chat")
+def client_chat(options: Options) -> Metrics:
+    """Sequential latency and concurrent throughput of non-streaming requests over the shared pool."""
+    with MockChatServer(MockProfile(latency_ms=30, tokens_per_second=4000)) as server:
+        client = _client(server, max_retries=0)
+        try:
+            samples = [_timed(lambda: client.chat(None, "sequential request")) for _ in range(options.scale(40, 10))]
+            total = options.scale(160, 32)
+            started = time.perf_counter()
+            with ThreadPoolExecutor(8) as pool:
+                list(pool.map(lambda i: client.chat(None, f"concurrent request {i}"), range(total)))
+            elapsed = time.perf_counter() - started
+            stats = client.transport_stats
+        finally:
+            client.close()
+    return {
+        **_latency("", samples),
+        "requests_per_s": total / elapsed,
+        "connection_reuse_rate": stats.reused_connections / max(1, stats.requests),
+    }
+
+
+@benchmark("client.stream")
+def client_stream(options: Options) -> Metrics:
+    """Time to first token and delivered token rate of streamed replies."""
+    with MockChatServer(MockProfile(latency_ms=30, tokens_per_second=500, completion_tokens=40)) as server:
+        client = _client(server, max_retries=0)
+        first_token: list[float] = []
+        rates: list[float] = []
+        try:
+            for _ in range(options.scale(20, 5)):
+                started = time.perf_counter()
+                first = None
+                count = 0
+                for _delta in client.chat_stream(None, "stream this reply back to me"):
+                    count += 1
+                    if first is None:
+                        first = time.perf_counter()
+                finished = time.perf_counter()
+                first_token.append((first or finished) - started)
+                if first is not None and finished > first:
+                    rates.append((count - 1) / (finished - first))
+        finally:
+            client.close()
+    return {**_latency("first_token_", first_token), "tokens_per_s": sum(rates) / max(1, len(rates))}
+
+
+@benchmark("client.errors")
+def client_errors(options: Options) -> Metrics:
+    """Success rate and tail latency when a third of requests fail with a retryable 503."""
+    with MockChatServer(MockProfile(latency_ms=20, tokens_per_second=4000, error_rate=0.3)) as server:
+        client = _client(server, max_retries=2, retry_backoff=0.01)
+        samples: list[float] = []
+        ok = 0
+        try:
+            for _ in range(options.scale(60, 15)):
+                started = time.perf_counter()
+                reply = client.chat(None, "flaky request")
+                samples.append(time.perf_counter() - started)
+                ok += not reply.startswith("OpenAI request failed")
+        finally:
+            client.close()
+    return {**_latency("", samples), "success_rate": ok / len(samples)}
+
+
+@benchmark("client.ratelimit")
+def client_ratelimit(options: Options) -> Metrics:
+    """Throughput against a 1200 requests/minute server limit under a burst from 16 threads, and how often it says 429."""
+    limit_per_s = 20
+    with MockChatServer(MockProfile(latency_ms=10, tokens_per_second=8000, requests_per_minute=limit_per_s * 60)) as server:
+        client = _client(server, max_retries=2, retry_backoff=0.05)
+        total = options.scale(160, 40)
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(16) as pool:
+                replies = list(pool.map(lambda i: client.chat(None, f"burst request {i}"), range(total)))
+            elapsed = time.perf_counter() - started
+        finally:
+            client.close()
+        rejected = server.rate_limited
+    ok = sum(not is_error_reply(reply) for reply in replies)
+    return {
+        "success_rate": ok / total,
+        "requests_per_s": ok / elapsed,
+        "limit_utilization_rate": ok / elapsed / limit_per_s,
+        "rejections_per_request": rejected / total,
+    }
+
+
+@benchmark("client.failover")
+def client_failover(options: Options) -> Metrics:
+    """Latency and success rate with three backends: one refusing connections, one failing 30% of requests, one healthy."""
+    with MockChatServer(MockProfile(latency_ms=20, tokens_per_second=4000, error_rate=0.3)) as flaky, MockChatServer(
+        MockProfile(latency_ms=40, tokens_per_second=4000)
+    ) as healthy:
+        backends = [
+            OpenAISettings(api_key="benchmark", endpoint=endpoint, model="mock", timeout=10, name=name, max_retries=0)
+            for name, endpoint in (("flaky", flaky.endpoint), ("healthy", healthy.endpoint))
+        ]
+        down = OpenAISettings(api_key="benchmark", endpoint="http://127.0.0.1:9/v1/chat/completions", model="mock", timeout=10, name="down", max_retries=0)
+        client = OpenAIClient(down, backends=backends)
+        samples: list[float] = []
+        ok = 0
+        try:
+            for i in range(options.scale(80, 20)):
+                started = time.perf_counter()
+                reply = client.chat(None, f"routed request {i}")
+                samples.append(time.perf_counter() - started)
+                ok += not is_error_reply(reply)
+        finally:
+            client.close()
+    return {**_latency("", samples), "success_rate": ok / len(samples)}
+
+
+@benchmark("edits")
+def edits(options: Options) -> Metrics:
+    """Spelling fix of an 800-word document: full regeneration against edit operations applied locally."""
+    rng = random.Random(11)
+    vocabulary = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(2000)]
+    documents = [" ".join(rng.choices(vocabulary, k=800)) for _ in range(options.scale(10, 3))]
+    spelling = default_prompts()[0]
+    metrics: Metrics = {}
+    with MockChatServer(MockProfile(latency_ms=30, tokens_per_second=2000, echo_input=True)) as server:
+        client = _client(server, max_retries=0)
+        scheduler = RequestScheduler(SchedulerSettings())
+        try:
+            for label, output in (("full", OUTPUT_TEXT), ("edits", OUTPUT_EDITS)):
+                prompt = replace(spelling, output=output, fast_path="")
+                samples = []
+                for document in documents:
+                    done = threading.Event()
+                    started = time.perf_counter()
+                    scheduler.submit_prompt(client, prompt, document, lambda text: done.set(), standalone=True)
+                    if not done.wait(30):
+                        raise RuntimeError("edits benchmark timed out")
+                    samples.append(time.perf_counter() - started)
+                metrics.update(_latency(f"{label}_", samples))
+        finally:
+            scheduler.shutdown()
+            client.close()
+    return metrics
+
+
+# Typical hotkey selections: plain typos the speller settles, and text only the model can judge.
+_SPELLING_SAMPLES = (
+    "I recieve the report every wednesday mornign.",
+    "Please send me teh latest numbers before the meeting.",
+    "i dont think the schedule is realistic for this quater.",
+    "The commitee will adress the budget tomorow.",
+    "We definately need a seperate environment for testing.",
+    "Thanks for the quick reply, see you on Monday.",
+    "Their going to present the results next week.",
+    "You could of told me about the change earlier.",
+)
+
+
+@benchmark("spelling")
+def spelling_fast_path(options: Options) -> Metrics:
+    """Short spelling fixes through the scheduler: always asking the model against the local fast path first."""
+    settings = SpellingSettings(user_dictionary=None)
+    started = time.perf_counter()
+    index = spelling.SpellIndex(spelling.load_counts())
+    metrics: Metrics = {"load_ms": (time.perf_counter() - started) * 1000}
+    checks = [_timed(lambda: spelling.check(index, sample)) for sample in _SPELLING_SAMPLES * options.scale(50, 5)]
+    metrics.update(_latency("check_", checks))
+    prompt = default_prompts()[0]
+    samples = _SPELLING_SAMPLES * options.scale(5, 1)
+    with MockChatServer(MockProfile(latency_ms=150, tokens_per_second=200, echo_input=True)) as server:
+        client = _client(server, max_retries=0)
+        scheduler = RequestScheduler(SchedulerSettings())
+        try:
+            for label, local in (("api_", False), ("local_", True)):
+                spelling.configure(replace(settings, local=local))
+                spelling.warm_up()
+                timings = []
+                for sample in samples:
+                    done = threading.Event()
+                    begun = time.perf_counter()
+                    scheduler.submit_prompt(client, prompt, sample, lambda text: done.set(), standalone=True)
+                    if not done.wait(30):
+                        raise RuntimeError("spelling benchmark timed out")
+                    timings.append(time.perf_counter() - begun)
+                metrics.update(_latency(label, timings))
+            metrics["local_rate"] = sum(spelling.quick_fix(sample) is not None for sample in _SPELLING_SAMPLES) / len(_SPELLING_SAMPLES)
+        finally:
+            spelling.configure(settings)
+            scheduler.shutdown()
+            client.close()
+    return metrics
+
+
+@benchmark("matcher")
+def matcher(options: Options) -> Metrics:
+    """Raw automaton cost per typed character with a large trigger set."""
+    rng = random.Random(7)
+    triggers = {";" + "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 8))): i for i in range(500)}
+    automaton = TriggerAutomaton(triggers)
+    text = "".join(rng.choices(string.ascii_lowercase + " ;", k=options.scale(400_000, 50_000)))
+    state = 0
+    started = time.perf_counter_ns()
+    for char in text:
+        state = automaton.step(state, char)
+        automaton.match(state)
+    return {"ns_per_key": (time.perf_counter_ns() - started) / len(text)}
+
+
+@benchmark("prompt_search")
+def prompt_search(options: Options) -> Metrics:
+    """Incremental fuzzy filtering of a 10k-prompt library, one keystroke at a time."""
+    rng = random.Random(5)
+    library, words = _large_library(rng)
+    samples: list[float] = []
+    for _ in range(options.scale(20, 4)):
+        query = " ".join(rng.choices(words, k=2))
+        for end in range(1, len(query) + 1):
+            samples.append(_timed(lambda: library.search(query[:end])))
+        library.search("")
+    return _latency("keystroke_", samples)
+
+
+@benchmark("hook")
+def hook(options: Options) -> Metrics:
+    """Time spent inside the keyboard hook per event, with hotkeys and hotstrings registered."""
+    dispatcher = InputDispatcher()
+    engine = HotstringEngine(buffer_size=64)
+    for trigger in (";sig", ";date", ";time", ";fix", ";clar", ";short", ";long"):
+        engine.register_text(trigger, trigger.upper())
+    engine.start(dispatcher)
+    dispatcher.add_hotkey("ctrl+alt+j", lambda: None)
+    rng = random.Random(3)
+    events = typed("".join(rng.choices(string.ascii_lowercase + " ", k=options.scale(20_000, 4_000))))
+    for event in events:
+        dispatcher.handle_event(event)
+    stats = dispatcher.stats()
+    return {"mean_us": stats.mean_us, "p99_us": stats.p99_us}
+
+
+@benchmark("selection")
+def selection_helpers(options: Options) -> Metrics:
+    """Clipboard round trips of the selection helpers against an app that answers Ctrl+C in 5 ms."""
+    desktop = FakeDesktop(copy_latency=0.005)
+    with installed(desktop):
+        capture: list[float] = []
+        paste: list[float] = []
+        for i in range(options.scale(40, 10)):
+            desktop.select(f"selected text {i}")
+            capture.append(_timed(get_selection))
+            paste.append(_timed(lambda: replace_selection("replacement")))
+    return {**_latency("capture_", capture), **_latency("paste_", paste)}
+
+
+@benchmark("workflow")
+def workflow(options: Options) -> Metrics:
+    """Hotkey release to pasted result: dispatch, capture, scheduling, HTTP and paste together."""
+    prompt = default_prompts()[1]
+    desktop = FakeDesktop(copy_latency=0.005)
+    with MockChatServer(MockProfile(latency_ms=30, tokens_per_second=2000)) as server, installed(desktop):
+        client = _client(server, max_retries=0)
+        scheduler = RequestScheduler(SchedulerSettings())
+        dispatcher = InputDispatcher()
+
+        settled = threading.Event()
+
+        def deliver(output: str) -> None:
+            replace_selection(output)
+            settled.set()
+
+        def run_prompt() -> None:
+            scheduler.submit_prompt(client, prompt, get_selection().text, deliver)
+
+        dispatcher.add_hotkey("ctrl+alt+r", run_prompt)
+        dispatcher.start(install_hook=False)
+        tracer.clear()
+        samples: list[float] = []
+        try:
+            for i in range(options.scale(30, 8)):
+                desktop.select(f"benchmark paragraph number {i} with a few words")
+                started = time.perf_counter()
+                for event in press("ctrl+alt+r"):
+                    dispatcher.handle_event(event)
+                if not desktop.pasted.wait(5):
+                    raise RuntimeError("workflow benchmark timed out waiting for the paste")
+                samples.append(time.perf_counter() - started)
+                # Let the clipboard restore finish before the next capture starts.
+                settled.wait(5)
+                settled.clear()
+        finally:
+            dispatcher.stop()
+            scheduler.shutdown()
+            client.close()
+    stages = {
+        f"{row.stage}_p50_ms": row.p50_ms
+        for row in tracer.summary()
+        if row.prompt == prompt.name and row.stage in ("get_selection", "queue.wait", "http", "replace_selection")
+    }
+    return {**_latency("", samples), **stages}
+
+
+@benchmark("windows")
+def windows(options: Options) -> Metrics:
+    """Hotkey release to painted navigator, and worker result to painted popup, through the GUI dispatcher."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtCore import QEventLoop
+    from PySide6.QtWidgets import QApplication
+
+    from ai_hub.hotkeys.global_hotkeys import GlobalHotkeys, HotkeyCallbacks
+    from ai_hub.ui.dialogs.result_popup import ResultPopupPool
+    from ai_hub.ui.gui_dispatcher import GuiDispatcher
+
+    app = QApplication.instance() or QApplication([])
+    library, _ = _large_library(random.Random(5))
+    gui = GuiDispatcher()
+    popups = ResultPopupPool(gui)
+    client = OpenAIClient(OpenAISettings(api_key="benchmark", endpoint="http://127.0.0.1:9", model="mock", timeout=1))
+    scheduler = RequestScheduler(SchedulerSettings())
+    hotkeys = GlobalHotkeys(
+        client=client,
+        scheduler=scheduler,
+        prompts=library,
+        spelling_prompt=library[0],
+        gui=gui,
+        popups=popups,
+        callbacks=HotkeyCallbacks(focus_hub_tab=lambda: None),
+        prompt_hotkey="ctrl+alt+k",
+        spelling_hotkey="ctrl+alt+j",
+        goto_hotkey=None,
+    )
+    dispatcher = InputDispatcher()
+    hotkeys.start(dispatcher)
+    hotkeys.warm_up()
+    popups.warm_up()
+    dispatcher.start(install_hook=False)
+    desktop = FakeDesktop("text under the cursor")
+
+    def painted(count: int) -> None:
+        deadline = time.perf_counter() + 5
+        while sum(span.name == "window.visible" for span in tracer.spans()) < count:
+            if time.perf_counter() > deadline:
+                raise RuntimeError("windows benchmark timed out waiting for a paint")
+            app.processEvents(QEventLoop.WaitForMoreEvents)
+
+    def close_all() -> None:
+        for widget in app.topLevelWidgets():
+            if widget.isVisible():
+                widget.close()
+        app.processEvents()
+
+    def deliver_result(text: str) -> None:
+        with tracer.action("result", prompt="Result popup"):
+            popups.show_text("Result", text)
+
+    tracer.clear()
+    rounds = options.scale(40, 8)
+    try:
+        with installed(desktop):
+            for i in range(rounds):
+                for event in press("ctrl+alt+k"):
+                    dispatcher.handle_event(event)
+                painted(2 * i + 1)
+                close_all()
+                worker = threading.Thread(target=deliver_result, args=(f"result {i}\n" * 200,))
+                worker.start()
+                worker.join()
+                painted(2 * i + 2)
+                close_all()
+    finally:
+        dispatcher.stop()
+        scheduler.shutdown()
+        client.close()
+    totals = {row.prompt: row for row in tracer.summary() if row.stage == "total"}
+    navigator, popup = totals["Prompt navigator"], totals["Result popup"]
+    return {
+        "navigator_p50_ms": navigator.p50_ms,
+        "navigator_p95_ms": navigator.p95_ms,
+        "popup_p50_ms": popup.p50_ms,
+        "popup_p95_ms": popup.p95_ms,
+    }
+
+
+@benchmark("navigator")
+def navigator(options: Options) -> Metrics:
+    """Enter to pasted result in the prompt navigator, without and with speculative runs of the highlighted prompt."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtCore import QEventLoop, QTimer
+    from PySide6.QtWidgets import QApplication
+
+    from ai_hub.ui.dialogs.prompt_navigator import PromptNavigator
+    from ai_hub.ui.dialogs.result_popup import ResultPopupPool
+    from ai_hub.ui.gui_dispatcher import GuiDispatcher
+
+    app = QApplication.instance() or QApplication([])
+    think_ms = 400
+    metrics: Metrics = {}
+    # These texts have no typos, and the local speller would settle them without a request; measure the API path.
+    spelling.configure(SpellingSettings(local=False))
+    desktop = FakeDesktop()
+    with MockChatServer(MockProfile(latency_ms=150, tokens_per_second=4000)) as server, installed(desktop):
+        for mode, speculate in (("cold", False), ("speculative", True)):
+            client = OpenAIClient(
+                OpenAISettings(api_key="benchmark", endpoint=server.endpoint, model="mock", timeout=10),
+                cache=ResponseCache(CacheSettings(persistent=False)),
+            )
+            scheduler = RequestScheduler(SchedulerSettings())
+            navigator = PromptNavigator(
+                client,
+                scheduler,
+                PromptLibrary(default_prompts()),
+                ResultPopupPool(GuiDispatcher()),
+                NavigatorSettings(speculate=speculate, speculate_delay_ms=50),
+            )
+            samples: list[float] = []
+            try:
+                for i in range(options.scale(12, 3)):
+                    desktop.select(f"navigator paragraph number {i} with a few words to fix")
+                    navigator.show_near_cursor(get_selection().text)
+                    # The user reads the list for a moment before pressing Enter.
+                    loop = QEventLoop()
+                    QTimer.singleShot(think_ms, loop.quit)
+                    loop.exec()
+                    started = time.perf_counter()
+                    navigator.run_selected()
+                    if not desktop.pasted.wait(5):
+                        raise RuntimeError("navigator benchmark timed out waiting for the paste")
+                    samples.append(time.perf_counter() - started)
+                    # Let the clipboard restore finish before the next capture starts.
+                    time.sleep(0.05)
+            finally:
+                navigator.deleteLater()
+                scheduler.shutdown()
+                client.close()
+            metrics.update(_latency(f"{mode}_", samples))
+    spelling.configure(SpellingSettings())
+    app.processEvents()
+    return metrics
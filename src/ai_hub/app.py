@@ -1,15 +1,127 @@
 from __future__ import annotations
 
+import argparse
+import sys
 from pathlib import Path
+from typing import Optional, Sequence
 
-from .config import load_settings
-from .ui.main_window import run_app
+from .config import SchedulerSettings, load_settings
+from .profiling import profiler
 
 
-def main() -> None:
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="ai-hub", description="Desktop AI Hub with chat, prompts, hotkeys, and hotstrings.")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Print per-component and per-import startup times once warm-up finishes, then exit.",
+    )
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    batch = commands.add_parser(
+        "batch",
+        help="Run a prompt over files, directories or JSONL records without starting the UI.",
+        description="Run a prompt over files, directories or JSONL records and append one JSON line per result.",
+    )
+    batch.add_argument("inputs", nargs="*", help="Files, directories, .jsonl files, or - for JSONL on stdin.")
+    batch.add_argument("--prompt", help="Name of the prompt to run (see --list-prompts).")
+    batch.add_argument(
+        "--output",
+        type=Path,
+        help="JSONL file to append results to; rerunning with the same file skips documents that already succeeded.",
+    )
+    batch.add_argument("--concurrency", type=int, default=4, help="Requests in flight at once (default: %(default)s).")
+    batch.add_argument(
+        "--pattern",
+        action="append",
+        dest="patterns",
+        metavar="GLOB",
+        help="File pattern to pick up in directories; repeatable (default: *.txt and *.md).",
+    )
+    batch.add_argument("--text-field", default="text", help="JSONL field holding the text (default: %(default)s).")
+    batch.add_argument("--id-field", default="id", help="JSONL field holding the record id (default: %(default)s).")
+    batch.add_argument("--list-prompts", action="store_true", help="Print the available prompt names and exit.")
+    args = parser.parse_args(argv)
+    if args.command == "batch" and not args.list_prompts:
+        if not args.inputs or not args.prompt or args.output is None:
+            batch.error("inputs, --prompt and --output are required")
+        if args.concurrency < 1:
+            batch.error("--concurrency must be at least 1")
+    return args
+
+
+def _run_batch(args: argparse.Namespace) -> int:
+    # Only services are imported here: batch runs on servers and in CI, without Qt or the keyboard hook.
+    from .services import spelling
+    from .services.batch import BatchOptions, BatchRunner, DEFAULT_PATTERNS, completed_ids, iter_items
+    from .services.openai_client import OpenAIClient
+    from .services.prompt_library import PromptLibrary
+    from .services.response_cache import ResponseCache
+    from .services.scheduler import RequestScheduler
+
     settings = load_settings()
-    run_app(settings)
+    library = PromptLibrary.load(settings.prompts)
+    if args.list_prompts:
+        for prompt in library:
+            print(prompt.name)
+        return 0
+    position = library.index_of(args.prompt)
+    if position is None:
+        print(f"ai-hub batch: no prompt named {args.prompt!r}; see --list-prompts", file=sys.stderr)
+        return 2
+    prompt = library[position]
+    if prompt.fast_path:
+        # Every document would otherwise reach the API while the index builds in the background.
+        spelling.configure(settings.spelling)
+        spelling.warm_up()
+
+    options = BatchOptions(
+        concurrency=args.concurrency,
+        read_ahead=2 * args.concurrency,
+        patterns=tuple(args.patterns) if args.patterns else DEFAULT_PATTERNS,
+        text_field=args.text_field,
+        id_field=args.id_field,
+    )
+    cache = ResponseCache(settings.cache) if settings.cache.enabled else None
+    client = OpenAIClient(settings.openai, cache=cache, backends=settings.backends, routing=settings.routing)
+    if not client.configured:
+        print("ai-hub batch: no API key configured", file=sys.stderr)
+        return 2
+    scheduler = RequestScheduler(
+        SchedulerSettings(workers=args.concurrency, per_group_limit=args.concurrency), chunking=settings.chunking
+    )
+    runner = BatchRunner(client, scheduler, prompt, options, progress=sys.stderr)
+    done = completed_ids(args.output)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    interrupted = False
+    try:
+        with args.output.open("a", encoding="utf-8") as output:
+            report = runner.run(iter_items(args.inputs, options), output, done)
+    except KeyboardInterrupt:
+        interrupted = True
+        report = runner.report
+    finally:
+        scheduler.shutdown()
+        client.close()
+    print(report.format(), file=sys.stderr)
+    if interrupted:
+        print(f"Interrupted; rerun with --output {args.output} to resume.", file=sys.stderr)
+        return 130
+    return 1 if report.failed else 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = _parse_args(argv)
+    if args.command == "batch":
+        return _run_batch(args)
+    if args.profile_startup:
+        profiler.enable()
+    with profiler.span("load settings"):
+        settings = load_settings()
+    with profiler.span("import UI"):
+        from .ui.main_window import run_app
+    run_app(settings, profile_startup=args.profile_startup)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
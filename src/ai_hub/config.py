@@ -2,7 +2,8 @@ from __future__ import annotations
 
 import configparser
 import os
-from dataclasses import dataclass
+import re
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from typing import Optional
 
@@ -16,6 +17,35 @@ class OpenAISettings:
     endpoint: str
     model: str
     timeout: int
+    pool_connections: int = 4
+    pool_maxsize: int = 8
+    max_retries: int = 2
+    retry_backoff: float = 0.3
+    max_backoff: float = 20.0
+    # Limits to assume before the first response reports the real ones via x-ratelimit-* headers.
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+    # Longest a request may queue behind the rate limiter (including 429 retries) before it fails.
+    rate_limit_wait: float = 60.0
+    # A dead host should fail over in seconds, not after the full read timeout.
+    connect_timeout: float = 10.0
+    # Seconds between keep-alive pings while a connection is being kept warm; 0 disables them.
+    keepalive_interval: float = 20.0
+    name: str = "openai"
+    # "bearer" (OpenAI and compatible servers), "api-key" (Azure OpenAI) or "none" (local servers).
+    auth: str = "bearer"
+
+
+@dataclass(slots=True)
+class RoutingSettings:
+    hedge: bool = False
+    # Hedge after this long without response headers; by default after the chosen backend's observed p95.
+    hedge_after_ms: Optional[float] = None
+    hedge_min_ms: float = 250.0
+    failure_threshold: int = 3
+    open_seconds: float = 15.0
+    max_open_seconds: float = 300.0
+    ewma_alpha: float = 0.2
 
 
 @dataclass(slots=True)
@@ -24,12 +54,95 @@ class HotkeySettings:
     prompt_navigator: str = "ctrl+shift+k"
     goto_hub: Optional[str] = "ctrl+alt+shift+k"
     toggle_hotstrings: str = "ctrl+alt+h"
+    cancel_requests: Optional[str] = "ctrl+alt+shift+c"
 
 
 @dataclass(slots=True)
 class HotstringSettings:
     enabled_by_default: bool = True
     buffer_size: int = 64
+    typing_threshold: int = 64
+
+
+@dataclass(slots=True)
+class SelectionSettings:
+    capture_deadline_ms: int = 400
+    # A copy slower than the deadline counts as "nothing selected" and triggers the Ctrl+A fallback, so learned
+    # deadlines never go below the fixed 80 ms wait they replaced.
+    min_deadline_ms: int = 80
+    poll_initial_ms: float = 2.0
+    poll_max_ms: float = 25.0
+    # "clipboard", or "primary" to try the X11/Wayland PRIMARY selection first.
+    backend: str = "clipboard"
+
+
+@dataclass(slots=True)
+class ChunkingSettings:
+    enabled: bool = True
+    chunk_tokens: int = 1500
+
+
+@dataclass(slots=True)
+class ConversationSettings:
+    context_tokens: int = 6000
+    reply_reserve_tokens: int = 1000
+    # Older turns are folded into the rolling summary once unsummarized history exceeds this many tokens.
+    summarize_after_tokens: int = 3000
+    keep_recent_turns: int = 4
+    summary_tokens: int = 400
+
+
+@dataclass(slots=True)
+class NavigatorSettings:
+    # Run the highlighted deterministic prompt before it is chosen; costs tokens for prompts never run.
+    speculate: bool = False
+    speculate_delay_ms: int = 300
+    # How long the connection stays warm after the navigator opens.
+    keep_warm_seconds: float = 120.0
+
+
+@dataclass(slots=True)
+class SchedulerSettings:
+    workers: int = 4
+    per_group_limit: int = 2
+
+
+@dataclass(slots=True)
+class CacheSettings:
+    enabled: bool = True
+    memory_entries: int = 256
+    persistent: bool = True
+    path: Path = field(default_factory=lambda: Path.home() / ".ai_hub" / "response_cache.sqlite3")
+    max_disk_bytes: int = 32 * 1024 * 1024
+    ttl_seconds: float = 7 * 24 * 3600
+
+
+@dataclass(slots=True)
+class PromptLibrarySettings:
+    paths: tuple[Path, ...] = field(default_factory=lambda: (Path.home() / ".ai_hub" / "prompts",))
+    include_defaults: bool = True
+
+
+@dataclass(slots=True)
+class SpellingSettings:
+    # Fix plain typos with the bundled word list and skip the API when that is all the text needs.
+    local: bool = True
+    # Longer texts always go to the model; the local checks cannot judge their grammar.
+    max_chars: int = 4000
+    # One word per line; these are never "corrected" and can be suggested.
+    user_dictionary: Optional[Path] = field(default_factory=lambda: Path.home() / ".ai_hub" / "dictionary.txt")
+
+
+@dataclass(slots=True)
+class ApiSettings:
+    # Off by default: anything on this machine that can reach the server can spend the API key.
+    enabled: bool = False
+    host: str = "127.0.0.1"
+    port: int = 8765
+    # Listen on this Unix socket instead of host/port (not on Windows).
+    socket: Optional[Path] = None
+    # When set, requests must carry it as a bearer token.
+    token: Optional[str] = None
 
 
 @dataclass(slots=True)
@@ -37,11 +150,24 @@ class AppSettings:
     openai: OpenAISettings
     hotkeys: HotkeySettings
     hotstrings: HotstringSettings
+    cache: CacheSettings = field(default_factory=CacheSettings)
+    scheduler: SchedulerSettings = field(default_factory=SchedulerSettings)
+    selection: SelectionSettings = field(default_factory=SelectionSettings)
+    chunking: ChunkingSettings = field(default_factory=ChunkingSettings)
+    prompts: PromptLibrarySettings = field(default_factory=PromptLibrarySettings)
+    conversation: ConversationSettings = field(default_factory=ConversationSettings)
+    navigator: NavigatorSettings = field(default_factory=NavigatorSettings)
+    # Further backends from [backend <name>] sections, tried after or alongside ``openai``.
+    backends: tuple[OpenAISettings, ...] = ()
+    routing: RoutingSettings = field(default_factory=RoutingSettings)
+    api: ApiSettings = field(default_factory=ApiSettings)
+    spelling: SpellingSettings = field(default_factory=SpellingSettings)
 
 
 _DEFAULT_ENDPOINT = "https://api.openai.com/v1/chat/completions"
 _DEFAULT_MODEL = "gpt-4o-mini"
 _DEFAULT_TIMEOUT = 120
+_DEFAULT_OPENAI = OpenAISettings(api_key=None, endpoint=_DEFAULT_ENDPOINT, model=_DEFAULT_MODEL, timeout=_DEFAULT_TIMEOUT)
 
 
 def _load_settings_file(path: Path) -> configparser.ConfigParser:
@@ -57,6 +183,31 @@ def _read_ini_value(parser: configparser.ConfigParser, section: str, option: str
     return fallback
 
 
+def _read_bool(parser: configparser.ConfigParser, section: str, option: str, fallback: bool) -> bool:
+    value = _read_ini_value(parser, section, option, None)
+    return value.strip().lower() in ("1", "true", "yes", "on") if isinstance(value, str) else fallback
+
+
+def _read_backend(parser: configparser.ConfigParser, section: str, primary: OpenAISettings) -> OpenAISettings:
+    """A ``[backend <name>]`` section; anything it leaves out is taken from ``[openai]``, except the key."""
+    values = parser[section]
+    key_env = values.get("api_key_env")
+    timeout = values.get("timeout")
+    requests_per_minute = values.get("requests_per_minute")
+    tokens_per_minute = values.get("tokens_per_minute")
+    return replace(
+        primary,
+        name=section[len("backend") :].strip(),
+        api_key=(os.environ.get(key_env) if key_env else None) or values.get("api_key"),
+        endpoint=values.get("endpoint", primary.endpoint),
+        model=values.get("model", primary.model),
+        auth=values.get("auth", "bearer").strip().lower(),
+        timeout=int(timeout) if timeout else primary.timeout,
+        requests_per_minute=int(requests_per_minute) if requests_per_minute else None,
+        tokens_per_minute=int(tokens_per_minute) if tokens_per_minute else None,
+    )
+
+
 def load_settings(settings_path: Path | None = None) -> AppSettings:
     path = settings_path or DEFAULT_SETTINGS_PATH
     parser = _load_settings_file(path)
@@ -65,33 +216,160 @@ def load_settings(settings_path: Path | None = None) -> AppSettings:
     endpoint = os.environ.get("OPENAI_ENDPOINT") or _read_ini_value(parser, "openai", "endpoint", _DEFAULT_ENDPOINT) or _DEFAULT_ENDPOINT
     model = os.environ.get("OPENAI_MODEL") or _read_ini_value(parser, "openai", "model", _DEFAULT_MODEL) or _DEFAULT_MODEL
     timeout_str = os.environ.get("AI_HUB_TIMEOUT") or _read_ini_value(parser, "openai", "timeout", str(_DEFAULT_TIMEOUT)) or str(_DEFAULT_TIMEOUT)
+    pool_connections = _read_ini_value(parser, "openai", "pool_connections", None)
+    pool_maxsize = os.environ.get("AI_HUB_POOL_SIZE") or _read_ini_value(parser, "openai", "pool_maxsize", None)
+    max_retries = os.environ.get("AI_HUB_MAX_RETRIES") or _read_ini_value(parser, "openai", "max_retries", None)
+    retry_backoff = _read_ini_value(parser, "openai", "retry_backoff", None)
+    max_backoff = _read_ini_value(parser, "openai", "max_backoff", None)
+    requests_per_minute = _read_ini_value(parser, "openai", "requests_per_minute", None)
+    tokens_per_minute = _read_ini_value(parser, "openai", "tokens_per_minute", None)
+    rate_limit_wait = _read_ini_value(parser, "openai", "rate_limit_wait", None)
+    connect_timeout = _read_ini_value(parser, "openai", "connect_timeout", None)
+    keepalive_interval = _read_ini_value(parser, "openai", "keepalive_interval", None)
 
     hotkey_spelling = _read_ini_value(parser, "hotkeys", "spelling", HotkeySettings().spelling) or HotkeySettings().spelling
     hotkey_prompt = _read_ini_value(parser, "hotkeys", "prompt_navigator", HotkeySettings().prompt_navigator) or HotkeySettings().prompt_navigator
     hotkey_goto = _read_ini_value(parser, "hotkeys", "goto_hub", HotkeySettings().goto_hub)
     hotkey_toggle = _read_ini_value(parser, "hotkeys", "toggle_hotstrings", HotkeySettings().toggle_hotstrings) or HotkeySettings().toggle_hotstrings
+    hotkey_cancel = _read_ini_value(parser, "hotkeys", "cancel_requests", HotkeySettings().cancel_requests)
 
     hotstrings_enabled = _read_ini_value(parser, "hotstrings", "enabled", None)
     hotstrings_buffer = _read_ini_value(parser, "hotstrings", "buffer_size", str(HotstringSettings().buffer_size)) or str(HotstringSettings().buffer_size)
+    hotstrings_typing = _read_ini_value(parser, "hotstrings", "typing_threshold", str(HotstringSettings().typing_threshold)) or str(HotstringSettings().typing_threshold)
 
     openai_settings = OpenAISettings(
         api_key=api_key,
         endpoint=endpoint,
         model=model,
         timeout=int(timeout_str),
+        pool_connections=int(pool_connections) if pool_connections else _DEFAULT_OPENAI.pool_connections,
+        pool_maxsize=int(pool_maxsize) if pool_maxsize else _DEFAULT_OPENAI.pool_maxsize,
+        max_retries=int(max_retries) if max_retries else _DEFAULT_OPENAI.max_retries,
+        retry_backoff=float(retry_backoff) if retry_backoff else _DEFAULT_OPENAI.retry_backoff,
+        max_backoff=float(max_backoff) if max_backoff else _DEFAULT_OPENAI.max_backoff,
+        requests_per_minute=int(requests_per_minute) if requests_per_minute else None,
+        tokens_per_minute=int(tokens_per_minute) if tokens_per_minute else None,
+        rate_limit_wait=float(rate_limit_wait) if rate_limit_wait else _DEFAULT_OPENAI.rate_limit_wait,
+        connect_timeout=float(connect_timeout) if connect_timeout else _DEFAULT_OPENAI.connect_timeout,
+        keepalive_interval=float(keepalive_interval) if keepalive_interval else _DEFAULT_OPENAI.keepalive_interval,
+        name=_read_ini_value(parser, "openai", "name", None) or _DEFAULT_OPENAI.name,
+        auth=(_read_ini_value(parser, "openai", "auth", None) or _DEFAULT_OPENAI.auth).strip().lower(),
     )
+    backends = tuple(_read_backend(parser, section, openai_settings) for section in parser.sections() if section.startswith("backend "))
     hotkey_settings = HotkeySettings(
         spelling=hotkey_spelling,
         prompt_navigator=hotkey_prompt,
         goto_hub=hotkey_goto,
         toggle_hotstrings=hotkey_toggle,
+        cancel_requests=hotkey_cancel,
     )
     hotstring_settings = HotstringSettings(
         enabled_by_default=(hotstrings_enabled.lower() == "true") if isinstance(hotstrings_enabled, str) else HotstringSettings().enabled_by_default,
         buffer_size=int(hotstrings_buffer),
+        typing_threshold=int(hotstrings_typing),
+    )
+    cache_defaults = CacheSettings()
+    cache_path = _read_ini_value(parser, "cache", "path", None)
+    cache_memory = _read_ini_value(parser, "cache", "memory_entries", None)
+    cache_disk_mb = _read_ini_value(parser, "cache", "max_disk_mb", None)
+    cache_ttl_hours = _read_ini_value(parser, "cache", "ttl_hours", None)
+    cache_settings = CacheSettings(
+        enabled=_read_bool(parser, "cache", "enabled", cache_defaults.enabled),
+        memory_entries=int(cache_memory) if cache_memory else cache_defaults.memory_entries,
+        persistent=_read_bool(parser, "cache", "persistent", cache_defaults.persistent),
+        path=Path(cache_path).expanduser() if cache_path else cache_defaults.path,
+        max_disk_bytes=int(float(cache_disk_mb) * 1024 * 1024) if cache_disk_mb else cache_defaults.max_disk_bytes,
+        ttl_seconds=float(cache_ttl_hours) * 3600 if cache_ttl_hours else cache_defaults.ttl_seconds,
+    )
+    scheduler_workers = _read_ini_value(parser, "scheduler", "workers", None)
+    scheduler_limit = _read_ini_value(parser, "scheduler", "per_prompt_limit", None)
+    scheduler_settings = SchedulerSettings(
+        workers=int(scheduler_workers) if scheduler_workers else SchedulerSettings().workers,
+        per_group_limit=int(scheduler_limit) if scheduler_limit else SchedulerSettings().per_group_limit,
+    )
+    selection_deadline = _read_ini_value(parser, "selection", "capture_deadline_ms", None)
+    selection_min_deadline = _read_ini_value(parser, "selection", "min_deadline_ms", None)
+    selection_poll_initial = _read_ini_value(parser, "selection", "poll_initial_ms", None)
+    selection_poll_max = _read_ini_value(parser, "selection", "poll_max_ms", None)
+    selection_settings = SelectionSettings(
+        capture_deadline_ms=int(selection_deadline) if selection_deadline else SelectionSettings().capture_deadline_ms,
+        min_deadline_ms=int(selection_min_deadline) if selection_min_deadline else SelectionSettings().min_deadline_ms,
+        poll_initial_ms=float(selection_poll_initial) if selection_poll_initial else SelectionSettings().poll_initial_ms,
+        poll_max_ms=float(selection_poll_max) if selection_poll_max else SelectionSettings().poll_max_ms,
+        backend=(_read_ini_value(parser, "selection", "backend", None) or SelectionSettings().backend).strip().lower(),
+    )
+    chunk_tokens = _read_ini_value(parser, "chunking", "chunk_tokens", None)
+    chunking_settings = ChunkingSettings(
+        enabled=_read_bool(parser, "chunking", "enabled", ChunkingSettings().enabled),
+        chunk_tokens=int(chunk_tokens) if chunk_tokens else ChunkingSettings().chunk_tokens,
+    )
+    prompt_paths = os.environ.get("AI_HUB_PROMPTS") or _read_ini_value(parser, "prompts", "paths", None)
+    prompt_settings = PromptLibrarySettings(
+        paths=tuple(Path(item.strip()).expanduser() for item in re.split(r"[\n" + re.escape(os.pathsep) + "]", prompt_paths) if item.strip())
+        if prompt_paths
+        else PromptLibrarySettings().paths,
+        include_defaults=_read_bool(parser, "prompts", "include_defaults", PromptLibrarySettings().include_defaults),
+    )
+    conversation_defaults = ConversationSettings()
+    conversation_values = {
+        name: _read_ini_value(parser, "conversation", name, None)
+        for name in ("context_tokens", "reply_reserve_tokens", "summarize_after_tokens", "keep_recent_turns", "summary_tokens")
+    }
+    conversation_settings = ConversationSettings(
+        **{name: int(value) if value else getattr(conversation_defaults, name) for name, value in conversation_values.items()}
+    )
+    navigator_defaults = NavigatorSettings()
+    speculate_delay = _read_ini_value(parser, "navigator", "speculate_delay_ms", None)
+    keep_warm = _read_ini_value(parser, "navigator", "keep_warm_seconds", None)
+    navigator_settings = NavigatorSettings(
+        speculate=_read_bool(parser, "navigator", "speculate", navigator_defaults.speculate),
+        speculate_delay_ms=int(speculate_delay) if speculate_delay else navigator_defaults.speculate_delay_ms,
+        keep_warm_seconds=float(keep_warm) if keep_warm else navigator_defaults.keep_warm_seconds,
+    )
+    routing_defaults = RoutingSettings()
+    hedge_after_ms = _read_ini_value(parser, "routing", "hedge_after_ms", None)
+    routing_values = {
+        name: _read_ini_value(parser, "routing", name, None)
+        for name in ("hedge_min_ms", "open_seconds", "max_open_seconds", "ewma_alpha")
+    }
+    failure_threshold = _read_ini_value(parser, "routing", "failure_threshold", None)
+    routing_settings = RoutingSettings(
+        hedge=_read_bool(parser, "routing", "hedge", routing_defaults.hedge),
+        hedge_after_ms=float(hedge_after_ms) if hedge_after_ms else None,
+        failure_threshold=int(failure_threshold) if failure_threshold else routing_defaults.failure_threshold,
+        **{name: float(value) if value else getattr(routing_defaults, name) for name, value in routing_values.items()},
+    )
+    api_defaults = ApiSettings()
+    api_port = _read_ini_value(parser, "api", "port", None)
+    api_socket = _read_ini_value(parser, "api", "socket", None)
+    api_settings = ApiSettings(
+        enabled=_read_bool(parser, "api", "enabled", api_defaults.enabled),
+        host=_read_ini_value(parser, "api", "host", None) or api_defaults.host,
+        port=int(api_port) if api_port else api_defaults.port,
+        socket=Path(api_socket).expanduser() if api_socket else None,
+        token=os.environ.get("AI_HUB_API_TOKEN") or _read_ini_value(parser, "api", "token", None),
+    )
+    spelling_defaults = SpellingSettings()
+    spelling_max_chars = _read_ini_value(parser, "spelling", "max_chars", None)
+    user_dictionary = _read_ini_value(parser, "spelling", "user_dictionary", None)
+    spelling_settings = SpellingSettings(
+        local=_read_bool(parser, "spelling", "local", spelling_defaults.local),
+        max_chars=int(spelling_max_chars) if spelling_max_chars else spelling_defaults.max_chars,
+        user_dictionary=Path(user_dictionary).expanduser() if user_dictionary else spelling_defaults.user_dictionary,
     )
     return AppSettings(
         openai=openai_settings,
         hotkeys=hotkey_settings,
         hotstrings=hotstring_settings,
+        cache=cache_settings,
+        scheduler=scheduler_settings,
+        selection=selection_settings,
+        chunking=chunking_settings,
+        prompts=prompt_settings,
+        conversation=conversation_settings,
+        navigator=navigator_settings,
+        backends=backends,
+        routing=routing_settings,
+        api=api_settings,
+        spelling=spelling_settings,
     )
@@ -1,16 +1,19 @@
 from __future__ import annotations
 
-import threading
 from dataclasses import dataclass
 from typing import Callable
 
-import keyboard
-
-from ..services.openai_client import OpenAIClient
+from ..config import NavigatorSettings
+from ..services.openai_client import OpenAIClient, is_error_reply
+from ..services.prompt_library import PromptLibrary
 from ..services.prompt_manager import Prompt
+from ..services.scheduler import RequestScheduler
 from ..services.selection import get_selection, replace_selection
+from ..services.tracing import tracer
+from .input_dispatcher import InputDispatcher
 from ..ui.dialogs.prompt_navigator import PromptNavigator
-from ..ui.dialogs.result_popup import ResultPopup
+from ..ui.dialogs.result_popup import ResultPopupPool
+from ..ui.gui_dispatcher import GuiDispatcher
 
 
 @dataclass(slots=True)
@@ -22,42 +25,71 @@ class GlobalHotkeys:
     def __init__(
         self,
         client: OpenAIClient,
-        prompts: list[Prompt],
+        scheduler: RequestScheduler,
+        prompts: PromptLibrary,
         spelling_prompt: Prompt,
+        gui: GuiDispatcher,
+        popups: ResultPopupPool,
         callbacks: HotkeyCallbacks,
         prompt_hotkey: str,
         spelling_hotkey: str,
         goto_hotkey: str | None,
+        cancel_hotkey: str | None = None,
+        navigator: NavigatorSettings | None = None,
     ) -> None:
         self._client = client
+        self._scheduler = scheduler
         self._prompts = prompts
         self._spelling_prompt = spelling_prompt
+        self._gui = gui
+        self._popups = popups
         self._callbacks = callbacks
         self._prompt_hotkey = prompt_hotkey
         self._spelling_hotkey = spelling_hotkey
         self._goto_hotkey = goto_hotkey
-        self._navigator = PromptNavigator(client, prompts)
+        self._cancel_hotkey = cancel_hotkey
+        self._navigator_settings = navigator or NavigatorSettings()
+        self._navigator: PromptNavigator | None = None
 
-    def start(self) -> None:
-        keyboard.add_hotkey(self._spelling_hotkey, self._run_spelling, suppress=False, trigger_on_release=True)
-        keyboard.add_hotkey(self._prompt_hotkey, self._show_prompt_navigator, suppress=False, trigger_on_release=True)
+    def start(self, dispatcher: InputDispatcher) -> None:
+        dispatcher.add_hotkey(self._spelling_hotkey, self._run_spelling)
+        dispatcher.add_hotkey(self._prompt_hotkey, self._show_prompt_navigator)
         if self._goto_hotkey:
-            keyboard.add_hotkey(self._goto_hotkey, self._callbacks.focus_hub_tab, suppress=False, trigger_on_release=True)
+            dispatcher.add_hotkey(self._goto_hotkey, self._gui.wrap(self._callbacks.focus_hub_tab))
+        if self._cancel_hotkey:
+            dispatcher.add_hotkey(self._cancel_hotkey, self._scheduler.cancel_all)
+
+    def warm_up(self) -> None:
+        """Build the prompt navigator ahead of its first use; call on the Qt thread."""
+        if self._navigator is None:
+            self._navigator = PromptNavigator(self._client, self._scheduler, self._prompts, self._popups, self._navigator_settings)
 
     def _show_prompt_navigator(self) -> None:
-        self._navigator.show_near_cursor()
+        # Runs on the input worker; the window itself may only be touched on the Qt thread.
+        tracer.annotate(prompt="Prompt navigator")
+        # Copy while the user's application still has focus, and connect while they pick a prompt. No Ctrl+A
+        # here: the user may yet press Esc; the navigator selects everything only once a prompt runs.
+        selection = get_selection(select_all=False).text
+        self._client.keep_warm(self._navigator_settings.keep_warm_seconds)
+        self._gui.post(self._show_prompt_navigator_now, selection)
+
+    def _show_prompt_navigator_now(self, selection: str) -> None:
+        self.warm_up()
+        self._navigator.show_near_cursor(selection)
 
     def _run_spelling(self) -> None:
         selection = get_selection().text
         if not selection.strip():
             return
 
-        def run() -> None:
-            output = self._client.chat(self._spelling_prompt.system or None, self._spelling_prompt.build_message(selection), self._spelling_prompt.temperature)
-            if output.strip():
+        def deliver(output: str) -> None:
+            if is_error_reply(output):
+                self._popups.show_text(self._spelling_prompt.name, output)
+            elif output.strip() and output != selection:
+                # Nothing to fix needs no paste, and no clipboard round trip.
                 replace_selection(output)
 
-        threading.Thread(target=run, daemon=True).start()
+        self._scheduler.submit_prompt(self._client, self._spelling_prompt, selection, deliver)
 
     def run_prompt_by_index(self, index: int) -> None:
         if index < 0 or index >= len(self._prompts):
@@ -67,13 +99,13 @@ class GlobalHotkeys:
         if not selection.strip():
             return
 
-        def run() -> None:
-            output = self._client.chat(prompt.system or None, prompt.build_message(selection), prompt.temperature)
+        def deliver(output: str) -> None:
             if not output.strip():
                 return
-            if prompt.replace:
+            if prompt.replace and not is_error_reply(output):
                 replace_selection(output)
             else:
-                ResultPopup.show_text(prompt.name, output)
+                # An error is shown, never pasted over the user's text.
+                self._popups.show_text(prompt.name, output)
 
-        threading.Thread(target=run, daemon=True).start()
+        self._scheduler.submit_prompt(self._client, prompt, selection, deliver)
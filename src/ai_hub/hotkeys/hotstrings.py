@@ -1,18 +1,24 @@
 from __future__ import annotations
 
-import threading
-import time
+import logging
 from dataclasses import dataclass
-from typing import Callable
+from functools import partial
+from typing import Callable, Optional, Sequence
 
-import keyboard
-
-from ..services.openai_client import OpenAIClient
+from ..services.openai_client import OpenAIClient, is_error_reply
 from ..services.prompt_manager import Prompt
+from ..services.scheduler import RequestScheduler
 from ..services.selection import get_selection, replace_selection
+from ..services.tracing import tracer
+from .injector import KeystrokeInjector
+from .input_dispatcher import InputDispatcher
+from .trigger_matcher import StateRing, TriggerAutomaton
+
 
+_log = logging.getLogger(__name__)
 
 HotstringCallback = Callable[[], None]
+TextReplacer = Callable[[], str] | str
 
 
 @dataclass(slots=True)
@@ -22,14 +28,21 @@ class HotstringDefinition:
 
 
 class HotstringEngine:
-    """Simple keystroke buffer for text expanders and AI actions."""
+    """Keystroke matcher for text expanders and AI actions.
 
-    def __init__(self, *, buffer_size: int, enabled: bool = True) -> None:
+    Triggers are compiled into an Aho-Corasick automaton whenever the trigger set changes, and the
+    hook only advances one automaton state per key, keeping recent states in a fixed ring for backspace.
+    Expansion itself runs on the dispatcher's worker thread, never inside the hook.
+    """
+
+    def __init__(self, *, buffer_size: int, enabled: bool = True, injector: KeystrokeInjector | None = None) -> None:
         self._buffer_size = buffer_size
         self._enabled = enabled
-        self._buffer: list[str] = []
-        self._text_hotstrings: dict[str, Callable[[], None]] = {}
-        self._ai_hotstrings: dict[str, Callable[[], None]] = {}
+        self._injector = injector or KeystrokeInjector()
+        self._history = StateRing(buffer_size)
+        self._text_hotstrings: dict[str, TextReplacer] = {}
+        self._ai_hotstrings: dict[str, HotstringCallback] = {}
+        self._automaton: TriggerAutomaton[Callable[[str], None]] = TriggerAutomaton({})
 
     @property
     def enabled(self) -> bool:
@@ -38,53 +51,70 @@ class HotstringEngine:
     def set_enabled(self, value: bool) -> None:
         self._enabled = value
 
-    def register_text(self, trigger: str, replacer: Callable[[], str] | str) -> None:
-        def action() -> None:
-            text = replacer() if callable(replacer) else replacer
-            replace_selection(text)
+    @property
+    def injector(self) -> KeystrokeInjector:
+        return self._injector
 
-        self._text_hotstrings[trigger] = action
+    def register_text(self, trigger: str, replacer: TextReplacer) -> None:
+        self._text_hotstrings[trigger] = replacer
+        self._rebuild()
 
     def register_ai(self, trigger: str, callback: HotstringCallback) -> None:
         self._ai_hotstrings[trigger] = callback
-
-    def start(self) -> None:
-        keyboard.hook(self._on_key_event)
-
-    def _on_key_event(self, event) -> None:  # pragma: no cover - relies on OS events
-        if not self._enabled or event.event_type != "down":
-            return
-
-        key = event.name
-        if len(key) == 1:
-            self._buffer.append(key)
-        elif key == "space":
-            self._buffer.append(" ")
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        # Text expansions win over AI actions on identical triggers, as before.
+        actions: dict[str, Callable[[str], None]] = {
+            trigger: partial(self._run_ai, callback) for trigger, callback in self._ai_hotstrings.items()
+        }
+        actions.update({trigger: partial(self._run_text, replacer) for trigger, replacer in self._text_hotstrings.items()})
+        self._automaton = TriggerAutomaton(actions)
+        self._history.clear()
+
+    def start(self, dispatcher: InputDispatcher) -> None:
+        dispatcher.add_key_listener(self._on_key)
+
+    def _on_key(self, key: str) -> Optional[HotstringCallback]:
+        if not self._enabled:
+            return None
+        if self._injector.injecting:
+            # Our own expansion coming back through the hook; start matching afresh once it has passed.
+            self._history.clear()
+            return None
+        if key == "space":
+            key = " "
         elif key == "backspace":
-            if self._buffer:
-                self._buffer.pop()
-            return
-        else:
-            return
+            self._history.pop()
+            return None
+        elif len(key) != 1:
+            return None
+
+        automaton = self._automaton
+        state = automaton.step(self._history.current, key)
+        self._history.push(state)
+        match = automaton.match(state)
+        if match is None:
+            return None
 
-        if len(self._buffer) > self._buffer_size:
-            self._buffer = self._buffer[-self._buffer_size:]
+        self._history.clear()
+        trigger, action = match
+        return partial(action, trigger)
 
-        buffer_text = "".join(self._buffer)
+    def _run_text(self, replacer: TextReplacer, trigger: str) -> None:  # pragma: no cover - sends OS events
+        tracer.annotate(prompt=trigger)
+        text = replacer() if callable(replacer) else replacer
+        self._injector.expand(len(trigger), text)
 
-        for trigger, action in {**self._ai_hotstrings, **self._text_hotstrings}.items():
-            if buffer_text.endswith(trigger):
-                for _ in range(len(trigger)):
-                    keyboard.send("backspace")
-                    time.sleep(0.005)
-                action()
-                self._buffer.clear()
-                break
+    def _run_ai(self, callback: HotstringCallback, trigger: str) -> None:  # pragma: no cover - sends OS events
+        self._injector.delete(len(trigger))
+        callback()
 
 
 class AIHotstrings:
-    def __init__(self, client: OpenAIClient, prompts: list[Prompt]):
+    def __init__(self, client: OpenAIClient, scheduler: RequestScheduler, prompts: Sequence[Prompt]):
         self._client = client
+        self._scheduler = scheduler
         self._prompts = prompts
 
     def make_handler(self, index: int) -> Callable[[], None]:
@@ -96,11 +126,12 @@ class AIHotstrings:
             if not selection.strip():
                 return
 
-            def run() -> None:
-                output = self._client.chat(prompt.system or None, prompt.build_message(selection), prompt.temperature)
-                if output.strip():
+            def deliver(output: str) -> None:
+                if is_error_reply(output):
+                    _log.warning("Hotstring prompt %r failed: %s", prompt.name, output)
+                elif output.strip():
                     replace_selection(output)
 
-            threading.Thread(target=run, daemon=True).start()
+            self._scheduler.submit_prompt(self._client, prompt, selection, deliver)
 
         return handler
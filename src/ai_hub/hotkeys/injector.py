@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import keyboard
+
+from ..services.selection import replace_selection
+from ..services.tracing import tracer
+
+
+TYPE = "type"
+PASTE = "paste"
+# Injected keys reach the shared hook asynchronously, shortly after keyboard.write() returns.
+_ECHO_GRACE_S = 0.05
+
+
+@dataclass(slots=True, frozen=True)
+class InjectionStats:
+    typed: int
+    pasted: int
+    mean_type_ms: float
+    mean_paste_ms: float
+    last_ms: float
+
+
+class KeystrokeInjector:
+    """Inserts hotstring expansions, typing short payloads and pasting long ones.
+
+    Typing avoids the clipboard save/restore round trip entirely; pasting is only worth its fixed cost
+    once a payload is long enough that per-key injection would be slower, or spans several lines.
+    """
+
+    def __init__(self, typing_threshold: int = 64) -> None:
+        self._typing_threshold = typing_threshold
+        self._lock = threading.Lock()
+        self._counts = {TYPE: 0, PASTE: 0}
+        self._totals = {TYPE: 0.0, PASTE: 0.0}
+        self._last_ms = 0.0
+        self._depth = 0
+        self._quiet_at = 0.0
+
+    @property
+    def injecting(self) -> bool:
+        """True while keys are being sent, and briefly after, until their echo through the hook has passed.
+
+        Key listeners should ignore keys meanwhile: an expansion containing a trigger would otherwise fire again.
+        """
+        return self._depth > 0 or time.monotonic() < self._quiet_at
+
+    @contextmanager
+    def _sending(self):
+        with self._lock:
+            self._depth += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._depth -= 1
+                self._quiet_at = time.monotonic() + _ECHO_GRACE_S
+
+    def strategy_for(self, text: str) -> str:
+        if len(text) <= self._typing_threshold and "\n" not in text:
+            return TYPE
+        return PASTE
+
+    def delete(self, count: int) -> None:  # pragma: no cover - sends OS events
+        """Erase *count* characters before the caret in one burst, without per-key sleeps."""
+        with self._sending():
+            for _ in range(count):
+                keyboard.send("backspace")
+
+    def expand(self, erase: int, text: str) -> None:  # pragma: no cover - sends OS events
+        started = time.perf_counter()
+        strategy = self.strategy_for(text)
+        with tracer.span("inject", strategy=strategy, chars=len(text)), self._sending():
+            self.delete(erase)
+            if strategy == TYPE:
+                keyboard.write(text, delay=0)
+            else:
+                replace_selection(text)
+        self._record(strategy, (time.perf_counter() - started) * 1000)
+
+    def stats(self) -> InjectionStats:
+        with self._lock:
+            typed, pasted = self._counts[TYPE], self._counts[PASTE]
+            return InjectionStats(
+                typed=typed,
+                pasted=pasted,
+                mean_type_ms=self._totals[TYPE] / typed if typed else 0.0,
+                mean_paste_ms=self._totals[PASTE] / pasted if pasted else 0.0,
+                last_ms=self._last_ms,
+            )
+
+    def _record(self, strategy: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self._counts[strategy] += 1
+            self._totals[strategy] += elapsed_ms
+            self._last_ms = elapsed_ms
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import keyboard
+
+from ..services.tracing import tracer
+
+
+_log = logging.getLogger(__name__)
+
+Work = Callable[[], None]
+KeyListener = Callable[[str], Optional[Work]]
+# Work item, trace kind, and perf_counter_ns at receipt (for the dispatch-wait span).
+_Item = tuple[Work, str, int]
+
+_MODIFIERS = {
+    "ctrl": "ctrl",
+    "left ctrl": "ctrl",
+    "right ctrl": "ctrl",
+    "shift": "shift",
+    "left shift": "shift",
+    "right shift": "shift",
+    "alt": "alt",
+    "left alt": "alt",
+    "right alt": "alt",
+    "alt gr": "alt",
+    "windows": "windows",
+    "left windows": "windows",
+    "right windows": "windows",
+}
+# Keys typed while one of these is held are shortcuts (including our own injected ctrl+c/ctrl+v), not text.
+_SHORTCUT_MODIFIERS = frozenset({"ctrl", "alt", "windows"})
+_LATENCY_SAMPLES = 1024
+
+
+@dataclass(slots=True, frozen=True)
+class HookLatencyStats:
+    events: int
+    mean_us: float
+    p50_us: float
+    p99_us: float
+    max_us: float
+
+
+def parse_combo(combo: str) -> tuple[frozenset[str], str]:
+    """Split ``"ctrl+shift+j"`` into its normalised modifier set and main key."""
+    parts = [part.strip().lower() for part in combo.split("+") if part.strip()]
+    if not parts:
+        raise ValueError(f"Empty hotkey: {combo!r}")
+    *mods, key = parts
+    return frozenset(_MODIFIERS.get(mod, mod) for mod in mods), key
+
+
+class InputDispatcher:
+    """Owns the single low-level keyboard hook shared by hotkeys and hotstrings.
+
+    The hook callback only tracks modifiers, looks up combos, and asks key listeners to classify the
+    key; anything slow is returned as a work item and handed to a worker thread through a SimpleQueue.
+    """
+
+    def __init__(self) -> None:
+        self._hotkeys: dict[str, list[tuple[frozenset[str], Work]]] = {}
+        self._listeners: list[KeyListener] = []
+        self._modifiers: set[str] = set()
+        self._armed: Optional[tuple[str, frozenset[str], Work]] = None
+        self._work: queue.SimpleQueue[Optional[_Item]] = queue.SimpleQueue()
+        self._worker: Optional[threading.Thread] = None
+        self._hook = None
+        self._samples = [0] * _LATENCY_SAMPLES
+        self._events = 0
+        self._total_ns = 0
+        self._max_ns = 0
+
+    def add_hotkey(self, combo: str, callback: Work) -> None:
+        """Run *callback* on the worker thread when *combo* is released (like ``trigger_on_release``)."""
+        modifiers, key = parse_combo(combo)
+        self._hotkeys.setdefault(key, []).append((modifiers, callback))
+
+    def add_key_listener(self, listener: KeyListener) -> None:
+        """*listener* sees every plain typed key on the hook thread and must return quickly."""
+        self._listeners.append(listener)
+
+    def submit(self, work: Work, kind: str = "input") -> None:
+        self._work.put((work, kind, time.perf_counter_ns()))
+
+    def start(self, *, install_hook: bool = True) -> None:
+        """Start the worker; without *install_hook*, events are fed through ``handle_event`` (benchmarks)."""
+        if self._worker is not None:
+            return
+        self._worker = threading.Thread(target=self._drain, name="ai-hub-input", daemon=True)
+        self._worker.start()
+        if install_hook:
+            self._hook = keyboard.hook(self.handle_event)
+
+    def stop(self) -> None:
+        if self._hook is not None:
+            keyboard.unhook(self._hook)
+            self._hook = None
+        worker, self._worker = self._worker, None
+        if worker is not None:
+            self._work.put(None)
+            # The worker drops its last work item (and whatever UI objects that closes over) on exit; make
+            # sure that happens before callers tear those objects down.
+            worker.join(timeout=1)
+
+    def stats(self) -> HookLatencyStats:
+        count = min(self._events, _LATENCY_SAMPLES)
+        if not count:
+            return HookLatencyStats(0, 0.0, 0.0, 0.0, 0.0)
+        samples = sorted(self._samples[:count])
+        return HookLatencyStats(
+            events=self._events,
+            mean_us=self._total_ns / self._events / 1000,
+            p50_us=samples[count // 2] / 1000,
+            p99_us=samples[min(count - 1, int(count * 0.99))] / 1000,
+            max_us=self._max_ns / 1000,
+        )
+
+    def handle_event(self, event) -> None:
+        """Hook callback; anything with ``name`` and ``event_type`` like ``keyboard.KeyboardEvent`` works."""
+        started = time.perf_counter_ns()
+        try:
+            self._classify(event)
+        finally:
+            elapsed = time.perf_counter_ns() - started
+            self._samples[self._events % _LATENCY_SAMPLES] = elapsed
+            self._events += 1
+            self._total_ns += elapsed
+            if elapsed > self._max_ns:
+                self._max_ns = elapsed
+
+    def _classify(self, event) -> None:
+        name = (event.name or "").lower()
+        if not name:
+            return
+        modifier = _MODIFIERS.get(name)
+        if event.event_type == "up":
+            armed = self._armed
+            if armed is not None and (name == armed[0] or modifier in armed[1]):
+                self._armed = None
+                self._work.put((armed[2], "hotkey", time.perf_counter_ns()))
+            if modifier:
+                self._modifiers.discard(modifier)
+            return
+
+        if modifier:
+            self._modifiers.add(modifier)
+            return
+
+        for modifiers, callback in self._hotkeys.get(name, ()):
+            if modifiers == self._modifiers:
+                self._armed = (name, modifiers, callback)
+                return
+        if self._modifiers & _SHORTCUT_MODIFIERS:
+            return
+
+        key = event.name if len(event.name) == 1 else name
+        for listener in self._listeners:
+            work = listener(key)
+            if work is not None:
+                self._work.put((work, "hotstring", time.perf_counter_ns()))
+
+    def _drain(self) -> None:
+        while True:
+            item = self._work.get()
+            if item is None:
+                return
+            work, kind, received_ns = item
+            try:
+                with tracer.action(kind, received_ns=received_ns):
+                    work()
+            except Exception:  # pragma: no cover - keep the worker alive
+                _log.exception("Input action failed")
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Generic, Mapping, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+
+class TriggerAutomaton(Generic[T]):
+    """Aho-Corasick automaton over hotstring triggers.
+
+    Built once per trigger-set change; ``step`` is amortized O(1) per character and allocates nothing.
+    """
+
+    def __init__(self, triggers: Mapping[str, T]) -> None:
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[Optional[tuple[str, T]]] = [None]
+        for trigger, value in triggers.items():
+            if trigger:
+                self._insert(trigger, value)
+        self._link()
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def step(self, state: int, char: str) -> int:
+        goto = self._goto
+        fail = self._fail
+        while state and char not in goto[state]:
+            state = fail[state]
+        return goto[state].get(char, 0)
+
+    def match(self, state: int) -> Optional[tuple[str, T]]:
+        """Longest trigger ending at *state*, if any."""
+        return self._output[state]
+
+    def _insert(self, trigger: str, value: T) -> None:
+        state = 0
+        for char in trigger:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+                self._goto[state][char] = nxt
+            state = nxt
+        self._output[state] = (trigger, value)
+
+    def _link(self) -> None:
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, child in self._goto[state].items():
+                pending.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                # Nodes are visited breadth-first, so the suffix node's output is already final.
+                if self._output[child] is None:
+                    self._output[child] = self._output[self._fail[child]]
+
+
+class StateRing:
+    """Fixed-size ring of automaton states so backspace can rewind without re-scanning text."""
+
+    def __init__(self, size: int) -> None:
+        self._states = [0] * max(1, size)
+        self._head = 0
+        self._count = 0
+
+    @property
+    def current(self) -> int:
+        return self._states[self._head] if self._count else 0
+
+    def push(self, state: int) -> None:
+        self._head = (self._head + 1) % len(self._states)
+        self._states[self._head] = state
+        if self._count < len(self._states):
+            self._count += 1
+
+    def pop(self) -> None:
+        if self._count:
+            self._count -= 1
+            self._head = (self._head - 1) % len(self._states)
+
+    def clear(self) -> None:
+        self._count = 0
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import builtins
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, TextIO
+
+
+@dataclass(slots=True)
+class _Span:
+    name: str
+    start: float
+    duration: float
+
+
+class StartupProfiler:
+    """Records import and construction times for ``ai-hub --profile-startup``.
+
+    Disabled by default, in which case every method is a near no-op.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._origin = time.perf_counter()
+        self._spans: list[_Span] = []
+        self._imports: dict[str, float] = {}
+        self._import_depth = 0
+        self._original_import = builtins.__import__
+        self._main_thread = threading.get_ident()
+
+    def enable(self) -> None:
+        self.enabled = True
+        self._origin = time.perf_counter()
+        self._main_thread = threading.get_ident()
+        builtins.__import__ = self._timed_import
+
+    def disable(self) -> None:
+        self.enabled = False
+        builtins.__import__ = self._original_import
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._spans.append(_Span(name, start - self._origin, time.perf_counter() - start))
+
+    def mark(self, name: str) -> None:
+        """Record a zero-length milestone, e.g. the first paint."""
+        if self.enabled:
+            self._spans.append(_Span(name, time.perf_counter() - self._origin, 0.0))
+
+    def report(self, stream: TextIO = sys.stderr, top: int = 15) -> None:
+        print("Startup profile (ms from launch, duration ms)", file=stream)
+        for span in sorted(self._spans, key=lambda span: span.start):
+            print(f"  {span.start * 1000:8.1f}  {span.duration * 1000:8.1f}  {span.name}", file=stream)
+        if self._imports:
+            print(f"Slowest top-level imports (inclusive ms, top {top})", file=stream)
+            ranked = sorted(self._imports.items(), key=lambda item: item[1], reverse=True)[:top]
+            for name, duration in ranked:
+                print(f"  {duration * 1000:8.1f}  {name}", file=stream)
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # Only first-time absolute imports on the startup thread are attributed; everything else passes through.
+        if level or name in sys.modules or threading.get_ident() != self._main_thread:
+            return self._original_import(name, globals, locals, fromlist, level)
+        self._import_depth += 1
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._import_depth -= 1
+            if self._import_depth == 0:
+                root = name.partition(".")[0]
+                self._imports[root] = self._imports.get(root, 0.0) + time.perf_counter() - start
+
+
+profiler = StartupProfiler()
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Iterable, Iterator, Optional, Sequence, TextIO
+
+from .openai_client import OpenAIClient, is_error_reply
+from .prompt_manager import Prompt
+from .scheduler import RequestHandle, RequestScheduler
+from .tracing import tracer
+
+
+DEFAULT_PATTERNS = ("*.txt", "*.md")
+_JSONL_SUFFIXES = {".jsonl", ".ndjson"}
+_REPORT_STAGES = ("ratelimit.wait", "queue.wait", "http", "first_token")
+
+
+@dataclass(slots=True, frozen=True)
+class BatchItem:
+    id: str
+    text: str
+
+
+@dataclass(slots=True)
+class BatchOptions:
+    concurrency: int = 4
+    # Documents read ahead of the workers; bounds memory however large the input is.
+    read_ahead: int = 8
+    patterns: tuple[str, ...] = DEFAULT_PATTERNS
+    text_field: str = "text"
+    id_field: str = "id"
+    progress_seconds: float = 10.0
+
+
+@dataclass(slots=True)
+class BatchReport:
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+    elapsed_s: float = 0.0
+    latencies_ms: list[float] = field(default_factory=list)
+    stages: list[tuple[str, float, float]] = field(default_factory=list)
+
+    @property
+    def processed(self) -> int:
+        return self.succeeded + self.failed
+
+    def percentile(self, pct: float) -> float:
+        ordered = sorted(self.latencies_ms)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+    def format(self) -> str:
+        rate = self.processed / self.elapsed_s if self.elapsed_s else 0.0
+        lines = [
+            f"{self.processed} documents in {self.elapsed_s:.1f} s ({rate:.2f}/s): "
+            f"{self.succeeded} ok, {self.failed} failed, {self.skipped} already done",
+            f"latency p50 {self.percentile(50):.0f} ms, p95 {self.percentile(95):.0f} ms, p99 {self.percentile(99):.0f} ms",
+        ]
+        lines.extend(f"  {stage:<15} p50 {p50:8.1f} ms   p95 {p95:8.1f} ms" for stage, p50, p95 in self.stages)
+        return "\n".join(lines)
+
+
+def iter_items(inputs: Sequence[str], options: BatchOptions, stdin: Optional[TextIO] = None) -> Iterator[BatchItem]:
+    """Documents from files, directories (searched recursively for ``options.patterns``) and JSONL files.
+
+    ``-`` reads JSONL records from stdin. Inputs are read lazily, one document at a time.
+    """
+    for raw in inputs:
+        if raw == "-":
+            yield from _iter_jsonl(stdin or sys.stdin, "stdin", options)
+            continue
+        path = Path(raw).expanduser()
+        if path.is_dir():
+            found = sorted({match for pattern in options.patterns for match in path.rglob(pattern) if match.is_file()})
+            for match in found:
+                yield BatchItem(str(match), match.read_text(encoding="utf-8", errors="replace"))
+        elif path.suffix.lower() in _JSONL_SUFFIXES:
+            with path.open(encoding="utf-8") as handle:
+                yield from _iter_jsonl(handle, str(path), options)
+        else:
+            yield BatchItem(str(path), path.read_text(encoding="utf-8", errors="replace"))
+
+
+def _iter_jsonl(handle: Iterable[str], source: str, options: BatchOptions) -> Iterator[BatchItem]:
+    for number, line in enumerate(handle, 1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        text = record.get(options.text_field) if isinstance(record, dict) else None
+        if not isinstance(text, str):
+            raise ValueError(f"{source}:{number}: no string field {options.text_field!r}")
+        item_id = record.get(options.id_field)
+        yield BatchItem(str(item_id) if item_id is not None else f"{source}:{number}", text)
+
+
+def completed_ids(path: Path) -> set[str]:
+    """Ids already answered successfully in an earlier run's output; failed ones are tried again."""
+    done: set[str] = set()
+    if not path.exists():
+        return done
+    with path.open(encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line of an interrupted run may be cut short.
+                continue
+            if isinstance(record, dict) and record.get("ok"):
+                done.add(str(record.get("id")))
+    return done
+
+
+@dataclass(slots=True, eq=False)
+class _Pending:
+    item: BatchItem
+    submitted: float
+    handle: Optional[RequestHandle] = None
+
+
+class BatchRunner:
+    """Streams documents through one prompt with bounded concurrency, appending a JSONL record per result.
+
+    The output file is the checkpoint: every line is flushed as its result arrives, and a rerun with the
+    same output skips documents that already succeeded. Documents cancelled through the scheduler are
+    recorded as failed, so they are retried too.
+    """
+
+    def __init__(
+        self,
+        client: OpenAIClient,
+        scheduler: RequestScheduler,
+        prompt: Prompt,
+        options: BatchOptions,
+        progress: Optional[TextIO] = None,
+    ) -> None:
+        self._client = client
+        self._scheduler = scheduler
+        self._prompt = prompt
+        self._options = options
+        self._progress = progress
+        self._cond = threading.Condition()
+        self._pending: set[_Pending] = set()
+        self._output: Optional[IO[str]] = None
+        self._write_error: Optional[OSError] = None
+        self._report = BatchReport()
+        self._started = self._last_progress = 0.0
+
+    @property
+    def report(self) -> BatchReport:
+        """Counts so far; complete once ``run`` returns."""
+        return self._report
+
+    def run(self, items: Iterable[BatchItem], output: IO[str], done: frozenset[str] | set[str] = frozenset()) -> BatchReport:
+        """Process *items*, skipping ids in *done*; raises the ``OSError`` if *output* stops accepting writes."""
+        report = self._report
+        limit = max(1, self._options.concurrency + self._options.read_ahead)
+        self._output = output
+        self._started = self._last_progress = time.perf_counter()
+        try:
+            for item in items:
+                if item.id in done:
+                    report.skipped += 1
+                    continue
+                self._wait_below(limit)
+                self._submit(item)
+            self._wait_below(1)
+        except BaseException:
+            self.cancel()
+            raise
+        finally:
+            report.elapsed_s = time.perf_counter() - self._started
+            report.stages = [
+                (row.stage, row.p50_ms, row.p95_ms)
+                for row in tracer.summary()
+                if row.prompt == self._prompt.name and row.stage in _REPORT_STAGES
+            ]
+        return report
+
+    def cancel(self) -> None:
+        """Cancel the documents still in flight; queued ones never reach the API."""
+        with self._cond:
+            handles = [entry.handle for entry in self._pending if entry.handle is not None]
+        for handle in handles:
+            handle.cancel()
+
+    def _submit(self, item: BatchItem) -> None:
+        entry = _Pending(item, time.perf_counter())
+        with self._cond:
+            self._pending.add(entry)
+
+        def finish(text: str) -> None:
+            self._settle(entry, text, not is_error_reply(text))
+
+        entry.handle = self._scheduler.submit_prompt(self._client, self._prompt, item.text, finish, standalone=True)
+
+    def _settle(self, entry: _Pending, text: str, ok: bool) -> None:
+        latency_ms = (time.perf_counter() - entry.submitted) * 1000
+        record = {
+            "id": entry.item.id,
+            "prompt": self._prompt.name,
+            "ok": ok,
+            "output": text if ok else None,
+            "error": None if ok else text,
+            "latency_ms": round(latency_ms, 1),
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._cond:
+            if entry not in self._pending:
+                # Cancelled and already recorded by the sweep.
+                return
+            self._pending.discard(entry)
+            if ok:
+                self._report.succeeded += 1
+            else:
+                self._report.failed += 1
+            self._report.latencies_ms.append(latency_ms)
+            self._cond.notify()
+            if self._write_error is None:
+                try:
+                    self._output.write(line)
+                    self._output.flush()
+                except OSError as exc:
+                    # Runs on a scheduler worker; the submitting thread raises it.
+                    self._write_error = exc
+
+    def _wait_below(self, limit: int) -> None:
+        """Block until fewer than *limit* documents are in flight, printing progress meanwhile."""
+        with self._cond:
+            while len(self._pending) >= limit and self._write_error is None:
+                self._cond.wait(timeout=1.0)
+                # Cancelled jobs never call back; account for them here.
+                for entry in [entry for entry in self._pending if entry.handle is not None and entry.handle.cancelled]:
+                    if entry.handle.done():
+                        self._settle(entry, "Request cancelled.", False)
+                now = time.perf_counter()
+                if self._progress and now - self._last_progress >= self._options.progress_seconds:
+                    self._last_progress = now
+                    self._print_progress(now - self._started)
+            if self._write_error is not None:
+                raise self._write_error
+
+    def _print_progress(self, elapsed: float) -> None:
+        report = self._report
+        rate = report.processed / elapsed if elapsed else 0.0
+        line = f"{report.processed} done ({report.failed} failed, {report.skipped} skipped), {rate:.2f}/s, {len(self._pending)} in flight"
+        print(line, file=self._progress, flush=True)
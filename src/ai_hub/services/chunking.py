@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import re
+import threading
+from dataclasses import dataclass
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Optional
+
+from ..config import ChunkingSettings
+from .prompt_manager import COMBINE_REDUCE, Prompt
+
+if TYPE_CHECKING:
+    from .openai_client import OpenAIClient
+    from .scheduler import Priority, RequestHandle, RequestScheduler
+
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_PARAGRAPH_RE = re.compile(r"(\n\s*\n)")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])(\s+)")
+_WORD_RE = re.compile(r"(\s+)")
+_EDGES_RE = re.compile(r"^(\s*)(.*?)(\s*)$", re.DOTALL)
+_REDUCE_SEPARATOR = "\n\n---\n\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough BPE-style count: one token per ~4 word characters, one per punctuation mark."""
+    return sum((len(match.group()) + 3) // 4 for match in _TOKEN_RE.finditer(text))
+
+
+@dataclass(slots=True, frozen=True)
+class Chunk:
+    leading: str
+    core: str
+    trailing: str
+
+    @classmethod
+    def from_text(cls, text: str) -> Chunk:
+        leading, core, trailing = _EDGES_RE.match(text).groups()
+        return cls(leading, core, trailing)
+
+
+def _split_keep(pattern: re.Pattern[str], text: str) -> list[str]:
+    """Split on *pattern*, attaching each separator to the piece before it so the pieces re-join exactly."""
+    parts = pattern.split(text)
+    pieces = ["".join(parts[i:i + 2]) for i in range(0, len(parts), 2)]
+    return [piece for piece in pieces if piece]
+
+
+def _units(text: str, max_tokens: int) -> list[str]:
+    units: list[str] = []
+    for paragraph in _split_keep(_PARAGRAPH_RE, text):
+        if estimate_tokens(paragraph) <= max_tokens:
+            units.append(paragraph)
+            continue
+        for sentence in _split_keep(_SENTENCE_RE, paragraph):
+            if estimate_tokens(sentence) <= max_tokens:
+                units.append(sentence)
+            else:
+                units.extend(_split_keep(_WORD_RE, sentence))
+    return units
+
+
+def split_chunks(text: str, max_tokens: int) -> list[Chunk]:
+    """Pack paragraphs (or sentences, for oversized paragraphs) into chunks of at most *max_tokens*.
+
+    Concatenating ``leading + core + trailing`` of every chunk reproduces *text* exactly.
+    """
+    chunks: list[Chunk] = []
+    current: list[str] = []
+    current_tokens = 0
+    for unit in _units(text, max_tokens):
+        tokens = estimate_tokens(unit)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(Chunk.from_text("".join(current)))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += tokens
+    if current:
+        chunks.append(Chunk.from_text("".join(current)))
+    return chunks
+
+
+def stitch(chunks: list[Chunk], outputs: list[str]) -> str:
+    return "".join(chunk.leading + output.strip() + chunk.trailing for chunk, output in zip(chunks, outputs))
+
+
+def reduce_message(prompt: Prompt, partials: list[str]) -> str:
+    instruction = prompt.prefix.strip().rstrip(":")
+    return (
+        f'The following are partial results of the instruction "{instruction}" applied to consecutive sections '
+        "of one document. Merge them into a single result in the same format, removing duplicates:\n\n"
+        + _REDUCE_SEPARATOR.join(part.strip() for part in partials)
+    )
+
+
+def _run(client: OpenAIClient, prompt: Prompt, message: str) -> str:
+    return client.chat(prompt.system or None, message, prompt.temperature)
+
+
+class ChunkedPrompt:
+    """Runs *prompt* over a large input as concurrent chunk jobs, then stitches or map-reduces the outputs.
+
+    Orchestration is callback-driven so no scheduler worker ever blocks waiting on another job.
+    """
+
+    def __init__(
+        self,
+        scheduler: RequestScheduler,
+        client: OpenAIClient,
+        prompt: Prompt,
+        text: str,
+        on_result: Callable[[str], None],
+        settings: ChunkingSettings,
+        *,
+        priority: Priority,
+        target: Optional[str],
+    ) -> None:
+        from .scheduler import RequestHandle
+
+        self._scheduler = scheduler
+        self._client = client
+        self._prompt = prompt
+        self._text = text
+        self._on_result = on_result
+        self._settings = settings
+        self._priority = priority
+        self._target = target
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._handle = RequestHandle()
+        self._chunks: list[Chunk] = []
+
+    def start(self) -> RequestHandle:
+        from .edits import run_prompt
+
+        self._chunks = split_chunks(self._text, self._settings.chunk_tokens)
+        if self._target is not None:
+            self._generation = self._scheduler.claim_target(self._target)
+        self._map([partial(run_prompt, self._client, self._prompt, chunk.core) for chunk in self._chunks], self._on_mapped)
+        return self._handle
+
+    def _map(self, jobs: list[Callable[[], str]], on_done: Callable[[list[str]], None]) -> None:
+        from .openai_client import is_error_reply
+
+        outputs: list[Optional[str]] = [None] * len(jobs)
+        remaining = [len(jobs)]
+
+        def collect(index: int, output: str) -> None:
+            with self._lock:
+                outputs[index] = output
+                remaining[0] -= 1
+                finished = remaining[0] == 0
+            if finished and self._handle.cancelled:
+                self._handle._set_done()
+            elif finished:
+                failed = next((output for output in outputs if output and is_error_reply(output)), None)
+                if failed is not None:
+                    # One failed chunk spoils the whole result; stitching it in would paste the error mid-text.
+                    self._deliver(failed)
+                else:
+                    on_done([output or "" for output in outputs])
+
+        for index, job in enumerate(jobs):
+            child = self._scheduler.submit(
+                job,
+                partial(collect, index),
+                priority=self._priority,
+            )
+            self._handle.add_child(child)
+            child.add_done_callback(self._child_done)
+
+    def _child_done(self, child: RequestHandle) -> None:
+        # A cancelled chunk never reports back, and the result cannot be completed without it.
+        if child.cancelled:
+            self._handle.cancel()
+            self._handle._set_done()
+
+    def _on_mapped(self, outputs: list[str]) -> None:
+        if self._prompt.replace:
+            self._deliver(stitch(self._chunks, outputs))
+        elif self._prompt.combine == COMBINE_REDUCE:
+            self._reduce(outputs)
+        else:
+            self._deliver("\n\n".join(output.strip() for output in outputs))
+
+    def _reduce(self, partials: list[str]) -> None:
+        groups: list[list[str]] = []
+        budget = self._settings.chunk_tokens
+        tokens = 0
+        for partial_output in partials:
+            size = estimate_tokens(partial_output)
+            if groups and tokens + size <= budget:
+                groups[-1].append(partial_output)
+                tokens += size
+            else:
+                groups.append([partial_output])
+                tokens = size
+        if len(groups) == len(partials) > 1:
+            # Every partial is already over budget on its own; merging further rounds would not converge.
+            groups = [partials]
+        jobs = [partial(_run, self._client, self._prompt, reduce_message(self._prompt, group)) for group in groups]
+        if len(groups) == 1:
+            self._map(jobs, lambda outputs: self._deliver(outputs[0]))
+        else:
+            # Too much to merge in one call; merge groups concurrently and go round again.
+            self._map(jobs, self._reduce)
+
+    def _deliver(self, text: str) -> None:
+        if not self._handle.cancelled and (self._target is None or self._scheduler.is_current(self._target, self._generation)):
+            self._on_result(text)
+        self._handle._set_done()
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable
+
+from ..config import SelectionSettings
+
+
+_EWMA_ALPHA = 0.3
+# Learned deadlines allow this many times the typical latency (plus slack) before giving up.
+_DEADLINE_FACTOR = 4.0
+_DEADLINE_SLACK = 0.02
+# The fixed wait the learned deadlines replaced; a shorter one turns a slow copy into a Ctrl+A of the whole document.
+_DEADLINE_FLOOR = 0.08
+
+
+class ClipboardTiming:
+    """Polls for clipboard changes with backoff and learns how quickly each application responds.
+
+    Applications are told apart by foreground window class, which only Windows provides; elsewhere every
+    application shares the ``"default"`` entry, so the deadline follows the overall typical latency.
+    """
+
+    def __init__(self, settings: SelectionSettings) -> None:
+        self._settings = settings
+        self._lock = threading.Lock()
+        self._latency: dict[str, float] = {}
+
+    def wait_for(self, changed: Callable[[], bool], app: str) -> bool:
+        """Return True as soon as *changed* does, or False once the per-app deadline passes."""
+        started = time.perf_counter()
+        deadline = started + self.deadline_for(app)
+        delay = self._settings.poll_initial_ms / 1000
+        max_delay = self._settings.poll_max_ms / 1000
+        while True:
+            if changed():
+                self._record(app, time.perf_counter() - started)
+                return True
+            now = time.perf_counter()
+            if now >= deadline:
+                return False
+            time.sleep(min(delay, deadline - now))
+            delay = min(delay * 2, max_delay)
+
+    def deadline_for(self, app: str) -> float:
+        max_deadline = self._settings.capture_deadline_ms / 1000
+        with self._lock:
+            learned = self._latency.get(app)
+        if learned is None:
+            return max_deadline
+        floor = max(_DEADLINE_FLOOR, self._settings.min_deadline_ms / 1000)
+        return min(max_deadline, max(floor, learned * _DEADLINE_FACTOR + _DEADLINE_SLACK))
+
+    def learned_ms(self) -> dict[str, float]:
+        with self._lock:
+            return {app: latency * 1000 for app, latency in self._latency.items()}
+
+    def _record(self, app: str, elapsed: float) -> None:
+        with self._lock:
+            previous = self._latency.get(app)
+            self._latency[app] = elapsed if previous is None else previous + _EWMA_ALPHA * (elapsed - previous)
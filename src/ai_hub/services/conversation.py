@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from functools import partial
+from typing import Optional
+
+from ..config import ConversationSettings
+from .chunking import estimate_tokens
+from .openai_client import Message, OpenAIClient
+from .scheduler import Priority, RequestHandle, RequestScheduler
+
+
+# Role markers and separators the API adds around every message.
+_MESSAGE_OVERHEAD = 4
+_SUMMARY_HEADING = "Summary of the earlier conversation:"
+_SUMMARIZER_SYSTEM = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Reply ONLY with the updated summary."
+)
+
+
+def message_tokens(message: Message) -> int:
+    return estimate_tokens(message.content) + _MESSAGE_OVERHEAD
+
+
+@dataclass(slots=True, frozen=True)
+class _Turn:
+    user: Message
+    assistant: Message
+    tokens: int
+
+
+@dataclass(slots=True, frozen=True)
+class ConversationStats:
+    turns: int
+    summarized_turns: int
+    history_tokens: int
+    summary_tokens: int
+    summarizing: bool
+
+
+class Conversation:
+    """Message history for multi-turn chat, kept inside a token budget.
+
+    Once the unsummarized history grows past ``summarize_after_tokens``, the oldest turns are folded into a
+    rolling summary by a background job. Until it lands, ``messages_for`` simply leaves out whatever no
+    longer fits, so requests never exceed the budget and never wait on summarization.
+    """
+
+    def __init__(self, client: OpenAIClient, scheduler: RequestScheduler, settings: ConversationSettings) -> None:
+        self._client = client
+        self._scheduler = scheduler
+        self._settings = settings
+        self._lock = threading.Lock()
+        self._turns: list[_Turn] = []
+        self._summary = ""
+        self._summarized_turns = 0
+        self._summary_job: Optional[RequestHandle] = None
+        # Bumped by reset() so a summary that finishes afterwards is discarded.
+        self._epoch = 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._turns.clear()
+            self._summary = ""
+            self._summarized_turns = 0
+            self._summary_job = None
+            self._epoch += 1
+
+    def messages_for(self, system: Optional[str], user: str) -> list[Message]:
+        """The payload for sending *user* next: system and summary, as many recent turns as fit, then *user*."""
+        with self._lock:
+            summary = self._summary
+            turns = list(self._turns)
+
+        head_parts = [part for part in (system, f"{_SUMMARY_HEADING}\n{summary}" if summary else "") if part]
+        head = [Message("system", "\n\n".join(head_parts))] if head_parts else []
+        current = Message("user", user)
+        budget = self._settings.context_tokens - self._settings.reply_reserve_tokens
+        budget -= sum(message_tokens(message) for message in head) + message_tokens(current)
+
+        history: list[Message] = []
+        for turn in reversed(turns):
+            if turn.tokens > budget:
+                break
+            budget -= turn.tokens
+            history[:0] = (turn.user, turn.assistant)
+        return [*head, *history, current]
+
+    def record(self, user: str, reply: str) -> None:
+        """Append a completed exchange, starting a background summary if the history has grown too long."""
+        user_message, reply_message = Message("user", user), Message("assistant", reply)
+        turn = _Turn(user_message, reply_message, message_tokens(user_message) + message_tokens(reply_message))
+        with self._lock:
+            self._turns.append(turn)
+            fold = self._turns_to_fold_locked()
+            if fold:
+                self._summary_job = self._scheduler.submit(
+                    partial(self._summarize, self._epoch, self._summary, fold),
+                    priority=Priority.BACKGROUND,
+                    group="conversation-summary",
+                )
+
+    def stats(self) -> ConversationStats:
+        with self._lock:
+            return ConversationStats(
+                turns=self._summarized_turns + len(self._turns),
+                summarized_turns=self._summarized_turns,
+                history_tokens=sum(turn.tokens for turn in self._turns),
+                summary_tokens=estimate_tokens(self._summary),
+                summarizing=self._summarizing_locked(),
+            )
+
+    def _summarizing_locked(self) -> bool:
+        # A cancelled job (e.g. via the cancel-requests hotkey) reports done too, so folding can start over.
+        return self._summary_job is not None and not self._summary_job.done()
+
+    def _turns_to_fold_locked(self) -> list[_Turn]:
+        if self._summarizing_locked() or len(self._turns) <= self._settings.keep_recent_turns:
+            return []
+        if sum(turn.tokens for turn in self._turns) <= self._settings.summarize_after_tokens:
+            return []
+        return self._turns[: len(self._turns) - self._settings.keep_recent_turns]
+
+    def _summarize(self, epoch: int, previous: str, fold: list[_Turn]) -> str:
+        transcript = "\n\n".join(f"User: {turn.user.content}\n\nAssistant: {turn.assistant.content}" for turn in fold)
+        words = self._settings.summary_tokens * 3 // 4
+        request = (
+            f"Update the summary below with the new exchanges. Keep names, decisions, facts, numbers, code identifiers "
+            f"and open questions; drop pleasantries. Stay under {words} words.\n\n"
+            f"Current summary:\n{previous or '(none yet)'}\n\nNew exchanges:\n\n{transcript}"
+        )
+        summary = self._client.try_chat_messages([Message("system", _SUMMARIZER_SYSTEM), Message("user", request)], 0.0)
+        with self._lock:
+            if epoch != self._epoch or summary is None:
+                # Keep the turns; the next record() retries once the API is back.
+                return ""
+            self._summary = summary.strip()
+            # Only record() appends, so the folded turns are still the oldest ones.
+            del self._turns[: len(fold)]
+            self._summarized_turns += len(fold)
+        return summary
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import json
+import logging
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from . import spelling
+from .chunking import estimate_tokens
+from .prompt_manager import FAST_PATH_SPELLING, OUTPUT_EDITS, Prompt
+from .tracing import tracer
+
+if TYPE_CHECKING:
+    from .openai_client import OpenAIClient
+
+
+_log = logging.getLogger(__name__)
+
+# Below this the whole reply is short anyway, and asking for edits only adds JSON overhead and a fallback risk.
+MIN_EDIT_TOKENS = 200
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*\n?(.*?)\n?```\s*$", re.DOTALL)
+
+EDIT_INSTRUCTIONS = """\
+Do not repeat the text. Reply ONLY with JSON of the form {"edits": [{"find": "...", "replace": "..."}]}.
+Each "find" is copied character for character from the text and occurs in it exactly once; include a few \
+neighbouring words when the changed words alone appear more than once. "replace" is what that span becomes. \
+Edits must not overlap. Reply {"edits": []} when nothing needs to change."""
+
+
+class EditError(ValueError):
+    """The model's edits could not be parsed or do not apply cleanly to the original text."""
+
+
+@dataclass(slots=True, frozen=True)
+class Edit:
+    find: str
+    replace: str
+
+
+def parse_edits(reply: str) -> list[Edit]:
+    fenced = _FENCE_RE.match(reply)
+    try:
+        data = json.loads(fenced.group(1) if fenced else reply)
+    except json.JSONDecodeError as exc:
+        raise EditError(f"reply is not JSON: {exc}") from None
+    raw = data.get("edits") if isinstance(data, dict) else data
+    if not isinstance(raw, list):
+        raise EditError("no 'edits' list")
+    edits = []
+    for item in raw:
+        if not isinstance(item, dict) or not isinstance(item.get("find"), str) or not isinstance(item.get("replace"), str):
+            raise EditError(f"malformed edit {item!r}")
+        if not item["find"]:
+            raise EditError("edit with an empty 'find'")
+        edits.append(Edit(item["find"], item["replace"]))
+    return edits
+
+
+def apply_edits(text: str, edits: list[Edit]) -> str:
+    """*text* with every edit applied; each anchor must occur exactly once and no two may overlap."""
+    spans: list[tuple[int, int, str]] = []
+    for edit in edits:
+        start = text.find(edit.find)
+        if start < 0:
+            raise EditError(f"{edit.find!r} is not in the text")
+        if text.find(edit.find, start + 1) >= 0:
+            raise EditError(f"{edit.find!r} occurs more than once")
+        spans.append((start, start + len(edit.find), edit.replace))
+    spans.sort()
+    pieces: list[str] = []
+    position = 0
+    for start, end, replacement in spans:
+        if start < position:
+            raise EditError("edits overlap")
+        pieces.append(text[position:start])
+        pieces.append(replacement)
+        position = end
+    pieces.append(text[position:])
+    return "".join(pieces)
+
+
+def uses_edits(prompt: Prompt, text: str) -> bool:
+    return prompt.replace and prompt.output == OUTPUT_EDITS and estimate_tokens(text) >= MIN_EDIT_TOKENS
+
+
+def run_prompt(client: OpenAIClient, prompt: Prompt, text: str) -> str:
+    """Run *prompt* on *text* and return the full output text.
+
+    Spelling prompts first try the local speller, which settles plain typos without a request. Edit-mode
+    prompts on long text ask for edit operations and apply them locally, so only the changes are generated;
+    when the edits do not apply, the text is regenerated in full instead.
+    """
+    if prompt.fast_path == FAST_PATH_SPELLING:
+        fixed = spelling.quick_fix(text)
+        if fixed is not None:
+            return fixed
+    message = prompt.build_message(text)
+    if not uses_edits(prompt, text):
+        return client.chat(prompt.system or None, message, prompt.temperature)
+
+    from .openai_client import is_error_reply
+
+    # The edit instructions replace the prompt's own output format; appending them to "reply with the corrected
+    # text" would leave the model two contradicting instructions and many replies unparseable.
+    base = prompt.edit_system or prompt.system
+    system = f"{base}\n\n{EDIT_INSTRUCTIONS}" if base else EDIT_INSTRUCTIONS
+    reply = client.chat(system, message, prompt.temperature)
+    if is_error_reply(reply):
+        return reply
+    try:
+        with tracer.span("edits.apply") as span:
+            edits = parse_edits(reply)
+            span["edits"] = len(edits)
+            output = apply_edits(text, edits)
+        tracer.annotate(edits=len(edits))
+        return output
+    except EditError as exc:
+        _log.info("Falling back to full output for %r: %s", prompt.name, exc)
+        tracer.annotate(edits="fallback")
+    with tracer.span("edits.fallback"):
+        return client.chat(prompt.system or None, message, prompt.temperature)
@@ -0,0 +1,401 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socketserver
+import threading
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterator, Optional
+
+from ..config import ApiSettings
+from .batch import BatchItem, BatchOptions, BatchRunner
+from .edits import uses_edits
+from .openai_client import Message, OpenAIClient, StreamError, is_error_reply
+from .prompt_library import PromptLibrary
+from .prompt_manager import Prompt
+from .scheduler import Priority, RequestHandle, RequestScheduler
+from .tracing import tracer
+
+_log = logging.getLogger(__name__)
+
+_MAX_BODY_BYTES = 32 * 1024 * 1024
+_LOCAL_HOSTS = {"localhost", "127.0.0.1", "[::1]"}
+_NDJSON = "application/x-ndjson"
+_CANCELLED = "Request cancelled."
+_TIMED_OUT = "Timed out waiting for the reply."
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class _TcpServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects a (host, port) peer.
+        return request, ("local", 0)
+
+
+class LocalApiServer:
+    """Prompts and chat over HTTP for editors and scripts, so they need no clipboard round trip.
+
+    Runs on the app's client and scheduler, so API requests share its connection pool, rate limits, response
+    cache and worker limits. Endpoints (JSON in; JSON out, or NDJSON when streaming):
+
+    - ``GET /v1/prompts``: index, name, whether it replaces the selection, tags.
+    - ``POST /v1/prompts/run``: ``{"prompt": index or name, "text": ..., "stream": false}``.
+    - ``POST /v1/chat``: ``{"messages": [{"role", "content"}], "system": ..., "temperature": ..., "stream": false}``.
+    - ``POST /v1/batch``: ``{"prompt": ..., "items": [{"id", "text"} or text]}``; one NDJSON line per result as it lands.
+
+    Streams are NDJSON lines of ``{"delta": ...}`` ending with ``{"done": true, "ok": ..., "error": ...}``.
+    """
+
+    def __init__(self, settings: ApiSettings, client: OpenAIClient, scheduler: RequestScheduler, prompts: PromptLibrary) -> None:
+        self.settings = settings
+        self.client = client
+        self.scheduler = scheduler
+        self.prompts = prompts
+        self._server: Optional[socketserver.BaseServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        if self.settings.socket is not None:
+            return f"unix:{self.settings.socket}"
+        if self._server is not None:
+            host, port = self._server.server_address[:2]
+            return f"http://{host}:{port}"
+        return f"http://{self.settings.host}:{self.settings.port}"
+
+    def start(self) -> None:
+        handler = partial(_Handler, self)
+        if self.settings.socket is not None:
+            path = self.settings.socket
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.is_socket():
+                # Left behind by a previous run that did not shut down cleanly.
+                path.unlink()
+            self._server = _UnixServer(str(path), handler)
+            os.chmod(path, 0o600)
+        else:
+            self._server = _TcpServer((self.settings.host, self.settings.port), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="ai-hub-api", daemon=True)
+        self._thread.start()
+        _log.info("Local API listening on %s", self.address)
+
+    def close(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        if self.settings.socket is not None and self.settings.socket.is_socket():
+            self.settings.socket.unlink()
+
+    @property
+    def wait_timeout(self) -> float:
+        """How long a handler waits for a reply: every attempt the client may make plus its longest rate-limit wait."""
+        openai = self.client.settings
+        return (openai.max_retries + 1) * openai.timeout + openai.rate_limit_wait
+
+    def find_prompt(self, ref: Any) -> Prompt:
+        if isinstance(ref, int) and not isinstance(ref, bool):
+            if 0 <= ref < len(self.prompts):
+                return self.prompts[ref]
+        elif isinstance(ref, str):
+            position = self.prompts.index_of(ref)
+            if position is not None:
+                return self.prompts[position]
+        raise ApiError(404, f"No prompt {ref!r}")
+
+
+class _ChunkedWriter:
+    """File-like view of a chunked HTTP response body, for ``BatchRunner``."""
+
+    def __init__(self, wfile) -> None:
+        self._wfile = wfile
+
+    def write(self, text: str) -> int:
+        data = text.encode("utf-8")
+        self._wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        return len(text)
+
+    def flush(self) -> None:
+        self._wfile.flush()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "AIHub"
+
+    def __init__(self, api: LocalApiServer, *args) -> None:
+        self.api = api
+        super().__init__(*args)
+
+    def log_message(self, format: str, *args) -> None:
+        _log.debug("api: " + format, *args)
+
+    def do_GET(self) -> None:
+        self._dispatch({"/v1/prompts": self._list_prompts, "/v1/health": self._health}, with_body=False)
+
+    def do_POST(self) -> None:
+        self._dispatch({"/v1/prompts/run": self._run_prompt, "/v1/chat": self._chat, "/v1/batch": self._batch}, with_body=True)
+
+    def _dispatch(self, routes: dict[str, Callable[[dict], None]], *, with_body: bool) -> None:
+        try:
+            try:
+                self._check_caller()
+            except ApiError:
+                # The body was never read, so the connection cannot carry another request.
+                self.close_connection = True
+                raise
+            body = self._read_body() if with_body else {}
+            route = routes.get(self.path.split("?", 1)[0])
+            if route is None:
+                raise ApiError(404, f"No endpoint {self.command} {self.path}")
+            route(body)
+        except ApiError as exc:
+            self._send_json(exc.status, {"error": str(exc)})
+        except OSError:
+            # The caller went away; there is nobody left to answer.
+            self.close_connection = True
+
+    def _check_caller(self) -> None:
+        # Browsers send Origin on cross-site requests, and a rebound DNS name shows up in Host; scripts and editors do neither.
+        if self.headers.get("Origin"):
+            raise ApiError(403, "Cross-origin requests are not allowed")
+        if self.api.settings.socket is None:
+            host = self.headers.get("Host") or ""
+            name = host if host.endswith("]") else host.rsplit(":", 1)[0]
+            if name not in _LOCAL_HOSTS and name != self.api.settings.host:
+                raise ApiError(403, "Host not allowed")
+        token = self.api.settings.token
+        if token and self.headers.get("Authorization") != f"Bearer {token}":
+            raise ApiError(401, "Missing or wrong bearer token")
+
+    def _read_body(self) -> dict:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise ApiError(400, "Bad Content-Length") from None
+        if length > _MAX_BODY_BYTES:
+            self.close_connection = True
+            raise ApiError(413, f"Body over {_MAX_BODY_BYTES} bytes")
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except (json.JSONDecodeError, UnicodeDecodeError) as exc:
+            raise ApiError(400, f"Body is not JSON: {exc}") from None
+        if not isinstance(body, dict):
+            raise ApiError(400, "Body must be a JSON object")
+        return body
+
+    def _health(self, body: dict) -> None:
+        self._send_json(200, {"ok": True})
+
+    def _list_prompts(self, body: dict) -> None:
+        prompts = [
+            {"index": index, "name": prompt.name, "replace": prompt.replace, "tags": list(prompt.tags)}
+            for index, prompt in enumerate(self.api.prompts)
+        ]
+        self._send_json(200, {"prompts": prompts})
+
+    def _run_prompt(self, body: dict) -> None:
+        prompt = self.api.find_prompt(body.get("prompt"))
+        text = _string(body, "text")
+        scheduler = self.api.scheduler
+        with tracer.action("api", prompt=prompt.name):
+            # Chunked texts, edit-mode and fast-path prompts are assembled before delivery; a stream gets them as one delta.
+            if body.get("stream") and not (scheduler.needs_chunking(text) or uses_edits(prompt, text) or prompt.fast_path):
+                client = self.api.client
+                self._stream(partial(client.chat_stream, prompt.system or None, prompt.build_message(text), prompt.temperature), group=prompt.name)
+                return
+            result: list[str] = []
+            handle = scheduler.submit_prompt(
+                self.api.client, prompt, text, result.append, standalone=True, priority=Priority.INTERACTIVE
+            )
+        self._reply(handle, result, stream=bool(body.get("stream")))
+
+    def _chat(self, body: dict) -> None:
+        raw = body.get("messages")
+        if not isinstance(raw, list) or not raw:
+            raise ApiError(400, "'messages' must be a non-empty list")
+        try:
+            messages = [Message(str(item["role"]), str(item["content"])) for item in raw]
+        except (KeyError, TypeError):
+            raise ApiError(400, "Each message needs 'role' and 'content'") from None
+        system = body.get("system")
+        if isinstance(system, str) and system:
+            messages.insert(0, Message("system", system))
+        temperature = _temperature(body)
+        with tracer.action("api", prompt="Chat"):
+            if body.get("stream"):
+                self._stream(partial(self.api.client.chat_messages_stream, messages, temperature), group="chat")
+                return
+            result: list[str] = []
+            handle = self.api.scheduler.submit(
+                partial(self.api.client.chat_messages, messages, temperature),
+                result.append,
+                priority=Priority.INTERACTIVE,
+                group="chat",
+            )
+        self._reply(handle, result, stream=False)
+
+    def _batch(self, body: dict) -> None:
+        prompt = self.api.find_prompt(body.get("prompt"))
+        raw = body.get("items")
+        if not isinstance(raw, list):
+            raise ApiError(400, "'items' must be a list")
+        items = []
+        for index, item in enumerate(raw):
+            if isinstance(item, str):
+                items.append(BatchItem(str(index), item))
+            elif isinstance(item, dict) and isinstance(item.get("text"), str):
+                items.append(BatchItem(str(item.get("id", index)), item["text"]))
+            else:
+                raise ApiError(400, f"Item {index} has no string 'text'")
+        concurrency = body.get("concurrency", 4)
+        if not isinstance(concurrency, int) or concurrency < 1:
+            raise ApiError(400, "'concurrency' must be a positive integer")
+        self._start_chunked(_NDJSON)
+        runner = BatchRunner(self.api.client, self.api.scheduler, prompt, BatchOptions(concurrency=concurrency, read_ahead=0))
+        with tracer.action("api batch", prompt=prompt.name):
+            report = runner.run(items, _ChunkedWriter(self.wfile))
+        self._write_line(
+            {
+                "done": True,
+                "succeeded": report.succeeded,
+                "failed": report.failed,
+                "elapsed_s": round(report.elapsed_s, 3),
+                "p50_ms": round(report.percentile(50), 1),
+                "p95_ms": round(report.percentile(95), 1),
+            }
+        )
+        self._end_chunked()
+
+    def _stream(self, open_stream: Callable[[], Iterator[str]], *, group: str) -> None:
+        """Relay deltas from a scheduler worker as they arrive; the final line says whether the reply is usable.
+
+        A stream no worker has picked up within ``wait_timeout`` is cancelled and answered with a 503. Once it
+        runs, the client's own timeouts bound it.
+        """
+        lock = threading.Lock()
+        started = threading.Event()
+        state: dict[str, Any] = {"ran": False, "parts": 0, "error": None, "handle": None}
+
+        def run() -> str:
+            with lock:
+                handle = state["handle"]
+                if handle is not None and handle.cancelled:
+                    return ""
+                state["ran"] = True
+                self._start_chunked(_NDJSON)
+            started.set()
+            stream = open_stream()
+            try:
+                for delta in stream:
+                    if isinstance(delta, StreamError):
+                        # Possibly after part of the reply; the final line must not claim success.
+                        state["error"] = str(delta)
+                        break
+                    self._write_line({"delta": delta})
+                    state["parts"] += 1
+                    handle = state["handle"]
+                    if handle is not None and handle.cancelled:
+                        state["error"] = _CANCELLED
+                        break
+            except OSError:
+                # The caller hung up; stop generating.
+                state["error"] = "disconnected"
+                self.close_connection = True
+            finally:
+                stream.close()
+            return ""
+
+        handle = self.api.scheduler.submit(run, priority=Priority.INTERACTIVE, group=group)
+        with lock:
+            state["handle"] = handle
+        handle.add_done_callback(lambda _: started.set())
+        if not started.wait(self.api.wait_timeout):
+            with lock:
+                if not state["ran"]:
+                    handle.cancel()
+        with lock:
+            ran = state["ran"]
+        if not ran:
+            # Cancelled, or still queued (e.g. behind the shutdown), before a worker picked it up.
+            self._send_json(503, {"error": _CANCELLED if handle.done() else _TIMED_OUT})
+            return
+        handle.wait()
+        if state["error"] == "disconnected":
+            return
+        error = state["error"]
+        self._write_line({"done": True, "ok": error is None, "error": error})
+        self._end_chunked()
+
+    def _reply(self, handle: RequestHandle, result: list[str], *, stream: bool) -> None:
+        if not handle.wait(self.api.wait_timeout):
+            handle.cancel()
+            self._send_json(504, {"error": _TIMED_OUT})
+            return
+        # Cancelled jobs (the cancel-requests hotkey) never call back.
+        text = result[0] if result else _CANCELLED
+        ok = bool(result) and not is_error_reply(text)
+        if stream:
+            self._start_chunked(_NDJSON)
+            if ok:
+                self._write_line({"delta": text})
+            self._write_line({"done": True, "ok": ok, "error": None if ok else text})
+            self._end_chunked()
+        elif ok:
+            self._send_json(200, {"output": text})
+        else:
+            self._send_json(503 if not result else 502, {"error": text})
+
+    def _send_json(self, status: int, data: dict) -> None:
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_chunked(self, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.flush()
+
+    def _write_line(self, data: dict) -> None:
+        writer = _ChunkedWriter(self.wfile)
+        writer.write(json.dumps(data, ensure_ascii=False) + "\n")
+        writer.flush()
+
+    def _end_chunked(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def _string(body: dict, name: str) -> str:
+    value = body.get(name)
+    if not isinstance(value, str):
+        raise ApiError(400, f"{name!r} must be a string")
+    return value
+
+
+def _temperature(body: dict) -> float:
+    value = body.get("temperature", 0.2)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ApiError(400, "'temperature' must be a number")
+    return float(value)
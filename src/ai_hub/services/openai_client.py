@@ -1,12 +1,26 @@
 from __future__ import annotations
 
+import contextvars
 import json
-from dataclasses import dataclass
-from typing import Iterable, Optional
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from functools import partial
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Sequence
+from urllib.parse import urlsplit
 
-import requests
+from ..config import OpenAISettings, RoutingSettings
+from .chunking import estimate_tokens
+from .rate_limiter import LimiterState, RateLimiter, Reservation, backoff_delay, reset_delay, retry_after
+from .response_cache import CacheStats, ResponseCache, cache_key
+from .routing import Backend, BackendState, Router
+from .tracing import tracer
 
-from ..config import OpenAISettings
+if TYPE_CHECKING:
+    import requests
+
+    from .transport import TransportStats
 
 
 @dataclass(slots=True)
@@ -15,11 +29,157 @@ class Message:
     content: str
 
 
+_MISSING_KEY = "Missing OpenAI API key. Set OPENAI_API_KEY or configure settings.ini."
+# "Request failed:" is what the scheduler delivers when a job raises instead of returning a reply.
+_ERROR_PREFIXES = (
+    _MISSING_KEY,
+    "OpenAI request failed:",
+    "Unable to parse OpenAI response:",
+    "Unexpected OpenAI response",
+    "Request failed:",
+)
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Statuses that say nothing about the backend's health: the request itself was rejected.
+_REQUEST_ERRORS = frozenset({400, 413, 422})
+
+
+class StreamError(str):
+    """Yielded by the streaming calls in place of further deltas when the request fails; never part of the reply.
+
+    It can come after some content has already arrived, so check every delta, not just the first.
+    """
+
+
+def is_error_reply(text: str) -> bool:
+    """Whether *text* is one of the error strings the client returns in place of a completion."""
+    return text.startswith(_ERROR_PREFIXES)
+
+
 class OpenAIClient:
-    """Thin wrapper around the Chat Completions REST API."""
+    """Thin wrapper around the Chat Completions REST API.
 
-    def __init__(self, settings: OpenAISettings):
+    *settings* is the primary backend; *backends* adds further OpenAI-compatible endpoints. Each request
+    goes to the fastest healthy one and fails over down the list. With ``routing.hedge`` a second backend
+    is asked as well once the first is slower than its usual p95, and the first reply wins.
+    """
+
+    def __init__(
+        self,
+        settings: OpenAISettings,
+        cache: Optional[ResponseCache] = None,
+        limits: Optional[RateLimiter] = None,
+        backends: Sequence[OpenAISettings] = (),
+        routing: Optional[RoutingSettings] = None,
+    ):
         self._settings = settings
+        self._cache = cache
+        self._limits = limits or RateLimiter(settings.requests_per_minute, settings.tokens_per_minute)
+        self._routing = routing or RoutingSettings()
+        self._router = Router(
+            [
+                Backend(backend, self._limits.for_key(_limit_key(backend), backend.requests_per_minute, backend.tokens_per_minute), self._routing)
+                for backend in (settings, *backends)
+            ]
+        )
+        self._hedge_lock = threading.Lock()
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+        self._keepalive_lock = threading.Lock()
+        self._keepalive_wake = threading.Event()
+        self._keepalive_until = 0.0
+        self._keepalive_thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def warm_up(self) -> None:
+        """Import the HTTP stack and build the connection pools ahead of the first request."""
+        for backend in self._router.backends:
+            if backend.configured:
+                backend.transport
+
+    def keep_warm(self, seconds: float) -> None:
+        """Connect to the backend the next request will use, now, and keep that connection alive for *seconds*.
+
+        Returns at once; a background thread sends a HEAD request every ``keepalive_interval`` seconds so the
+        server does not drop the idle socket before the request that needs it.
+        """
+        if self._settings.keepalive_interval <= 0 or not self._router.configured:
+            return
+        with self._keepalive_lock:
+            if self._closed:
+                return
+            self._keepalive_until = max(self._keepalive_until, time.monotonic() + seconds)
+            if self._keepalive_thread is None:
+                self._keepalive_thread = threading.Thread(target=self._keep_alive, name="ai-hub-keepalive", daemon=True)
+                self._keepalive_thread.start()
+        self._keepalive_wake.set()
+
+    def _keep_alive(self) -> None:
+        import requests
+
+        while not self._closed:
+            self._keepalive_wake.clear()
+            if time.monotonic() >= self._keepalive_until:
+                # Nothing to keep warm; sleep until the next keep_warm call.
+                self._keepalive_wake.wait()
+                continue
+            candidates = self._router.candidates()
+            # A hedged request may need the runner-up as well.
+            for backend in candidates[: 2 if self._routing.hedge else 1]:
+                try:
+                    backend.transport.ping(backend.settings.endpoint)
+                except requests.RequestException:
+                    # The next real request finds out properly and fails over; a ping is only a hint.
+                    pass
+            self._keepalive_wake.wait(self._settings.keepalive_interval)
+
+    @property
+    def settings(self) -> OpenAISettings:
+        """The primary backend's settings."""
+        return self._settings
+
+    @property
+    def configured(self) -> bool:
+        """Whether any backend has credentials (or needs none)."""
+        return self._router.configured
+
+    def caches(self, temperature: float) -> bool:
+        """Whether replies at *temperature* are kept in the response cache."""
+        return self._cache is not None and ResponseCache.cacheable(temperature)
+
+    @property
+    def transport_stats(self) -> TransportStats:
+        from .transport import TransportStats
+
+        stats = [backend.transport.stats for backend in self._router.backends if backend.started]
+        return TransportStats(
+            sum(item.requests for item in stats),
+            sum(item.new_connections for item in stats),
+            sum(item.reused_connections for item in stats),
+        )
+
+    @property
+    def cache_stats(self) -> Optional[CacheStats]:
+        return self._cache.stats() if self._cache else None
+
+    @property
+    def rate_limits(self) -> dict[str, LimiterState]:
+        """Limiter state per API key and model, as learned from the server's rate-limit headers."""
+        return self._limits.states()
+
+    @property
+    def backend_states(self) -> dict[str, BackendState]:
+        """Latency, error rate and circuit state per backend name."""
+        return self._router.states()
+
+    def close(self) -> None:
+        with self._keepalive_lock:
+            self._closed = True
+        self._keepalive_wake.set()
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False, cancel_futures=True)
+        for backend in self._router.backends:
+            backend.close()
+        if self._cache:
+            self._cache.close()
 
     @staticmethod
     def _build_messages(system: Optional[str], user: str) -> list[Message]:
@@ -30,45 +190,350 @@ class OpenAIClient:
         return messages
 
     def chat(self, system: Optional[str], user: str, temperature: float = 0.2) -> str:
-        messages = self._build_messages(system, user)
-        return self._request(messages, temperature)
+        return self.chat_messages(self._build_messages(system, user), temperature)
+
+    def chat_messages(self, messages: Sequence[Message], temperature: float = 0.2) -> str:
+        """Send a full message list, e.g. a conversation with its history."""
+        return self._request(messages, temperature)[0]
 
-    def _request(self, messages: Iterable[Message], temperature: float) -> str:
-        if not self._settings.api_key:
-            return "Missing OpenAI API key. Set OPENAI_API_KEY or configure settings.ini."
+    def try_chat_messages(self, messages: Sequence[Message], temperature: float = 0.2) -> Optional[str]:
+        """Like ``chat_messages`` but returns None instead of an error string, for callers that must not store one."""
+        text, ok = self._request(messages, temperature)
+        return text if ok else None
 
-        payload = {
+    def chat_stream(self, system: Optional[str], user: str, temperature: float = 0.2) -> Iterator[str]:
+        """Yield content deltas as the server sends them (``stream: true`` SSE); a failure ends with a ``StreamError``."""
+        yield from self._stream(self._build_messages(system, user), temperature)
+
+    def chat_messages_stream(self, messages: Sequence[Message], temperature: float = 0.2) -> Iterator[str]:
+        yield from self._stream(messages, temperature)
+
+    def _build_payload(self, messages: Iterable[Message], temperature: float) -> dict:
+        return {
             "model": self._settings.model,
-            "messages": [msg.__dict__ for msg in messages],
+            "messages": [asdict(msg) for msg in messages],
             "temperature": temperature,
         }
-        headers = {
-            "Authorization": f"Bearer {self._settings.api_key}",
-            "Content-Type": "application/json",
-        }
+
+    def _request(self, messages: Iterable[Message], temperature: float) -> tuple[str, bool]:
+        if not self._router.configured:
+            return _MISSING_KEY, False
+
+        with tracer.span("request.build"):
+            payload = self._build_payload(messages, temperature)
+            key = self._cache_key(payload)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached, True
+
+        text, ok, backend = self._send(payload)
+        if ok and key and self._answered_by_primary(backend):
+            self._cache.put(key, text)
+        return text, ok
+
+    def _cache_key(self, payload: dict) -> Optional[str]:
+        if self._cache is None:
+            return None
+        if not ResponseCache.cacheable(payload["temperature"]):
+            self._cache.record_bypass()
+            return None
+        return cache_key(self._settings.model, self._settings.endpoint, payload["messages"], payload["temperature"])
+
+    def _answered_by_primary(self, backend: Optional[Backend]) -> bool:
+        """Cached replies are served as the primary model's, so a fallback backend's reply must not be stored."""
+        if backend is None:
+            return False
+        return (backend.settings.model, backend.settings.endpoint) == (self._settings.model, self._settings.endpoint)
+
+    def _cached(self, key: Optional[str]) -> Optional[str]:
+        if not key:
+            return None
+        with tracer.span("cache.lookup") as span:
+            cached = self._cache.get(key)
+            span["hit"] = cached is not None
+        return cached
+
+    def _post(self, payload: dict) -> tuple[requests.Response, Backend, Reservation]:
+        """POST *payload* to the best backend, failing over (or hedging) to the others; returns the final response."""
+        import requests
+
+        candidates = self._router.candidates()
+        if self._routing.hedge and len(candidates) > 1:
+            return self._post_hedged(payload, candidates)
+        failure: Optional[requests.RequestException] = None
+        for index, backend in enumerate(candidates):
+            last = index == len(candidates) - 1
+            try:
+                attempt = self._post_to(backend, payload, patient=last)
+            except requests.RequestException as exc:
+                failure = exc
+                continue
+            if attempt is not None and (last or _usable(attempt[0])):
+                return attempt[0], backend, attempt[1]
+            if attempt is not None:
+                attempt[0].close()
+        raise failure or requests.exceptions.RetryError("no backend accepted the request")
+
+    def _post_hedged(self, payload: dict, candidates: list[Backend]) -> tuple[requests.Response, Backend, Reservation]:
+        """Send to the first backend; if it has not answered within its hedge delay, to the next one too.
+
+        Whichever usable response arrives first wins and the other is closed when it lands. Failures
+        move on to the next backend straight away.
+        """
+        import requests
+
+        pool = self._hedge_executor(len(candidates))
+        queue = list(candidates)
+        pending: dict[Future, Backend] = {}
+
+        def launch() -> None:
+            backend = queue.pop(0)
+            future = pool.submit(contextvars.copy_context().run, partial(self._post_to, backend, payload, patient=not queue))
+            pending[future] = backend
+
+        launch()
+        hedge_at = time.monotonic() + candidates[0].health.hedge_delay()
+        failure: Optional[requests.RequestException] = None
+        fallback: Optional[tuple[requests.Response, Backend, Reservation]] = None
+        while pending:
+            timeout = max(0.0, hedge_at - time.monotonic()) if queue and hedge_at else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                tracer.annotate(hedged=True)
+                launch()
+                hedge_at = 0.0
+                continue
+            for future in done:
+                backend = pending.pop(future)
+                try:
+                    attempt = future.result()
+                except requests.RequestException as exc:
+                    failure = exc
+                    continue
+                if attempt is None:
+                    continue
+                if not _usable(attempt[0]):
+                    if fallback is not None:
+                        fallback[0].close()
+                    fallback = (attempt[0], backend, attempt[1])
+                    continue
+                if backend is not candidates[0]:
+                    backend.health.won_hedge()
+                for other in pending:
+                    other.add_done_callback(_discard)
+                if fallback is not None:
+                    fallback[0].close()
+                return attempt[0], backend, attempt[1]
+            if not pending and queue:
+                launch()
+        if fallback is not None:
+            return fallback
+        raise failure or requests.exceptions.RetryError("no backend accepted the request")
+
+    def _hedge_executor(self, size: int) -> ThreadPoolExecutor:
+        with self._hedge_lock:
+            if self._hedge_pool is None:
+                # Each waiting caller may hold a request on every backend at once.
+                self._hedge_pool = ThreadPoolExecutor(max(4, 4 * size), thread_name_prefix="ai-hub-hedge")
+            return self._hedge_pool
+
+    def _post_to(self, backend: Backend, payload: dict, *, patient: bool) -> Optional[tuple[requests.Response, Reservation]]:
+        """POST through *backend*'s rate limiter, retrying 429 and 5xx with jittered backoff when *patient*.
+
+        Requests queue in the limiter rather than fail while the account is at its limit, up to
+        ``rate_limit_wait`` seconds in total. An impatient call (another backend is next in line) returns
+        the first failed response instead, and None when the backend is rate limited or circuit-broken.
+        """
+        import requests
+
+        settings = backend.settings
+        limiter = backend.limiter
+        health = backend.health
+        if not health.begin(time.monotonic()) and not patient:
+            return None
+        payload = {**payload, "model": settings.model}
+        estimate = _estimate_tokens(payload)
+        deadline = time.monotonic() + settings.rate_limit_wait
+        attempt = 0
+        while True:
+            reservation = limiter.acquire(estimate)
+            if reservation.wait:
+                if not patient or time.monotonic() + reservation.wait > deadline:
+                    limiter.release(reservation)
+                    health.release()
+                    if not patient:
+                        return None
+                    raise requests.exceptions.RetryError(f"rate limited; the queue is {reservation.wait:.0f} s long")
+                limiter.waiting(1)
+                try:
+                    with tracer.span("ratelimit.wait"):
+                        time.sleep(reservation.wait)
+                finally:
+                    limiter.waiting(-1)
+
+            # Streamed so that time-to-headers and body transfer show up as separate spans.
+            started = time.monotonic()
+            try:
+                with tracer.span("http.ttfb", backend=backend.name):
+                    response = backend.transport.post(settings.endpoint, headers=backend.headers(), json=payload, stream=True)
+            except requests.RequestException:
+                limiter.settle(reservation, 0)
+                health.failed(trip=True)
+                raise
+            limiter.observe(response.headers)
+            status = response.status_code
+            if status < 400 or status in _REQUEST_ERRORS:
+                health.succeeded(time.monotonic() - started)
+                return response, reservation
+            # A 429 is the account's limit, not the backend's health; anything else counts toward the breaker.
+            health.failed(trip=status != 429)
+            if status not in _RETRY_STATUSES or not patient:
+                return response, reservation
+
+            server_delay = retry_after(response.headers)
+            if status == 429 and server_delay is None:
+                server_delay = reset_delay(response.headers)
+            delay = backoff_delay(attempt, settings.retry_backoff, settings.max_backoff, server_delay)
+            if time.monotonic() + delay > deadline or (status != 429 and attempt >= settings.max_retries):
+                return response, reservation
+            response.close()
+            # A rejected request used no tokens; the request slot stays spent, as it does on the server.
+            limiter.settle(reservation, 0)
+            if server_delay is not None:
+                # The server said when to come back; hold everything for this key, not just this request.
+                limiter.block(delay, rate_limited=status == 429)
+            else:
+                limiter.record_retry()
+            with tracer.span("retry.backoff", status=status, attempt=attempt + 1):
+                time.sleep(delay)
+            attempt += 1
+
+    def _send(self, payload: dict) -> tuple[str, bool, Optional[Backend]]:
+        """POST *payload*; returns the reply text, whether it is a genuine completion, and the backend that answered."""
+        import requests
 
         try:
-            response = requests.post(
-                self._settings.endpoint,
-                headers=headers,
-                json=payload,
-                timeout=self._settings.timeout,
-            )
-            response.raise_for_status()
-            data = response.json()
+            with tracer.span("http") as http_span:
+                response, backend, reservation = self._post(payload)
+                with response:
+                    http_span["status"] = response.status_code
+                    http_span["backend"] = backend.name
+                    response.raise_for_status()
+                    with tracer.span("generation"):
+                        response.content
+                    with tracer.span("json.parse"):
+                        data = response.json()
+                usage = _usage(data)
+                http_span.update(usage)
+                if usage:
+                    backend.limiter.settle(reservation, sum(usage.values()))
         except requests.RequestException as exc:
-            return f"OpenAI request failed: {exc}"
+            return f"OpenAI request failed: {exc}", False, None
         except json.JSONDecodeError as exc:
-            return f"Unable to parse OpenAI response: {exc}"
+            return f"Unable to parse OpenAI response: {exc}", False, None
 
         choices = data.get("choices")
         if not choices:
-            return f"Unexpected OpenAI response: {json.dumps(data, indent=2)}"
+            return f"Unexpected OpenAI response: {json.dumps(data, indent=2)}", False, backend
 
         first = choices[0]
         message = first.get("message")
         if isinstance(message, dict) and "content" in message:
-            return str(message["content"])
+            return str(message["content"]), True, backend
         if "text" in first:
-            return str(first["text"])
-        return f"Unexpected OpenAI response structure: {json.dumps(first, indent=2)}"
+            return str(first["text"]), True, backend
+        return f"Unexpected OpenAI response structure: {json.dumps(first, indent=2)}", False, backend
+
+    def _stream(self, messages: Iterable[Message], temperature: float) -> Iterator[str]:
+        if not self._router.configured:
+            yield StreamError(_MISSING_KEY)
+            return
+
+        with tracer.span("request.build"):
+            payload = self._build_payload(messages, temperature)
+            key = self._cache_key(payload)
+        cached = self._cached(key)
+        if cached is not None:
+            yield cached
+            return
+
+        import requests
+
+        payload["stream"] = True
+        parts: list[str] = []
+        parse_ns = 0
+        try:
+            with tracer.span("http", stream=True) as http_span:
+                started = time.perf_counter_ns()
+                response, backend, reservation = self._post(payload)
+                with response, tracer.span("generation"):
+                    http_span["status"] = response.status_code
+                    http_span["backend"] = backend.name
+                    response.raise_for_status()
+                    # SSE responses rarely declare a charset; decode explicitly rather than via requests' latin-1 default.
+                    for raw in response.iter_lines():
+                        line = raw.decode("utf-8")
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            # Keep draining to the end of the body so the connection returns to the pool.
+                            continue
+                        parse_started = time.perf_counter_ns()
+                        event = json.loads(data)
+                        parse_ns += time.perf_counter_ns() - parse_started
+                        http_span.update(_usage(event))
+                        for choice in event.get("choices") or ():
+                            content = (choice.get("delta") or {}).get("content")
+                            if content:
+                                if not parts:
+                                    tracer.record("first_token", started / 1000, (time.perf_counter_ns() - started) / 1000)
+                                parts.append(content)
+                                yield content
+                tracer.record("json.parse", started / 1000, parse_ns / 1000)
+                usage = {name: http_span[name] for name in ("prompt_tokens", "completion_tokens") if name in http_span}
+                if usage:
+                    backend.limiter.settle(reservation, sum(usage.values()))
+        except requests.RequestException as exc:
+            yield StreamError(f"OpenAI request failed: {exc}")
+            return
+        except (json.JSONDecodeError, UnicodeDecodeError) as exc:
+            yield StreamError(f"Unable to parse OpenAI response: {exc}")
+            return
+        if key and parts and self._answered_by_primary(backend):
+            self._cache.put(key, "".join(parts))
+
+
+def _limit_key(settings: OpenAISettings) -> str:
+    """Rate limits apply per API key and model; the key shows only by its last characters."""
+    key = settings.api_key or ""
+    return f"{settings.model} @ {urlsplit(settings.endpoint).netloc} (…{key[-4:]})"
+
+
+def _usable(response: requests.Response) -> bool:
+    """Whether *response* should go back to the caller rather than send the request to another backend."""
+    return response.status_code < 400 or response.status_code in _REQUEST_ERRORS
+
+
+def _discard(future: Future) -> None:
+    """Close the response of a hedged request that lost the race."""
+    try:
+        attempt = future.result()
+    except Exception:
+        return
+    if attempt is not None:
+        attempt[0].close()
+
+
+def _estimate_tokens(payload: dict) -> int:
+    """Tokens to reserve before sending: the prompt, plus a reply about as long (most prompts rewrite text)."""
+    prompt = sum(estimate_tokens(message["content"]) + 4 for message in payload["messages"])
+    return 2 * prompt + 16
+
+
+def _usage(data: dict) -> dict[str, int]:
+    """Token counts from a response's ``usage`` block, when the server sends one."""
+    usage = data.get("usage") if isinstance(data, dict) else None
+    if not isinstance(usage, dict):
+        return {}
+    return {name: int(usage[name]) for name in ("prompt_tokens", "completion_tokens") if isinstance(usage.get(name), int)}
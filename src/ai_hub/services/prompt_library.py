@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import json
+import logging
+import re
+import sqlite3
+from collections.abc import Sequence
+from dataclasses import fields
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, overload
+
+from ..config import PromptLibrarySettings
+from .prompt_manager import Prompt, default_prompts
+
+
+_log = logging.getLogger(__name__)
+
+_JSON_SUFFIXES = {".json"}
+_SQLITE_SUFFIXES = {".sqlite", ".sqlite3", ".db"}
+_PROMPT_FIELDS = {field.name for field in fields(Prompt)}
+_WORD_STARTS = frozenset(" -_/.(&–")
+
+
+def _char_mask(text: str) -> int:
+    """64-bit signature of the characters in *text*; a cheap pre-filter before the real match."""
+    mask = 0
+    for char in set(text):
+        mask |= 1 << (ord(char) & 63)
+    return mask
+
+
+def _bool(value: Any) -> bool:
+    # SQLite and hand-written JSON carry flags as "false" or "0" as often as real booleans; read them like settings.ini.
+    return value.strip().lower() in ("1", "true", "yes", "on") if isinstance(value, str) else bool(value)
+
+
+def _prompt_from_mapping(data: dict[str, Any]) -> Prompt:
+    values = {key: value for key, value in data.items() if key in _PROMPT_FIELDS and value is not None}
+    if not values.get("name"):
+        raise ValueError("prompt without a name")
+    tags = values.get("tags") or ()
+    values["tags"] = tuple(tag.strip() for tag in (tags.split(",") if isinstance(tags, str) else tags) if tag.strip())
+    values.setdefault("system", "")
+    values.setdefault("prefix", "")
+    values.setdefault("suffix", "")
+    values["replace"] = _bool(values.get("replace", False))
+    if "temperature" in values:
+        values["temperature"] = float(values["temperature"])
+    return Prompt(**values)
+
+
+def _read_json(path: Path) -> list[dict[str, Any]]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return data.get("prompts", []) if isinstance(data, dict) else data
+
+
+def _read_sqlite(path: Path) -> list[dict[str, Any]]:
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        connection.row_factory = sqlite3.Row
+        return [dict(row) for row in connection.execute("SELECT * FROM prompts")]
+    finally:
+        connection.close()
+
+
+def load_prompt_file(path: Path) -> list[Prompt]:
+    """Prompts from a JSON list (or ``{"prompts": [...]}``) or from the ``prompts`` table of a SQLite file."""
+    suffix = path.suffix.lower()
+    rows = _read_sqlite(path) if suffix in _SQLITE_SUFFIXES else _read_json(path)
+    prompts = []
+    for row in rows:
+        try:
+            prompts.append(_prompt_from_mapping(row))
+        except (TypeError, ValueError) as exc:
+            _log.warning("Skipping prompt in %s: %s", path, exc)
+    return prompts
+
+
+def _library_files(paths: Iterable[Path]) -> Iterator[Path]:
+    for path in paths:
+        if path.is_dir():
+            yield from sorted(child for child in path.iterdir() if child.suffix.lower() in _JSON_SUFFIXES | _SQLITE_SUFFIXES)
+        elif path.is_file():
+            yield path
+
+
+class PromptLibrary(Sequence[Prompt]):
+    """Ordered prompt collection with an in-memory index for incremental fuzzy search.
+
+    Built-in prompts keep their positions, so index-based bindings (hotstrings, the spelling hotkey) stay
+    stable; library files add to the end or replace a built-in of the same name in place.
+    """
+
+    def __init__(self, prompts: Iterable[Prompt] = ()) -> None:
+        self._prompts: list[Prompt] = []
+        self._positions: dict[str, int] = {}
+        self._keys: list[str] = []
+        self._masks: list[int] = []
+        self._last_query: Optional[list[str]] = None
+        self._last_hits: list[int] = []
+        self.extend(prompts)
+
+    @classmethod
+    def load(cls, settings: PromptLibrarySettings) -> PromptLibrary:
+        library = cls(default_prompts() if settings.include_defaults else ())
+        for path in _library_files(settings.paths):
+            try:
+                library.extend(load_prompt_file(path))
+            except (OSError, ValueError, sqlite3.Error) as exc:
+                _log.warning("Could not load prompt library %s: %s", path, exc)
+        return library
+
+    @overload
+    def __getitem__(self, index: int) -> Prompt: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Prompt]: ...
+
+    def __getitem__(self, index):
+        return self._prompts[index]
+
+    def __len__(self) -> int:
+        return len(self._prompts)
+
+    def extend(self, prompts: Iterable[Prompt]) -> None:
+        for prompt in prompts:
+            key = " ".join((prompt.name, *prompt.tags)).lower()
+            position = self._positions.get(prompt.name)
+            if position is None:
+                self._positions[prompt.name] = len(self._prompts)
+                self._prompts.append(prompt)
+                self._keys.append(key)
+                self._masks.append(_char_mask(key))
+            else:
+                self._prompts[position] = prompt
+                self._keys[position] = key
+                self._masks[position] = _char_mask(key)
+        self._last_query = None
+
+    def index_of(self, name: str) -> Optional[int]:
+        return self._positions.get(name)
+
+    def search(self, query: str) -> list[int]:
+        """Indices of prompts whose name or tags contain every query word as a subsequence, best first.
+
+        A query that extends the previous one (the usual case while typing) only re-checks the previous hits.
+        """
+        words = query.lower().split()
+        if not words:
+            return list(range(len(self._prompts)))
+
+        previous = self._last_query
+        narrowing = previous is not None and len(words) >= len(previous) and all(
+            word.startswith(old) if i == len(previous) - 1 else word == old for i, (old, word) in enumerate(zip(previous, words))
+        )
+        candidates: Iterable[int] = self._last_hits if narrowing else range(len(self._prompts))
+
+        mask = _char_mask("".join(words))
+        terms = [(word, re.compile(".*?".join(map(re.escape, word)))) for word in words]
+        keys, masks = self._keys, self._masks
+        scored: list[tuple[int, int, int]] = []
+        for index in candidates:
+            if masks[index] & mask != mask:
+                continue
+            key = keys[index]
+            # Rank: prefix match, then word-start substring, then any substring, then scattered subsequence.
+            tier = 0
+            for word, pattern in terms:
+                at = key.find(word)
+                if at > 0:
+                    tier += 1 if key[at - 1] in _WORD_STARTS else 2
+                elif at < 0:
+                    if pattern.search(key) is None:
+                        break
+                    tier += 4
+            else:
+                scored.append((tier, len(key), index))
+        self._last_query = words
+        self._last_hits = sorted(index for _, _, index in scored)
+        scored.sort()
+        return [index for _, _, index in scored]
@@ -4,6 +4,18 @@ from dataclasses import dataclass
 from typing import Callable, Sequence
 
 
+# How outputs of a prompt run over several chunks of one large input are combined.
+COMBINE_CONCAT = "concat"
+COMBINE_REDUCE = "reduce"
+
+# How a replace prompt returns its result: the full rewritten text, or edit operations applied locally.
+OUTPUT_TEXT = "text"
+OUTPUT_EDITS = "edits"
+
+# Local checks tried before the model; the model runs only when they are not enough.
+FAST_PATH_SPELLING = "spelling"
+
+
 @dataclass(slots=True)
 class Prompt:
     name: str
@@ -12,6 +24,12 @@ class Prompt:
     suffix: str
     replace: bool
     temperature: float = 0.2
+    combine: str = COMBINE_CONCAT
+    output: str = OUTPUT_TEXT
+    # System text for edit mode, without the "reply with the full text" instruction that *system* may carry.
+    edit_system: str = ""
+    fast_path: str = ""
+    tags: tuple[str, ...] = ()
 
     def build_message(self, text: str) -> str:
         return f"{self.prefix}{text}{self.suffix}"
@@ -26,6 +44,9 @@ def default_prompts() -> Sequence[Prompt]:
             suffix="",
             replace=True,
             temperature=0.0,
+            output=OUTPUT_EDITS,
+            edit_system="You are an English spelling corrector and grammar improver.",
+            fast_path=FAST_PATH_SPELLING,
         ),
         Prompt(
             name="Rewrite for clarity",
@@ -77,6 +98,7 @@ def default_prompts() -> Sequence[Prompt]:
             prefix="Summarize the following text:\n\n",
             suffix="",
             replace=False,
+            combine=COMBINE_REDUCE,
         ),
         Prompt(
             name="Explain",
@@ -91,6 +113,7 @@ def default_prompts() -> Sequence[Prompt]:
             prefix="Identify any action items in the following text and present them as bullet points after a one-sentence summary:\n\n",
             suffix="",
             replace=False,
+            combine=COMBINE_REDUCE,
         ),
         Prompt(
             name="Code – Optimize",
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+
+# OpenAI limits are per minute; the buckets refill at limit/60 per second.
+_WINDOW_SECONDS = 60.0
+# Servers enforce per-minute limits over shorter windows, so a full minute's allowance is never sent at once.
+_BURST_SECONDS = 10.0
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds in an ``x-ratelimit-reset-*`` value such as ``"20ms"``, ``"1s"`` or ``"6m0s"``."""
+    if not value:
+        return None
+    parts = _DURATION_RE.findall(value.strip())
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds the server asked us to wait: ``retry-after-ms``, then ``Retry-After`` (seconds or HTTP date)."""
+    millis = headers.get("retry-after-ms")
+    if millis:
+        try:
+            return max(0.0, float(millis) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def reset_delay(headers: Mapping[str, str]) -> Optional[float]:
+    """Time until an exhausted request or token allowance resets, from ``x-ratelimit-reset-*``."""
+    delays = [
+        parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+        for kind in ("requests", "tokens")
+        if headers.get(f"x-ratelimit-remaining-{kind}") == "0"
+    ]
+    delays = [delay for delay in delays if delay is not None]
+    return max(delays) if delays else None
+
+
+def backoff_delay(attempt: int, base: float, cap: float, server_delay: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff, never shorter than what the server asked for."""
+    jittered = random.uniform(0, min(cap, base * 2**attempt))
+    if server_delay is None:
+        return jittered
+    # A little spread on top of Retry-After keeps every waiting request from returning in the same instant.
+    return server_delay + random.uniform(0, base)
+
+
+class TokenBucket:
+    """Continuous-refill bucket that hands out reservations; a negative level is the queue ahead."""
+
+    def __init__(self, per_minute: float, now: float) -> None:
+        self.limit = per_minute
+        self.rate = per_minute / _WINDOW_SECONDS
+        self.capacity = max(1.0, self.rate * _BURST_SECONDS)
+        self.level = self.capacity
+        self._updated = now
+
+    def resize(self, per_minute: float, now: float) -> None:
+        self._refill(now)
+        self.limit = per_minute
+        self.rate = per_minute / _WINDOW_SECONDS
+        self.capacity = max(1.0, self.rate * _BURST_SECONDS)
+        self.level = min(self.level, self.capacity)
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take *amount* and return how long until it is covered."""
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return -self.level / self.rate if self.level < 0 else 0.0
+
+    def give_back(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+    def sync(self, remaining: float, now: float) -> None:
+        """Trust the server when it has less left than we think; our own view already includes later reservations."""
+        self._refill(now)
+        self.level = min(self.level, remaining)
+
+    def available(self, now: float) -> float:
+        self._refill(now)
+        return self.level
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+@dataclass(slots=True, frozen=True)
+class Reservation:
+    tokens: int
+    wait: float
+
+
+@dataclass(slots=True, frozen=True)
+class LimiterState:
+    requests_limit: Optional[int]
+    requests_available: Optional[float]
+    tokens_limit: Optional[int]
+    tokens_available: Optional[float]
+    blocked_for_s: float
+    waiting: int
+    throttled: int
+    rate_limited: int
+    retries: int
+
+
+class KeyLimiter:
+    """Request and token buckets for one API key / model, learned from ``x-ratelimit-*`` headers.
+
+    Until the server has told us its limits (or settings provide them) a bucket does not exist and
+    requests pass straight through.
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None) -> None:
+        self._lock = threading.Lock()
+        now = time.monotonic()
+        self._requests = TokenBucket(requests_per_minute, now) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute, now) if tokens_per_minute else None
+        self._blocked_until = 0.0
+        self._waiting = 0
+        self._throttled = 0
+        self._rate_limited = 0
+        self._retries = 0
+
+    def acquire(self, tokens: int) -> Reservation:
+        """Reserve one request and *tokens*; the caller sleeps ``wait`` seconds (or gives the reservation back)."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._blocked_until - now)
+            if self._requests is not None:
+                wait = max(wait, self._requests.reserve(1, now))
+            if self._tokens is not None:
+                wait = max(wait, self._tokens.reserve(tokens, now))
+            if wait:
+                self._throttled += 1
+            return Reservation(tokens, wait)
+
+    def release(self, reservation: Reservation) -> None:
+        """Return a reservation that was never sent."""
+        with self._lock:
+            now = time.monotonic()
+            if self._requests is not None:
+                self._requests.give_back(1, now)
+            if self._tokens is not None:
+                self._tokens.give_back(reservation.tokens, now)
+
+    def settle(self, reservation: Reservation, used_tokens: int) -> None:
+        """Correct the token bucket once the real usage of a request is known."""
+        with self._lock:
+            if self._tokens is not None:
+                now = time.monotonic()
+                difference = used_tokens - reservation.tokens
+                if difference > 0:
+                    self._tokens.reserve(difference, now)
+                else:
+                    self._tokens.give_back(-difference, now)
+
+    def waiting(self, delta: int) -> None:
+        with self._lock:
+            self._waiting += delta
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        """Update limits and remaining capacity from a response's ``x-ratelimit-*`` headers."""
+        with self._lock:
+            now = time.monotonic()
+            self._requests = self._apply(self._requests, headers, "requests", now)
+            self._tokens = self._apply(self._tokens, headers, "tokens", now)
+
+    def block(self, seconds: float, *, rate_limited: bool) -> None:
+        """Hold every request for this key for *seconds* (after a 429, or a 503 with Retry-After)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._retries += 1
+            if rate_limited:
+                self._rate_limited += 1
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self._retries += 1
+
+    def state(self) -> LimiterState:
+        with self._lock:
+            now = time.monotonic()
+            return LimiterState(
+                requests_limit=int(self._requests.limit) if self._requests else None,
+                requests_available=self._requests.available(now) if self._requests else None,
+                tokens_limit=int(self._tokens.limit) if self._tokens else None,
+                tokens_available=self._tokens.available(now) if self._tokens else None,
+                blocked_for_s=max(0.0, self._blocked_until - now),
+                waiting=self._waiting,
+                throttled=self._throttled,
+                rate_limited=self._rate_limited,
+                retries=self._retries,
+            )
+
+    @staticmethod
+    def _apply(bucket: Optional[TokenBucket], headers: Mapping[str, str], kind: str, now: float) -> Optional[TokenBucket]:
+        try:
+            limit = int(headers.get(f"x-ratelimit-limit-{kind}") or 0)
+            remaining = float(headers.get(f"x-ratelimit-remaining-{kind}") or -1)
+        except ValueError:
+            return bucket
+        if limit > 0:
+            if bucket is None:
+                bucket = TokenBucket(limit, now)
+            elif bucket.limit != limit:
+                bucket.resize(limit, now)
+        if bucket is not None and remaining >= 0:
+            bucket.sync(remaining, now)
+        return bucket
+
+
+class RateLimiter:
+    """One ``KeyLimiter`` per API key and model, created on first use."""
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None) -> None:
+        self._defaults = (requests_per_minute, tokens_per_minute)
+        self._lock = threading.Lock()
+        self._limiters: dict[str, KeyLimiter] = {}
+
+    def for_key(self, key: str, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None) -> KeyLimiter:
+        """The limiter for *key*; the per-minute limits, if given, replace the defaults when it is created."""
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                default_requests, default_tokens = self._defaults
+                limiter = self._limiters[key] = KeyLimiter(requests_per_minute or default_requests, tokens_per_minute or default_tokens)
+            return limiter
+
+    def states(self) -> dict[str, LimiterState]:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {key: limiter.state() for key, limiter in limiters.items()}
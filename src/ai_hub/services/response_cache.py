@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from ..config import CacheSettings
+
+
+@dataclass(slots=True, frozen=True)
+class CacheStats:
+    memory_hits: int
+    disk_hits: int
+    misses: int
+    bypassed: int
+    memory_entries: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+
+def cache_key(model: str, endpoint: str, messages: list[dict[str, Any]], temperature: float) -> str:
+    blob = json.dumps([model, endpoint, messages, temperature], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class _DiskTier:
+    """SQLite-backed store evicted by age (TTL) and total payload size."""
+
+    def __init__(self, path: Path, max_bytes: int, ttl: float) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+        self._conn.commit()
+        self._purge_expired(time.time())
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, created = row
+        if self._ttl and now - created > self._ttl:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+            return None
+        self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        self._conn.commit()
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+            (key, value, size, now, now),
+        )
+        self._evict_to_size()
+        self._conn.commit()
+
+    def clear(self) -> None:
+        self._conn.execute("DELETE FROM responses")
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _purge_expired(self, now: float) -> None:
+        if self._ttl:
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self._ttl,))
+            self._conn.commit()
+
+    def _evict_to_size(self) -> None:
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if total <= self._max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self._max_bytes:
+                break
+
+
+class ResponseCache:
+    """Two-tier cache for deterministic (temperature 0) completions."""
+
+    def __init__(self, settings: CacheSettings) -> None:
+        self._settings = settings
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._disk = _DiskTier(settings.path, settings.max_disk_bytes, settings.ttl_seconds) if settings.persistent else None
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._bypassed = 0
+
+    @staticmethod
+    def cacheable(temperature: float) -> bool:
+        return temperature == 0.0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self._memory_hits += 1
+                return value
+            value = self._disk.get(key) if self._disk else None
+            if value is None:
+                self._misses += 1
+                return None
+            self._disk_hits += 1
+            self._remember(key, value)
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._remember(key, value)
+            if self._disk:
+                self._disk.put(key, value)
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self._bypassed += 1
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self._memory_hits, self._disk_hits, self._misses, self._bypassed, len(self._memory))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._disk:
+                self._disk.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._disk:
+                self._disk.close()
+                self._disk = None
+
+    def _remember(self, key: str, value: str) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._settings.memory_entries:
+            self._memory.popitem(last=False)
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional, Sequence
+
+from ..config import OpenAISettings, RoutingSettings
+from .rate_limiter import KeyLimiter
+
+if TYPE_CHECKING:
+    from .transport import HTTPTransport
+
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half-open"
+
+_LATENCY_SAMPLES = 64
+# Below this many samples the p95 is noise; hedge after the configured delay (or the EWMA) instead.
+_MIN_HEDGE_SAMPLES = 8
+# Each point of error rate counts as this many times the backend's latency when ranking.
+_ERROR_PENALTY = 4.0
+
+
+@dataclass(slots=True, frozen=True)
+class BackendState:
+    model: str
+    circuit: str
+    latency_ms: Optional[float]
+    error_rate: float
+    requests: int
+    failures: int
+    hedge_wins: int
+
+
+class BackendHealth:
+    """EWMA time-to-headers and error rate of one backend, plus its circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and the backend gets no traffic
+    for ``open_seconds``. Then a single probe request is let through (half-open): success closes the
+    circuit, failure opens it again for twice as long, up to ``max_open_seconds``.
+    """
+
+    def __init__(self, settings: RoutingSettings) -> None:
+        self._settings = settings
+        self._lock = threading.Lock()
+        self._latency: Optional[float] = None
+        self._error_rate = 0.0
+        self._samples: deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._open_for = settings.open_seconds
+        self._probing = False
+        self._requests = 0
+        self._failures = 0
+        self._hedge_wins = 0
+
+    def available(self, now: float) -> bool:
+        with self._lock:
+            return self._open_until == 0.0 or (now >= self._open_until and not self._probing)
+
+    def begin(self, now: float) -> bool:
+        """Claim a request slot; in the half-open state only one probe is in flight at a time."""
+        with self._lock:
+            if self._open_until == 0.0:
+                return True
+            if now < self._open_until or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def succeeded(self, latency: float) -> None:
+        alpha = self._settings.ewma_alpha
+        with self._lock:
+            self._requests += 1
+            self._latency = latency if self._latency is None else alpha * latency + (1 - alpha) * self._latency
+            self._error_rate *= 1 - alpha
+            self._samples.append(latency)
+            self._consecutive_failures = 0
+            self._open_until = 0.0
+            self._open_for = self._settings.open_seconds
+            self._probing = False
+
+    def failed(self, *, trip: bool) -> None:
+        """Record a failed attempt; only *trip* failures (the backend is down or broken) count toward opening."""
+        alpha = self._settings.ewma_alpha
+        with self._lock:
+            self._requests += 1
+            self._failures += 1
+            self._error_rate = alpha + (1 - alpha) * self._error_rate
+            if not trip:
+                self._probing = False
+                return
+            self._consecutive_failures += 1
+            if self._probing or self._consecutive_failures >= self._settings.failure_threshold:
+                if self._probing:
+                    self._open_for = min(self._settings.max_open_seconds, self._open_for * 2)
+                self._open_until = time.monotonic() + self._open_for
+                self._probing = False
+
+    def release(self) -> None:
+        """Give back a slot claimed with ``begin`` that was never used, e.g. because the rate limiter said wait."""
+        with self._lock:
+            self._probing = False
+
+    def won_hedge(self) -> None:
+        with self._lock:
+            self._hedge_wins += 1
+
+    def score(self) -> float:
+        """Expected seconds to first byte, inflated by the error rate.
+
+        Unmeasured backends score 0 so each gets tried; one that never answers is left to the circuit breaker.
+        """
+        with self._lock:
+            return (self._latency or 0.0) * (1 + _ERROR_PENALTY * self._error_rate)
+
+    def reopens_at(self) -> float:
+        with self._lock:
+            return self._open_until
+
+    def hedge_delay(self) -> float:
+        settings = self._settings
+        with self._lock:
+            if settings.hedge_after_ms is not None:
+                delay = settings.hedge_after_ms / 1000
+            elif len(self._samples) >= _MIN_HEDGE_SAMPLES:
+                ordered = sorted(self._samples)
+                delay = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            else:
+                delay = 2 * self._latency if self._latency is not None else 0.0
+        return max(settings.hedge_min_ms / 1000, delay)
+
+    def state(self, model: str) -> BackendState:
+        with self._lock:
+            if self._open_until == 0.0:
+                circuit = CIRCUIT_CLOSED
+            elif self._probing or time.monotonic() >= self._open_until:
+                circuit = CIRCUIT_HALF_OPEN
+            else:
+                circuit = CIRCUIT_OPEN
+            return BackendState(
+                model=model,
+                circuit=circuit,
+                latency_ms=self._latency * 1000 if self._latency is not None else None,
+                error_rate=self._error_rate,
+                requests=self._requests,
+                failures=self._failures,
+                hedge_wins=self._hedge_wins,
+            )
+
+
+class Backend:
+    """One OpenAI-compatible endpoint: its settings, connection pool, rate limiter and health."""
+
+    def __init__(self, settings: OpenAISettings, limiter: KeyLimiter, routing: RoutingSettings) -> None:
+        self.settings = settings
+        self.limiter = limiter
+        self.health = BackendHealth(routing)
+        self._transport_lock = threading.Lock()
+        self._transport_instance: Optional[HTTPTransport] = None
+
+    @property
+    def name(self) -> str:
+        return self.settings.name
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.settings.api_key) or self.settings.auth == "none"
+
+    @property
+    def transport(self) -> HTTPTransport:
+        transport = self._transport_instance
+        if transport is None:
+            with self._transport_lock:
+                if self._transport_instance is None:
+                    # requests/urllib3 take a noticeable slice of startup; pay for them on first use or warm-up.
+                    from .transport import HTTPTransport
+
+                    self._transport_instance = HTTPTransport(self.settings)
+                transport = self._transport_instance
+        return transport
+
+    @property
+    def started(self) -> bool:
+        return self._transport_instance is not None
+
+    def headers(self) -> dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.settings.auth == "api-key":
+            # Azure OpenAI authenticates with its own header rather than a bearer token.
+            headers["api-key"] = self.settings.api_key or ""
+        elif self.settings.auth != "none":
+            headers["Authorization"] = f"Bearer {self.settings.api_key}"
+        return headers
+
+    def close(self) -> None:
+        if self._transport_instance is not None:
+            self._transport_instance.close()
+
+
+class Router:
+    """Orders backends for each request: healthy ones fastest first, in configuration order on ties."""
+
+    def __init__(self, backends: Sequence[Backend]) -> None:
+        self.backends = tuple(backends)
+
+    @property
+    def configured(self) -> bool:
+        return any(backend.configured for backend in self.backends)
+
+    def candidates(self) -> list[Backend]:
+        usable = [backend for backend in self.backends if backend.configured]
+        now = time.monotonic()
+        healthy = [backend for backend in usable if backend.health.available(now)]
+        if not healthy:
+            # Everything is circuit-broken; rather than fail without trying, knock on the one that reopens first.
+            return sorted(usable, key=lambda backend: backend.health.reopens_at())[:1]
+        ranked = sorted(enumerate(healthy), key=lambda item: (item[1].health.score(), item[0]))
+        return [backend for _, backend in ranked]
+
+    def states(self) -> dict[str, BackendState]:
+        return {backend.name: backend.health.state(backend.settings.model) for backend in self.backends}
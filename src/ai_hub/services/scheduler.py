@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+import contextvars
+import hashlib
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from functools import partial
+from typing import Callable, Hashable, Optional, Sequence
+
+from ..config import ChunkingSettings, SchedulerSettings
+from .chunking import ChunkedPrompt, estimate_tokens
+from .edits import run_prompt
+from .openai_client import OpenAIClient
+from .prompt_manager import Prompt
+from .tracing import tracer
+
+
+_log = logging.getLogger(__name__)
+
+ResultCallback = Callable[[str], None]
+
+# Replace-style actions all paste into "whatever is selected right now"; a newer one makes older results stale.
+SELECTION_TARGET = "selection"
+
+
+def _digest(selection: str) -> str:
+    return hashlib.sha1(selection.encode("utf-8")).hexdigest()
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 10
+
+
+@dataclass(slots=True, frozen=True)
+class SchedulerStats:
+    queued: int
+    running: int
+    completed: int
+    cancelled: int
+    coalesced: int
+    stale_dropped: int
+
+
+class RequestHandle:
+    def __init__(self) -> None:
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+        self._children: list[RequestHandle] = []
+        self._lock = threading.Lock()
+        self._done_callbacks: list[Callable[[RequestHandle], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        for child in list(self._children):
+            child.cancel()
+
+    def add_child(self, handle: RequestHandle) -> None:
+        """Cancel *handle* together with this one (used for multi-job requests such as chunked prompts)."""
+        self._children.append(handle)
+        if self.cancelled:
+            handle.cancel()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def add_done_callback(self, fn: Callable[[RequestHandle], None]) -> None:
+        """Call ``fn(handle)`` once the request completes or is dropped as cancelled; at once if it already has."""
+        with self._lock:
+            if not self._done.is_set():
+                self._done_callbacks.append(fn)
+                return
+        fn(self)
+
+    def _set_done(self) -> None:
+        with self._lock:
+            self._done.set()
+            callbacks, self._done_callbacks = self._done_callbacks, []
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception:  # pragma: no cover - keep the worker alive
+                _log.exception("Done callback failed")
+
+
+@dataclass(slots=True, eq=False)
+class _Job:
+    fn: Callable[[], str]
+    callbacks: list[ResultCallback]
+    handle: RequestHandle
+    priority: Priority
+    key: Optional[Hashable]
+    group: Optional[str]
+    target: Optional[str]
+    generation: int = 0
+    # Identifies the job's live queue entry; entries left behind by a priority raise carry an older one.
+    seq: int = 0
+    queued: bool = False
+    # Carries the submitter's trace onto the worker thread.
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)
+    submitted_us: float = field(default_factory=lambda: time.perf_counter_ns() / 1000)
+
+
+class RequestScheduler:
+    """Fixed pool of workers with priorities, per-group limits, coalescing and cancellation."""
+
+    def __init__(self, settings: SchedulerSettings, chunking: Optional[ChunkingSettings] = None) -> None:
+        self._settings = settings
+        self._chunking = chunking if chunking is not None and chunking.enabled else None
+        self._lock = threading.Lock()
+        self._queue: queue.PriorityQueue[tuple[int, int, Optional[_Job]]] = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._inflight: dict[Hashable, _Job] = {}
+        self._jobs: set[_Job] = set()
+        self._active: set[_Job] = set()
+        self._group_running: dict[str, int] = defaultdict(int)
+        self._group_deferred: dict[str, deque[_Job]] = defaultdict(deque)
+        self._generations: dict[str, int] = defaultdict(int)
+        self._queued = 0
+        self._completed = 0
+        self._cancelled = 0
+        self._coalesced = 0
+        self._stale_dropped = 0
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"ai-hub-worker-{i}", daemon=True)
+            for i in range(max(1, settings.workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(
+        self,
+        fn: Callable[[], str],
+        on_result: Optional[ResultCallback] = None,
+        *,
+        priority: Priority = Priority.INTERACTIVE,
+        key: Optional[Hashable] = None,
+        group: Optional[str] = None,
+        target: Optional[str] = None,
+    ) -> RequestHandle:
+        """Queue *fn*; *on_result* runs on the worker thread unless the job was cancelled or went stale.
+
+        Jobs sharing *key* while one is still in flight are coalesced into a single call.
+        Jobs sharing *group* are limited to ``per_group_limit`` concurrent runs.
+        A newer job for the same *target* makes older results for that target stale.
+        """
+        callbacks = [on_result] if on_result else []
+        with self._lock:
+            generation = self._next_generation(target)
+            existing = self._inflight.get(key) if key is not None else None
+            if existing is not None and not existing.handle.cancelled:
+                if target is not None:
+                    # Only the newest submitter pastes; two callbacks would paste the same result twice.
+                    existing.callbacks = callbacks
+                else:
+                    existing.callbacks.extend(callbacks)
+                # A speculative job has no target of its own; the caller that joins it brings one.
+                existing.target = existing.target or target
+                existing.generation = generation
+                if existing.queued and priority < existing.priority:
+                    # Enter on a still-queued speculative job: it must not keep waiting behind background work.
+                    existing.priority = priority
+                    existing.seq = next(self._seq)
+                    self._queue.put((int(priority), existing.seq, existing))
+                self._coalesced += 1
+                return existing.handle
+
+            job = _Job(fn, callbacks, RequestHandle(), priority, key, group, target, generation, next(self._seq))
+            if key is not None:
+                self._inflight[key] = job
+            self._jobs.add(job)
+            self._enqueue(job)
+            return job.handle
+
+    def submit_prompt(
+        self,
+        client: OpenAIClient,
+        prompt: Prompt,
+        selection: str,
+        on_result: ResultCallback,
+        *,
+        standalone: bool = False,
+        priority: Optional[Priority] = None,
+    ) -> RequestHandle:
+        """Schedule *prompt* on *selection*; replace prompts outrank popup prompts.
+
+        Selections over the chunking budget are split and processed as concurrent chunk jobs.
+        *standalone* jobs (text handed over by a script rather than what is selected on screen) run at
+        background priority unless *priority* says otherwise, and have no paste target, so they never
+        make each other stale.
+        """
+        pastes = prompt.replace and not standalone
+        if priority is None:
+            priority = Priority.INTERACTIVE if pastes else Priority.BACKGROUND
+        target = SELECTION_TARGET if pastes else None
+        with tracer.ensure_action("prompt"):
+            tracer.annotate(prompt=prompt.name)
+            if self.needs_chunking(selection):
+                return ChunkedPrompt(self, client, prompt, selection, on_result, self._chunking, priority=priority, target=target).start()
+            return self.submit(
+                partial(run_prompt, client, prompt, selection),
+                on_result,
+                priority=priority,
+                key=(prompt.name, _digest(selection)),
+                group=prompt.name,
+                target=target,
+            )
+
+    def speculate(self, client: OpenAIClient, prompt: Prompt, selection: str) -> Optional[RequestHandle]:
+        """Start *prompt* on *selection* before anyone asked for it; None if it does not qualify.
+
+        The job shares ``submit_prompt``'s coalescing key, so choosing the prompt later joins it while it runs
+        and finds its reply in the response cache afterwards. Only prompts whose replies the client caches
+        qualify, and never chunked selections. Cancelling the handle drops a job that has not started yet.
+        """
+        if not client.caches(prompt.temperature) or self.needs_chunking(selection):
+            return None
+        with tracer.action("speculate", prompt=f"{prompt.name} (speculative)"):
+            return self.submit(
+                partial(run_prompt, client, prompt, selection),
+                priority=Priority.BACKGROUND,
+                key=(prompt.name, _digest(selection)),
+                group=prompt.name,
+            )
+
+    def fan_out(
+        self,
+        client: OpenAIClient,
+        prompts: Sequence[Prompt],
+        selection: str,
+        on_result: Callable[[int, str], None],
+    ) -> list[RequestHandle]:
+        """Run several prompts concurrently on one captured selection.
+
+        Results go to ``on_result(index, output)`` rather than a paste target, so they never make each other stale.
+        Each prompt is traced as its own action so per-prompt latencies stay separate.
+        """
+        chunked = self.needs_chunking(selection)
+        digest = _digest(selection)
+        handles = []
+        for index, prompt in enumerate(prompts):
+            with tracer.action("compare", prompt=prompt.name):
+                if chunked:
+                    handle = ChunkedPrompt(
+                        self, client, prompt, selection, partial(on_result, index), self._chunking, priority=Priority.INTERACTIVE, target=None
+                    ).start()
+                else:
+                    handle = self.submit(
+                        partial(run_prompt, client, prompt, selection),
+                        partial(on_result, index),
+                        priority=Priority.INTERACTIVE,
+                        key=("fan-out", prompt.name, digest),
+                        group=prompt.name,
+                    )
+            handles.append(handle)
+        return handles
+
+    def claim_target(self, target: str) -> int:
+        """Mark a new result as pending for *target*, making earlier ones stale; returns its generation."""
+        with self._lock:
+            return self._next_generation(target)
+
+    def is_current(self, target: str, generation: int) -> bool:
+        with self._lock:
+            return self._generations[target] == generation
+
+    def needs_chunking(self, selection: str) -> bool:
+        return self._chunking is not None and estimate_tokens(selection) > self._chunking.chunk_tokens
+
+    def cancel_all(self) -> int:
+        """Cancel every queued and running job; running calls finish but their results are dropped."""
+        with self._lock:
+            jobs = list(self._jobs)
+        count = 0
+        for job in jobs:
+            if not job.handle.cancelled:
+                job.handle.cancel()
+                count += 1
+        return count
+
+    def stats(self) -> SchedulerStats:
+        with self._lock:
+            return SchedulerStats(
+                self._queued,
+                len(self._active),
+                self._completed,
+                self._cancelled,
+                self._coalesced,
+                self._stale_dropped,
+            )
+
+    def shutdown(self) -> None:
+        self.cancel_all()
+        for _ in self._workers:
+            self._queue.put((-1, next(self._seq), None))
+
+    def _next_generation(self, target: Optional[str]) -> int:
+        if target is None:
+            return 0
+        self._generations[target] += 1
+        return self._generations[target]
+
+    def _enqueue(self, job: _Job) -> None:
+        self._queued += 1
+        job.queued = True
+        self._queue.put((int(job.priority), job.seq, job))
+
+    def _worker(self) -> None:
+        while True:
+            _, seq, job = self._queue.get()
+            if job is None:
+                return
+            with self._lock:
+                if seq != job.seq or not job.queued:
+                    # Superseded by a higher-priority entry for the same job.
+                    continue
+                job.queued = False
+                self._queued -= 1
+                cancelled = job.handle.cancelled
+                if cancelled:
+                    self._finish_locked(job, cancelled=True)
+                elif job.group is not None and self._group_running[job.group] >= self._settings.per_group_limit:
+                    self._group_deferred[job.group].append(job)
+                    continue
+                else:
+                    if job.group is not None:
+                        self._group_running[job.group] += 1
+                    self._active.add(job)
+            if cancelled:
+                # Outside the lock: done callbacks may call back into the scheduler.
+                job.handle._set_done()
+            else:
+                self._run(job)
+
+    def _run(self, job: _Job) -> None:
+        started = time.perf_counter_ns() / 1000
+        job.context.run(tracer.record, "queue.wait", job.submitted_us, started - job.submitted_us)
+        try:
+            output = job.context.run(job.fn)
+        except Exception as exc:  # pragma: no cover - defensive; client returns error strings
+            _log.exception("Request job failed")
+            # An error reply (is_error_reply), so replace-mode delivers never paste it into the document.
+            output = f"Request failed: {exc}"
+
+        with self._lock:
+            self._active.discard(job)
+            stale = job.target is not None and self._generations[job.target] != job.generation
+            cancelled = job.handle.cancelled
+            callbacks = list(job.callbacks)
+            if stale and not cancelled:
+                self._stale_dropped += 1
+            if job.group is not None:
+                self._group_running[job.group] -= 1
+                deferred = self._group_deferred[job.group]
+                if deferred:
+                    self._enqueue(deferred.popleft())
+            self._finish_locked(job, cancelled=cancelled)
+
+        if not cancelled and not stale:
+            for callback in callbacks:
+                try:
+                    job.context.run(callback, output)
+                except Exception:  # pragma: no cover - keep the worker alive
+                    _log.exception("Result callback failed")
+        # After the callbacks, so whoever waits on the handle finds the result delivered.
+        job.handle._set_done()
+
+    def _finish_locked(self, job: _Job, *, cancelled: bool) -> None:
+        self._jobs.discard(job)
+        if job.key is not None and self._inflight.get(job.key) is job:
+            del self._inflight[job.key]
+        if cancelled:
+            self._cancelled += 1
+        else:
+            self._completed += 1
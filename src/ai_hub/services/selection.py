@@ -1,12 +1,22 @@
 from __future__ import annotations
 
+import os
+import shutil
+import subprocess
+import sys
 import time
 from contextlib import contextmanager
 from dataclasses import dataclass
+from typing import Optional, Protocol
+
+from ..config import SelectionSettings
+from .clipboard_timing import ClipboardTiming
+from .tracing import tracer
 
 try:
     import win32clipboard as wcb
     import win32con
+    import win32gui
     HAVE_WIN32 = True
 except Exception:  # pragma: no cover - fallback on non-Windows
     HAVE_WIN32 = False
@@ -26,6 +36,71 @@ except ImportError as exc:  # pragma: no cover
 @dataclass(slots=True)
 class SelectionResult:
     text: str
+    source: str = "clipboard"
+
+
+class SelectionBackend(Protocol):
+    name: str
+
+    def available(self) -> bool:
+        """Whether this backend can run in the current session."""
+
+    def capture(self, select_all: bool = True) -> Optional[str]:
+        """Return the highlighted text, or None to let the next backend try.
+
+        With *select_all*, a backend that can may select everything when nothing is highlighted.
+        """
+
+
+# Nothing signals when the target app has read the clipboard on Ctrl+V, and copy latency says nothing about it;
+# restoring the user's clipboard too early pastes the old contents, so this stays fixed rather than learned.
+_PASTE_SETTLE = 0.04
+
+_timing = ClipboardTiming(SelectionSettings())
+_backends: list[SelectionBackend] = []
+
+
+def configure(settings: SelectionSettings) -> None:
+    global _timing, _backends
+    _timing = ClipboardTiming(settings)
+    candidates: list[SelectionBackend] = [ClipboardBackend()]
+    if settings.backend == "primary":
+        # Opt-in: PRIMARY keeps whatever was last highlighted in any window, even once nothing is selected,
+        # so a replace prompt may rewrite stale text and paste it at the cursor.
+        candidates.insert(0, PrimarySelectionBackend())
+    _backends = [backend for backend in candidates if backend.available()]
+
+
+def register_backend(backend: SelectionBackend, *, first: bool = True) -> None:
+    if backend.available():
+        _backends.insert(0 if first else len(_backends), backend)
+
+
+def active_backends() -> list[str]:
+    return [backend.name for backend in _backends]
+
+
+def capture_timing() -> ClipboardTiming:
+    return _timing
+
+
+def _foreground_app() -> str:
+    """Key for per-application timing; the foreground window class on Windows."""
+    if HAVE_WIN32:
+        try:
+            return win32gui.GetClassName(win32gui.GetForegroundWindow()) or "default"
+        except Exception:  # pragma: no cover - window vanished mid-call
+            return "default"
+    return "default"
+
+
+def _clipboard_token() -> object:
+    """Cheap value that changes whenever the clipboard does."""
+    if HAVE_WIN32:
+        return wcb.GetClipboardSequenceNumber()
+    if HAVE_PYPERCLIP:
+        return pyperclip.paste()
+    return None
 
 
 @contextmanager
@@ -80,25 +155,90 @@ def _read_clipboard_text() -> str:
     return ""
 
 
-def get_selection() -> SelectionResult:
-    with _preserve_clipboard():
-        _clear_clipboard()
-        keyboard.send("ctrl+c")
-        time.sleep(0.08)
-        text = _read_clipboard_text()
-        if text.strip():
-            return SelectionResult(text)
+def _copy_and_wait(app: str) -> str:
+    before = _clipboard_token()
+    keyboard.send("ctrl+c")
+    if not _timing.wait_for(lambda: _clipboard_token() != before, app):
+        return ""
+    return _read_clipboard_text()
+
+
+class ClipboardBackend:
+    """Ctrl+C round trip through the clipboard, falling back to Ctrl+A when nothing is highlighted."""
+
+    name = "clipboard"
+
+    def available(self) -> bool:
+        return True
+
+    def capture(self, select_all: bool = True) -> Optional[str]:
+        app = _foreground_app()
+        with _preserve_clipboard():
+            _clear_clipboard()
+            text = _copy_and_wait(app)
+            if text.strip() or not select_all:
+                return text
+
+            # The target app handles ctrl+a before ctrl+c, so no pause is needed between them.
+            keyboard.send("ctrl+a")
+            return _copy_and_wait(app)
+
 
-        keyboard.send("ctrl+a")
-        time.sleep(0.06)
-        keyboard.send("ctrl+c")
-        time.sleep(0.08)
-        text = _read_clipboard_text()
-        return SelectionResult(text)
+class PrimarySelectionBackend:
+    """Reads the X11/Wayland PRIMARY selection, i.e. whatever is highlighted, without sending keys."""
+
+    name = "primary"
+
+    def __init__(self, timeout: float = 0.5) -> None:
+        self._timeout = timeout
+        self._command = self._find_command()
+
+    @staticmethod
+    def _find_command() -> Optional[list[str]]:
+        if not sys.platform.startswith("linux"):
+            return None
+        if os.environ.get("WAYLAND_DISPLAY") and shutil.which("wl-paste"):
+            return ["wl-paste", "--primary", "--no-newline"]
+        if os.environ.get("DISPLAY"):
+            if shutil.which("xclip"):
+                return ["xclip", "-o", "-selection", "primary"]
+            if shutil.which("xsel"):
+                return ["xsel", "--primary", "--output"]
+        return None
+
+    def available(self) -> bool:
+        return self._command is not None
+
+    def capture(self, select_all: bool = True) -> Optional[str]:
+        if self._command is None:
+            return None
+        try:
+            completed = subprocess.run(self._command, capture_output=True, timeout=self._timeout, check=False)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if completed.returncode != 0:
+            return None
+        return completed.stdout.decode("utf-8", errors="replace") or None
+
+
+def get_selection(*, select_all: bool = True) -> SelectionResult:
+    """The highlighted text; with *select_all* (the default), the whole field's text when nothing is highlighted.
+
+    Pass ``select_all=False`` for captures made before the user has chosen to act, so that merely opening
+    a picker never selects their whole document.
+    """
+    with tracer.span("get_selection") as span:
+        for backend in _backends:
+            text = backend.capture(select_all)
+            if text and text.strip():
+                span.update(source=backend.name, chars=len(text))
+                return SelectionResult(text, backend.name)
+        span["source"] = None
+        return SelectionResult("")
 
 
 def replace_selection(text: str) -> None:
-    with _preserve_clipboard():
+    with tracer.span("replace_selection", chars=len(text)), _preserve_clipboard():
         if HAVE_WIN32:
             wcb.OpenClipboard()
             wcb.EmptyClipboard()
@@ -107,7 +247,7 @@ def replace_selection(text: str) -> None:
         elif HAVE_PYPERCLIP:
             pyperclip.copy(text)
         keyboard.send("ctrl+v")
-        time.sleep(0.04)
+        time.sleep(_PASTE_SETTLE)
 
 
 def copy_to_clipboard(text: str) -> None:
@@ -118,3 +258,6 @@ def copy_to_clipboard(text: str) -> None:
         wcb.CloseClipboard()
     elif HAVE_PYPERCLIP:
         pyperclip.copy(text)
+
+
+configure(SelectionSettings())
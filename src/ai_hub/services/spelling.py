@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from importlib.resources import files
+from pathlib import Path
+from typing import Optional
+
+from ..config import SpellingSettings
+from .tracing import tracer
+
+
+_log = logging.getLogger(__name__)
+
+_DICTIONARY = "frequency_dictionary_en_82_765.txt"
+# SymSpell's prefix trick: only the first letters are indexed, the full word is compared on lookup.
+_PREFIX_LENGTH = 7
+_MAX_DISTANCE = 2
+# A distance-1 correction is taken only when it is this many times more common than the runner-up.
+_DOMINANCE = 5
+# Shorter words are corrected only by swapping two adjacent letters.
+_MIN_FREE_LENGTH = 5
+_WORD_RE = re.compile(r"[A-Za-z]+(?:['’][A-Za-z]+)*")
+# Characters that glue a word to code, paths, addresses or markup; such words are left alone.
+_GLUE = frozenset("/\\@_#$%<>{}[]=|~`*^+&")
+_SENTENCE_ENDS = frozenset(".!?\n")
+_APOSTROPHES = str.maketrans("’", "'")
+# Words whose misuse is grammar rather than spelling; when one appears the model decides.
+_CONFUSABLES = frozenset(
+    {
+        "their", "there", "they're", "your", "you're", "its", "it's", "whose", "who's", "then", "than",
+        "affect", "effect", "accept", "except", "loose", "lose", "lead", "led", "weather", "whether",
+    }
+)
+_OF_AFTER = frozenset({"could", "should", "would", "might", "must"})
+
+
+def _deletes(word: str) -> set[str]:
+    """*word*'s indexed prefix and every string one deletion away from it."""
+    prefix = word[:_PREFIX_LENGTH]
+    found = {prefix}
+    if len(prefix) > 1:
+        found.update(prefix[:i] + prefix[i + 1:] for i in range(len(prefix)))
+    return found
+
+
+def _key(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8")) << 32
+
+
+def distance(a: str, b: str, limit: int = _MAX_DISTANCE) -> int:
+    """Optimal-string-alignment distance (an adjacent swap counts as one edit); ``limit + 1`` once it is over *limit*."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: list[int] = []
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j, char_b in enumerate(b, 1):
+            cost = 0 if char_a == char_b else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class SpellIndex:
+    """Symmetric-delete index over a word-frequency list.
+
+    Deletes of each word's prefix are stored as sorted ``crc32 << 32 | word id`` integers in one flat array
+    (a few MB for 80k words, against ~90 MB for a dict of strings). A lookup probes the deletes of the query
+    and checks the real edit distance of whatever they hit, so hash collisions cost time, never accuracy.
+    One delete on each side finds every word within one edit and most within two.
+    """
+
+    def __init__(self, counts: dict[str, int]) -> None:
+        self.counts = counts
+        self._words = list(counts)
+        entries = [_key(variant) | word_id for word_id, word in enumerate(self._words) for variant in _deletes(word)]
+        entries.sort()
+        self._entries = array("Q", entries)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.counts
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def lookup(self, word: str) -> list[tuple[int, int, str]]:
+        """The closest words, one edit away if there are any, else two, as ``(distance, -count, word)``; best first."""
+        entries = self._entries
+        seen: set[int] = set()
+        for variant in _deletes(word):
+            key = _key(variant)
+            position = bisect_left(entries, key)
+            while position < len(entries) and entries[position] & ~0xFFFFFFFF == key:
+                seen.add(entries[position] & 0xFFFFFFFF)
+                position += 1
+        words = [self._words[word_id] for word_id in seen]
+        # Most hits are two edits away or more; a distance-1 pass rejects them early and usually settles it.
+        found = [(1, -self.counts[candidate], candidate) for candidate in words if distance(word, candidate, 1) <= 1]
+        if not found:
+            found = [(2, -self.counts[candidate], candidate) for candidate in words if distance(word, candidate) <= 2]
+        found.sort()
+        return found
+
+
+@dataclass(slots=True)
+class SpellCheck:
+    text: str
+    corrections: list[tuple[str, str]] = field(default_factory=list)
+    # Why the model has to look at the text after all; None when the local result stands.
+    escalate: Optional[str] = None
+
+
+def load_counts(user_dictionary: Optional[Path] = None) -> dict[str, int]:
+    counts: dict[str, int] = {}
+    with (files("ai_hub") / "data" / _DICTIONARY).open(encoding="utf-8") as handle:
+        for line in handle:
+            word, _, count = line.partition(" ")
+            counts[word] = int(count)
+    if user_dictionary is not None and user_dictionary.is_file():
+        # The user's own words always win a tie-break against the bundled list.
+        top = max(counts.values(), default=1)
+        for line in user_dictionary.read_text(encoding="utf-8").splitlines():
+            word = line.strip().lower().translate(_APOSTROPHES)
+            if word and not word.startswith("#"):
+                counts[word] = top
+    return counts
+
+
+def check(index: SpellIndex, text: str) -> SpellCheck:
+    """Fix unambiguous misspellings in *text*, or say why it needs the model."""
+    pieces: list[str] = []
+    corrections: list[tuple[str, str]] = []
+    position = 0
+    previous: Optional[str] = None
+    previous_end = 0
+    for match in _WORD_RE.finditer(text):
+        word, start, end = match.group(), match.start(), match.end()
+        before = text[start - 1] if start else " "
+        after = text[end] if end < len(text) else " "
+        following = text[end + 1] if end + 1 < len(text) else " "
+        preceding = text[start - 2] if start > 1 else " "
+        if (
+            before in _GLUE
+            or after in _GLUE
+            or before.isdigit()
+            or after.isdigit()
+            or (after in ".:" and following.isalnum())
+            or (before in ".:" and preceding.isalnum())
+        ):
+            previous = None
+            continue
+        lower = word.lower().translate(_APOSTROPHES)
+        if lower in _CONFUSABLES:
+            return SpellCheck(text, escalate=f"grammar-sensitive word {word!r}")
+        if previous is not None and not text[previous_end:start].strip():
+            if lower == "of" and previous in _OF_AFTER:
+                return SpellCheck(text, escalate=f"'{previous} of'")
+            if lower == previous and lower not in ("had", "that"):
+                return SpellCheck(text, escalate=f"repeated word {word!r}")
+            if previous in ("a", "an") and lower in index:
+                vowel = lower[0] in "aeiou"
+                if (previous == "a" and vowel and lower[0] not in "uo") or (previous == "an" and not vowel and lower[0] != "h"):
+                    return SpellCheck(text, escalate=f"'{previous} {word}'")
+        previous, previous_end = lower, end
+        if lower == "i" or (word[0] == "i" and lower.startswith("i'") and lower in index):
+            if word[0] == "I":
+                continue
+            replacement = "I" + word[1:]
+        elif lower in index or any(char.isupper() for char in word[1:]):
+            # Known, or an acronym / CamelCase identifier.
+            continue
+        elif word[0].isupper() and not _starts_sentence(text, start):
+            # Most likely a name; but one that looks like a typo of a known word ("Fridya") is for the model.
+            if _correction(index, lower) is not None:
+                return SpellCheck(text, escalate=f"capitalized unknown word {word!r}")
+            continue
+        else:
+            fix = _correction(index, lower)
+            if fix is None:
+                return SpellCheck(text, escalate=f"unknown word {word!r}")
+            replacement = fix.capitalize() if word[0].isupper() else fix
+        pieces.append(text[position:start])
+        pieces.append(replacement)
+        corrections.append((word, replacement))
+        position = end
+    pieces.append(text[position:])
+    return SpellCheck("".join(pieces), corrections)
+
+
+def _starts_sentence(text: str, start: int) -> bool:
+    stripped = text[:start].rstrip(" \t\"'(“‘")
+    return not stripped or stripped[-1] in _SENTENCE_ENDS
+
+
+def _correction(index: SpellIndex, word: str) -> Optional[str]:
+    if len(word) < 3:
+        return None
+    candidates = index.lookup(word)
+    # "dont" means "don't", however much more common "done" is (the list gives contractions a token count).
+    contraction = next((candidate for edits, _, candidate in candidates if edits == 1 and candidate.replace("'", "") == word), None)
+    if contraction is not None:
+        return contraction
+    if len(word) < _MIN_FREE_LENGTH:
+        # Short words are mostly one letter away from something common ("thx" -> "the"); only trust swaps ("teh").
+        candidates = [candidate for candidate in candidates if candidate[0] == 1 and sorted(candidate[2]) == sorted(word)]
+    if not candidates:
+        return None
+    best_distance, best_count, best = candidates[0]
+    rivals = [count for edits, count, _ in candidates[1:] if edits == best_distance]
+    if best_distance == 1:
+        return best if not rivals or -best_count >= _DOMINANCE * -rivals[0] else None
+    # Two edits away: only a long word with exactly one plausible reading.
+    return best if len(word) >= 6 and not rivals else None
+
+
+class LocalSpeller:
+    """Loads the index on a background thread on first use; until then every text goes to the model."""
+
+    def __init__(self, settings: SpellingSettings) -> None:
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._index: Optional[SpellIndex] = None
+        self._enabled = settings.local
+        self._loading = False
+
+    @property
+    def ready(self) -> bool:
+        return self._index is not None
+
+    def load(self) -> Optional[SpellIndex]:
+        with self._load_lock:
+            if self._index is None and self._enabled:
+                with tracer.span("spelling.load"):
+                    try:
+                        self._index = SpellIndex(load_counts(self.settings.user_dictionary))
+                    except (OSError, ValueError) as exc:
+                        _log.warning("Local spelling disabled; could not read the word lists: %s", exc)
+                        self._enabled = False
+            return self._index
+
+    def start_loading(self) -> None:
+        with self._lock:
+            if self._loading or self._index is not None or not self._enabled:
+                return
+            self._loading = True
+        threading.Thread(target=self.load, name="ai-hub-spelling", daemon=True).start()
+
+    def quick_fix(self, text: str) -> Optional[str]:
+        """The corrected text when local fixes are enough, else None (the caller asks the model)."""
+        if not self._enabled or len(text) > self.settings.max_chars:
+            return None
+        index = self._index
+        if index is None:
+            self.start_loading()
+            return None
+        with tracer.span("spelling.local") as span:
+            result = check(index, text)
+            span["corrections"] = len(result.corrections)
+            if result.escalate:
+                span["escalate"] = result.escalate
+        if result.escalate:
+            return None
+        tracer.annotate(spelling="local")
+        return result.text
+
+
+_speller = LocalSpeller(SpellingSettings())
+
+
+def configure(settings: SpellingSettings) -> None:
+    global _speller
+    _speller = LocalSpeller(settings)
+
+
+def quick_fix(text: str) -> Optional[str]:
+    return _speller.quick_fix(text)
+
+
+def warm_up() -> None:
+    """Build the index now; call off the UI thread."""
+    _speller.load()
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+
+_DEFAULT_CAPACITY = 20_000
+TOTAL_STAGE = "total"
+# Pipeline order, used to sort summaries; unknown stages sort after these.
+STAGES = (
+    "dispatch.wait",
+    "get_selection",
+    "spelling.local",
+    "queue.wait",
+    "request.build",
+    "cache.lookup",
+    "http",
+    "ratelimit.wait",
+    "retry.backoff",
+    "http.connect",
+    "http.ping",
+    "http.ttfb",
+    "first_token",
+    "generation",
+    "json.parse",
+    "edits.apply",
+    "edits.fallback",
+    "inject",
+    "replace_selection",
+    "gui.wait",
+    "popup.show",
+    "window.visible",
+    TOTAL_STAGE,
+)
+_STAGE_RANK = {stage: rank for rank, stage in enumerate(STAGES)}
+
+
+def _now_us() -> float:
+    return time.perf_counter_ns() / 1000
+
+
+@dataclass(slots=True, eq=False)
+class Trace:
+    """One user action (hotkey, hotstring, button press) and everything it caused."""
+
+    trace_id: int
+    kind: str
+    start_us: float
+    attrs: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(slots=True, frozen=True)
+class Span:
+    trace: Optional[Trace]
+    name: str
+    start_us: float
+    duration_us: float
+    thread_id: int
+    attrs: dict[str, Any]
+
+    def to_dict(self) -> dict[str, Any]:
+        trace = self.trace
+        return {
+            "trace_id": trace.trace_id if trace else None,
+            "action": trace.kind if trace else None,
+            "prompt": trace.attrs.get("prompt") if trace else None,
+            "stage": self.name,
+            "start_us": round(self.start_us, 1),
+            "duration_us": round(self.duration_us, 1),
+            "thread_id": self.thread_id,
+            **self.attrs,
+        }
+
+
+@dataclass(slots=True, frozen=True)
+class StageSummary:
+    prompt: str
+    stage: str
+    count: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+@dataclass(slots=True, frozen=True)
+class ThroughputSummary:
+    prompt: str
+    completion_tokens: int
+    tokens_per_second: float
+
+
+def _percentile(ordered: list[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("ai_hub_trace", default=None)
+
+
+class Tracer:
+    """Records per-action latency spans into a bounded in-memory ring.
+
+    The active trace lives in a context variable; ``RequestScheduler`` and ``InputDispatcher`` carry it across
+    threads, so spans from clipboard capture, HTTP and paste all land on the action that triggered them.
+    """
+
+    def __init__(self, capacity: int = _DEFAULT_CAPACITY) -> None:
+        self._lock = threading.Lock()
+        self._spans: deque[Span] = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+
+    @staticmethod
+    def current() -> Optional[Trace]:
+        return _current.get()
+
+    @contextmanager
+    def action(self, kind: str, *, received_ns: Optional[int] = None, **attrs: Any) -> Iterator[Trace]:
+        """Start a new trace; *received_ns* (``perf_counter_ns`` at receipt) records the dispatch wait."""
+        start = received_ns / 1000 if received_ns is not None else _now_us()
+        trace = Trace(next(self._ids), kind, start, dict(attrs))
+        token = _current.set(trace)
+        try:
+            if received_ns is not None:
+                self.record("dispatch.wait", start, _now_us() - start)
+            yield trace
+        finally:
+            _current.reset(token)
+
+    @contextmanager
+    def ensure_action(self, kind: str, **attrs: Any) -> Iterator[Trace]:
+        """Reuse the active trace, or start one when called outside any action."""
+        trace = _current.get()
+        if trace is not None:
+            yield trace
+            return
+        with self.action(kind, **attrs) as trace:
+            yield trace
+
+    def annotate(self, **attrs: Any) -> None:
+        trace = _current.get()
+        if trace is not None:
+            trace.attrs.update(attrs)
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[dict[str, Any]]:
+        """Time the block; callers may add attributes to the yielded dict before it closes."""
+        start = _now_us()
+        try:
+            yield attrs
+        finally:
+            self.record(name, start, _now_us() - start, **attrs)
+
+    def record(self, name: str, start_us: float, duration_us: float, **attrs: Any) -> None:
+        span = Span(_current.get(), name, start_us, duration_us, threading.get_ident(), attrs)
+        with self._lock:
+            self._spans.append(span)
+
+    def spans(self) -> list[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+    def export_jsonl(self, path: Path) -> int:
+        spans = self.spans()
+        with Path(path).open("w", encoding="utf-8") as handle:
+            for span in spans:
+                handle.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n")
+        return len(spans)
+
+    def export_chrome_trace(self, path: Path) -> int:
+        """Write the Trace Event Format understood by chrome://tracing and Perfetto."""
+        pid = os.getpid()
+        events = []
+        for span in self.spans():
+            data = span.to_dict()
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": data["prompt"] or data["action"] or "ai-hub",
+                    "ph": "X",
+                    "ts": span.start_us,
+                    "dur": span.duration_us,
+                    "pid": pid,
+                    "tid": span.thread_id,
+                    "args": data,
+                }
+            )
+        Path(path).write_text(json.dumps({"traceEvents": events}, default=str), encoding="utf-8")
+        return len(events)
+
+    def summary(self) -> list[StageSummary]:
+        """p50/p95/p99 per (prompt, stage), plus an end-to-end ``total`` stage per traced action."""
+        durations: dict[tuple[str, str], list[float]] = defaultdict(list)
+        trace_bounds: dict[int, tuple[Trace, float]] = {}
+        for span in self.spans():
+            trace = span.trace
+            prompt = str(trace.attrs.get("prompt", trace.kind)) if trace else "—"
+            durations[(prompt, span.name)].append(span.duration_us / 1000)
+            if trace is not None:
+                end = span.start_us + span.duration_us
+                known = trace_bounds.get(trace.trace_id)
+                if known is None or end > known[1]:
+                    trace_bounds[trace.trace_id] = (trace, end)
+        for trace, end in trace_bounds.values():
+            prompt = str(trace.attrs.get("prompt", trace.kind))
+            durations[(prompt, TOTAL_STAGE)].append((end - trace.start_us) / 1000)
+
+        rows = []
+        ordered = sorted(durations.items(), key=lambda item: (item[0][0], _STAGE_RANK.get(item[0][1], len(STAGES)), item[0][1]))
+        for (prompt, stage), values in ordered:
+            values.sort()
+            rows.append(
+                StageSummary(prompt, stage, len(values), _percentile(values, 50), _percentile(values, 95), _percentile(values, 99))
+            )
+        return rows
+
+    def throughput(self) -> list[ThroughputSummary]:
+        """Completion tokens per second of generation, from spans that carry usage data."""
+        tokens: dict[str, int] = defaultdict(int)
+        seconds: dict[str, float] = defaultdict(float)
+        for span in self.spans():
+            completion = span.attrs.get("completion_tokens")
+            if not completion:
+                continue
+            trace = span.trace
+            prompt = str(trace.attrs.get("prompt", trace.kind)) if trace else "—"
+            tokens[prompt] += int(completion)
+            seconds[prompt] += span.duration_us / 1_000_000
+        return [
+            ThroughputSummary(prompt, tokens[prompt], tokens[prompt] / seconds[prompt] if seconds[prompt] else 0.0)
+            for prompt in sorted(tokens)
+        ]
+
+
+tracer = Tracer()
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ..config import OpenAISettings
+from .tracing import tracer
+
+
+@dataclass(slots=True, frozen=True)
+class TransportStats:
+    requests: int
+    new_connections: int
+    reused_connections: int
+
+
+class _ConnectionCounter:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._new = 0
+        self._reused = 0
+
+    def record(self, reused: bool) -> None:
+        with self._lock:
+            if reused:
+                self._reused += 1
+            else:
+                self._new += 1
+
+    def snapshot(self) -> TransportStats:
+        with self._lock:
+            return TransportStats(self._new + self._reused, self._new, self._reused)
+
+
+class _CountingPoolMixin:
+    """Records whether each checked-out connection already has a live socket, and times every connect."""
+
+    counter: _ConnectionCounter
+
+    def _get_conn(self, timeout: float | None = None):
+        conn = super()._get_conn(timeout)  # type: ignore[misc]
+        self.counter.record(reused=getattr(conn, "sock", None) is not None)
+        return conn
+
+    def _new_conn(self):
+        conn = super()._new_conn()  # type: ignore[misc]
+        connect = conn.connect
+        host = self.host  # type: ignore[attr-defined]
+
+        def timed_connect() -> None:
+            # DNS, TCP and TLS handshakes; reconnects of a dropped keep-alive socket are timed too.
+            with tracer.span("http.connect", host=host):
+                connect()
+
+        conn.connect = timed_connect
+        return conn
+
+
+class _CountingAdapter(HTTPAdapter):
+    def __init__(self, counter: _ConnectionCounter, **kwargs: Any) -> None:
+        self._counter = counter
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: type(f"Counting{cls.__name__}", (_CountingPoolMixin, cls), {"counter": self._counter})
+            for scheme, cls in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+
+class HTTPTransport:
+    """Long-lived keep-alive session shared by every thread that talks to the API."""
+
+    def __init__(self, settings: OpenAISettings):
+        self._settings = settings
+        self._counter = _ConnectionCounter()
+        # Connection-level retries only; status retries (429/5xx) go through OpenAIClient's rate limiter.
+        # Only failures to connect are retried: after a read error the server may already be generating, and a
+        # second chat POST would bill the same completion twice.
+        retries = Retry(
+            total=settings.max_retries,
+            read=0,
+            respect_retry_after_header=False,
+            backoff_factor=settings.retry_backoff,
+            allowed_methods=frozenset({"GET", "POST"}),
+            raise_on_status=False,
+        )
+        adapter = _CountingAdapter(
+            self._counter,
+            pool_connections=settings.pool_connections,
+            pool_maxsize=settings.pool_maxsize,
+            max_retries=retries,
+        )
+        self._session = requests.Session()
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+    @property
+    def stats(self) -> TransportStats:
+        return self._counter.snapshot()
+
+    def post(self, url: str, *, headers: dict[str, str], json: Any, **kwargs: Any) -> requests.Response:
+        kwargs.setdefault("timeout", (self._settings.connect_timeout, self._settings.timeout))
+        return self._session.post(url, headers=headers, json=json, **kwargs)
+
+    def ping(self, url: str) -> None:
+        """Open, or keep open, a pooled connection to *url*'s host with a body-less HEAD request."""
+        timeout = self._settings.connect_timeout
+        with tracer.span("http.ping"):
+            # Not streamed, so the (empty) body is read and the connection goes straight back to the pool.
+            self._session.head(url, timeout=(timeout, timeout))
+
+    def close(self) -> None:
+        self._session.close()
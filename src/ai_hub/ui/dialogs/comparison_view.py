@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import time
+from typing import Optional, Sequence
+
+from PySide6.QtCore import Qt, Signal, Slot
+from PySide6.QtWidgets import (
+    QDialog,
+    QHBoxLayout,
+    QLabel,
+    QPushButton,
+    QVBoxLayout,
+)
+
+from ...services.openai_client import OpenAIClient, is_error_reply
+from ...services.prompt_manager import Prompt
+from ...services.scheduler import SELECTION_TARGET, Priority, RequestHandle, RequestScheduler
+from ...services.selection import replace_selection
+from ..text_view import TextView
+
+
+class ComparisonView(QDialog):
+    """Side-by-side results of several prompts run concurrently on the same selection."""
+
+    result_ready = Signal(int, str)
+
+    # Non-modal dialogs without a parent need a live Python reference until they close.
+    _open_views: set[ComparisonView] = set()
+
+    def __init__(self, scheduler: RequestScheduler, prompts: Sequence[Prompt]):
+        super().__init__()
+        self._scheduler = scheduler
+        self._prompts = prompts
+        self._results: list[Optional[str]] = [None] * len(prompts)
+        self._handles: list[RequestHandle] = []
+        self._started = time.perf_counter()
+        self.setWindowTitle("Compare prompts")
+        self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.Tool)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self._build_ui()
+        self.result_ready.connect(self._on_result)
+        self.finished.connect(self._on_finished)
+
+    @classmethod
+    def run(cls, client: OpenAIClient, scheduler: RequestScheduler, prompts: Sequence[Prompt], selection: str) -> ComparisonView:
+        view = cls(scheduler, prompts)
+        cls._open_views.add(view)
+        view._handles = scheduler.fan_out(client, prompts, selection, view.result_ready.emit)
+        view.show()
+        return view
+
+    def _build_ui(self) -> None:
+        layout = QVBoxLayout(self)
+        self._summary = QLabel(f"Running {len(self._prompts)} prompts…", self)
+        layout.addWidget(self._summary)
+
+        columns = QHBoxLayout()
+        self._statuses: list[QLabel] = []
+        self._outputs: list[TextView] = []
+        self._buttons: list[QPushButton] = []
+        for index, prompt in enumerate(self._prompts):
+            column = QVBoxLayout()
+            column.addWidget(QLabel(f"<b>{prompt.name}</b>", self))
+            status = QLabel("Waiting…", self)
+            column.addWidget(status)
+            output = TextView(self)
+            column.addWidget(output)
+            button = QPushButton("Replace with this", self)
+            button.setEnabled(False)
+            button.clicked.connect(lambda _=False, i=index: self._use(i))
+            column.addWidget(button)
+            columns.addLayout(column)
+            self._statuses.append(status)
+            self._outputs.append(output)
+            self._buttons.append(button)
+        layout.addLayout(columns)
+
+        close_button = QPushButton("Close", self)
+        close_button.clicked.connect(self.reject)
+        layout.addWidget(close_button)
+        self.resize(min(1600, 420 * len(self._prompts)), 480)
+
+    @Slot(int, str)
+    def _on_result(self, index: int, output: str) -> None:
+        elapsed = time.perf_counter() - self._started
+        self._results[index] = output
+        self._outputs[index].set_text(output)
+        failed = is_error_reply(output)
+        self._statuses[index].setText("Failed" if failed else f"Done in {elapsed:.1f} s")
+        self._buttons[index].setEnabled(bool(output.strip()) and not failed)
+        done = sum(result is not None for result in self._results)
+        if done == len(self._results):
+            self._summary.setText(f"All {done} prompts finished in {elapsed:.1f} s")
+        else:
+            self._summary.setText(f"{done} of {len(self._results)} prompts finished…")
+
+    def _use(self, index: int) -> None:
+        text = self._results[index]
+        if not text:
+            return
+
+        def paste() -> str:
+            replace_selection(text)
+            return text
+
+        # Closing first hands focus back to the window the selection came from.
+        self.accept()
+        self._scheduler.submit(paste, priority=Priority.INTERACTIVE, target=SELECTION_TARGET)
+
+    @Slot(int)
+    def _on_finished(self, _result: int) -> None:
+        for handle in self._handles:
+            handle.cancel()
+        ComparisonView._open_views.discard(self)
@@ -1,49 +1,112 @@
 from __future__ import annotations
 
-import threading
+import time
+from typing import Callable, Optional
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer, Signal
 from PySide6.QtGui import QCursor
-from PySide6.QtWidgets import (
-    QDialog,
-    QLabel,
-    QListWidget,
-    QListWidgetItem,
-    QVBoxLayout,
-)
-
-from ...services.openai_client import OpenAIClient
+from PySide6.QtWidgets import QDialog, QLabel, QVBoxLayout
+
+from ...config import NavigatorSettings
+from ...services.openai_client import OpenAIClient, is_error_reply
+from ...services.prompt_library import PromptLibrary
 from ...services.prompt_manager import Prompt
+from ...services.scheduler import RequestHandle, RequestScheduler
 from ...services.selection import get_selection, replace_selection
-from .result_popup import ResultPopup
+from ...services.tracing import tracer
+from ..prompt_picker import PromptPicker
+from .comparison_view import ComparisonView
+from ..gui_dispatcher import show_window
+from .result_popup import ResultPopupPool
+
+
+# Speculative runs per opening; walking the list slowly should not start a request for every row.
+_MAX_SPECULATIONS = 3
+# Time for the user's application to get focus back once the navigator closes, before Ctrl+A reaches it.
+_FOCUS_RETURN_S = 0.1
 
 
 class PromptNavigator(QDialog):
-    def __init__(self, client: OpenAIClient, prompts: list[Prompt]):
+    """Prompt picker at the mouse, for the selection captured when it opened.
+
+    With ``speculate`` on, the highlighted deterministic prompt starts running while the user is still
+    choosing; choosing it joins that job, choosing another cancels it.
+    """
+
+    # (run, text): a selection captured on a worker, handed back to the Qt thread.
+    _captured = Signal(object, str)
+
+    def __init__(
+        self,
+        client: OpenAIClient,
+        scheduler: RequestScheduler,
+        prompts: PromptLibrary,
+        popups: ResultPopupPool,
+        settings: Optional[NavigatorSettings] = None,
+    ):
         super().__init__()
         self._client = client
+        self._scheduler = scheduler
         self._prompts = prompts
+        self._popups = popups
+        self._settings = settings or NavigatorSettings()
+        self._selection = ""
+        self._speculation: Optional[tuple[Prompt, RequestHandle]] = None
+        self._speculations = 0
+        self._speculate_timer = QTimer(self)
+        self._speculate_timer.setSingleShot(True)
+        self._speculate_timer.setInterval(self._settings.speculate_delay_ms)
+        self._speculate_timer.timeout.connect(self._speculate)
+        self._captured.connect(lambda run, text: run(text))
         self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.Tool | Qt.FramelessWindowHint)
         self.setWindowTitle("Prompt Navigator")
         self._build_ui()
 
     def _build_ui(self) -> None:
         layout = QVBoxLayout(self)
-        self.prompt_list = QListWidget(self)
-        for prompt in self._prompts:
-            QListWidgetItem(prompt.name, self.prompt_list)
-        layout.addWidget(self.prompt_list)
-        layout.addWidget(QLabel("Enter to run • Esc to close"))
-        self.prompt_list.itemDoubleClicked.connect(lambda _: self.run_selected())
-        self.prompt_list.setCurrentRow(0)
-
-    def show_near_cursor(self) -> None:
-        pos = QCursor.pos()
-        self.move(pos)
-        self.show()
-        self.raise_()
-        self.activateWindow()
-        self.prompt_list.setFocus()
+        self.picker = PromptPicker(self._prompts, self)
+        self.picker.activated.connect(self.run_selected)
+        if self._settings.speculate:
+            self.picker.highlighted.connect(self._speculate_timer.start)
+        layout.addWidget(self.picker)
+        layout.addWidget(QLabel("Type to filter • Enter to run • Ctrl+click several to compare • Esc to close"))
+
+    def show_near_cursor(self, selection: str) -> None:
+        """Qt thread only; hotkeys reach it through ``GuiDispatcher.post``.
+
+        *selection* must be captured before the navigator takes focus, or the copy would target the navigator.
+        """
+        self._selection = selection
+        self._speculations = 0
+        self.move(QCursor.pos())
+        self.picker.reset()
+        show_window(self)
+        if self._settings.speculate:
+            self._speculate_timer.start()
+
+    def hideEvent(self, event):  # pragma: no cover - Qt
+        self._speculate_timer.stop()
+        self._cancel_speculation()
+        # Do not keep the user's text around while the navigator sits hidden.
+        self._selection = ""
+        super().hideEvent(event)
+
+    def _speculate(self) -> None:
+        prompt = self.picker.current_prompt()
+        if self._speculation is not None and self._speculation[0] is prompt:
+            return
+        self._cancel_speculation()
+        if prompt is None or not self._selection.strip() or self._speculations >= _MAX_SPECULATIONS:
+            return
+        handle = self._scheduler.speculate(self._client, prompt, self._selection)
+        if handle is not None:
+            self._speculation = (prompt, handle)
+            self._speculations += 1
+
+    def _cancel_speculation(self) -> None:
+        if self._speculation is not None:
+            self._speculation[1].cancel()
+            self._speculation = None
 
     def keyPressEvent(self, event):  # pragma: no cover - Qt
         if event.key() in (Qt.Key_Return, Qt.Key_Enter):
@@ -55,24 +118,48 @@ class PromptNavigator(QDialog):
         super().keyPressEvent(event)
 
     def run_selected(self) -> None:
-        index = self.prompt_list.currentRow()
-        if index < 0:
+        with tracer.action("navigator"):
+            self._run_selected()
+
+    def _run_selected(self) -> None:
+        selection = self._selection
+        chosen = self.picker.selected_prompts()
+        if len(chosen) > 1:
             self.close()
+            self._with_selection(selection, lambda text: ComparisonView.run(self._client, self._scheduler, chosen, text))
             return
-        prompt = self._prompts[index]
-        selection = get_selection().text
-        if not selection.strip():
+
+        prompt = self.picker.current_prompt()
+        if prompt is None:
             self.close()
             return
 
-        def run() -> None:
-            output = self._client.chat(prompt.system or None, prompt.build_message(selection), prompt.temperature)
+        def deliver(output: str) -> None:
             if not output.strip():
                 return
-            if prompt.replace:
+            if prompt.replace and not is_error_reply(output):
                 replace_selection(output)
             else:
-                ResultPopup.show_text(prompt.name, output)
+                # An error is shown, never pasted over the user's text.
+                self._popups.show_text(prompt.name, output)
 
-        threading.Thread(target=run, daemon=True).start()
+        if self._speculation is not None and self._speculation[0] is prompt:
+            # submit_prompt joins the speculative job; closing must not cancel it.
+            self._speculation = None
         self.close()
+        self._with_selection(selection, lambda text: self._scheduler.submit_prompt(self._client, prompt, text, deliver))
+
+    def _with_selection(self, selection: str, run: Callable[[str], object]) -> None:
+        """Call *run* with *selection* on the Qt thread; if nothing was highlighted, with the whole field, selected only now."""
+        if selection.strip():
+            run(selection)
+            return
+
+        def capture_all() -> str:
+            time.sleep(_FOCUS_RETURN_S)
+            text = get_selection().text
+            if text.strip():
+                self._captured.emit(run, text)
+            return ""
+
+        self._scheduler.submit(capture_all)
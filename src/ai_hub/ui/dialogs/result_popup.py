@@ -1,31 +1,78 @@
 from __future__ import annotations
 
 from PySide6.QtCore import Qt
-from PySide6.QtWidgets import QDialog, QPushButton, QTextEdit, QVBoxLayout
+from PySide6.QtWidgets import QDialog, QPushButton, QVBoxLayout
 
 from ...services.selection import copy_to_clipboard
+from ...services.tracing import tracer
+from ..gui_dispatcher import GuiDispatcher, show_window
+from ..text_view import TextView
 
 
-class ResultPopup:
-    @staticmethod
-    def show_text(title: str, content: str) -> None:
-        dialog = QDialog()
-        dialog.setWindowTitle(title)
-        dialog.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.Tool)
-        layout = QVBoxLayout(dialog)
+class ResultPopup(QDialog):
+    """Non-modal window showing one prompt result; ``ResultPopupPool`` hides and reuses it."""
 
-        text = QTextEdit(dialog)
-        text.setReadOnly(True)
-        text.setPlainText(content)
-        layout.addWidget(text)
+    def __init__(self):
+        super().__init__()
+        self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.Tool)
+        layout = QVBoxLayout(self)
 
-        button = QPushButton("Copy & Close", dialog)
+        self.text = TextView(self)
+        layout.addWidget(self.text)
+
+        button = QPushButton("Copy & Close", self)
+        button.clicked.connect(self._on_copy)
         layout.addWidget(button)
+        self.resize(680, 420)
+        # Drop the text as soon as the window goes away; a pooled window should not pin a large reply.
+        self.finished.connect(lambda _: self.text.clear())
+
+    def present(self, title: str, content: str) -> None:
+        self.setWindowTitle(title)
+        self.text.set_text(content)
+        show_window(self)
+
+    def _on_copy(self) -> None:
+        copy_to_clipboard(self.text.text())
+        self.accept()
+
+
+class ResultPopupPool:
+    """Pre-built result windows, handed out for each result and taken back when closed.
+
+    ``show_text`` may be called from any thread; the window work is posted to the Qt thread.
+    """
+
+    def __init__(self, gui: GuiDispatcher, size: int = 2):
+        self._gui = gui
+        self._size = size
+        self._idle: list[ResultPopup] = []
+        # Parentless windows need a live Python reference while they are on screen.
+        self._shown: set[ResultPopup] = set()
+
+    def warm_up(self) -> None:
+        """Build the idle windows ahead of the first result; call on the Qt thread."""
+        while len(self._idle) < self._size:
+            self._idle.append(self._build())
+
+    def show_text(self, title: str, content: str) -> None:
+        self._gui.post(self._show, title, content)
+
+    def _show(self, title: str, content: str) -> None:
+        with tracer.span("popup.show") as attrs:
+            attrs["reused"] = bool(self._idle)
+            popup = self._idle.pop() if self._idle else self._build()
+            self._shown.add(popup)
+            popup.present(title, content)
 
-        def on_copy() -> None:
-            copy_to_clipboard(content)
-            dialog.accept()
+    def _build(self) -> ResultPopup:
+        popup = ResultPopup()
+        popup.finished.connect(lambda _: self._release(popup))
+        return popup
 
-        button.clicked.connect(on_copy)
-        dialog.resize(680, 420)
-        dialog.exec()
+    def _release(self, popup: ResultPopup) -> None:
+        self._shown.discard(popup)
+        if len(self._idle) < self._size:
+            self._idle.append(popup)
+        else:
+            popup.deleteLater()
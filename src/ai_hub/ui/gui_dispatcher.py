@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import contextvars
+import logging
+import time
+from typing import Any, Callable, Optional
+
+from PySide6.QtCore import QEvent, QObject, QThread, Signal
+from PySide6.QtWidgets import QWidget
+
+from ..services.tracing import tracer
+
+
+_log = logging.getLogger(__name__)
+
+
+def _now_us() -> float:
+    return time.perf_counter_ns() / 1000
+
+
+class _FirstPaint(QObject):
+    """Records a ``window.visible`` span from ``show`` until the widget's next paint, then removes itself."""
+
+    def __init__(self, widget: QWidget, context: contextvars.Context, start_us: float):
+        super().__init__(widget)
+        self._context = context
+        self._start_us = start_us
+        widget.installEventFilter(self)
+
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:  # pragma: no cover - Qt
+        if event.type() == QEvent.Paint:
+            watched.removeEventFilter(self)
+            self._context.run(tracer.record, "window.visible", self._start_us, _now_us() - self._start_us)
+            self.deleteLater()
+        return False
+
+
+def show_window(widget: QWidget) -> None:
+    """Show, raise and focus *widget*, tracing the time until it has actually painted; Qt thread only."""
+    _FirstPaint(widget, contextvars.copy_context(), _now_us())
+    widget.show()
+    widget.raise_()
+    widget.activateWindow()
+
+
+class GuiDispatcher(QObject):
+    """Runs callables on the Qt thread; ``post`` is safe from the hook, input and scheduler threads.
+
+    Work crosses over through a queued signal and keeps the caller's trace context, so the ``gui.wait`` hop
+    and whatever the callable records land on the action that caused them.
+    """
+
+    _posted = Signal(object, object, float)
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        # Auto connection: queued from other threads, direct when already on the Qt thread.
+        self._posted.connect(self._run)
+
+    def on_gui_thread(self) -> bool:
+        return QThread.currentThread() is self.thread()
+
+    def post(self, fn: Callable[..., Any], *args: Any) -> None:
+        call = (lambda: fn(*args)) if args else fn
+        self._posted.emit(call, contextvars.copy_context(), _now_us())
+
+    def wrap(self, fn: Callable[..., Any]) -> Callable[..., None]:
+        """*fn* as a callback that always runs on the Qt thread."""
+        return lambda *args: self.post(fn, *args)
+
+    def _run(self, call: Callable[[], Any], context: contextvars.Context, posted_us: float) -> None:
+        context.run(self._run_in_context, call, posted_us)
+
+    @staticmethod
+    def _run_in_context(call: Callable[[], Any], posted_us: float) -> None:
+        tracer.record("gui.wait", posted_us, _now_us() - posted_us)
+        try:
+            call()
+        except Exception:  # pragma: no cover - a failing callback must not take the event loop down
+            _log.exception("GUI task failed")
@@ -1,79 +1,198 @@
 from __future__ import annotations
 
-from typing import Callable
+import logging
+import threading
 
-import qdarktheme
-from PySide6.QtCore import Qt
+from PySide6.QtCore import QTimer, Signal
 from PySide6.QtWidgets import QApplication, QMainWindow, QTabWidget
 
 from ..config import AppSettings
-from ..hotkeys.global_hotkeys import GlobalHotkeys, HotkeyCallbacks
-from ..hotkeys.hotstrings import AIHotstrings, HotstringEngine
+from ..profiling import profiler
+from ..services import spelling
 from ..services.openai_client import OpenAIClient
+from ..services.prompt_library import PromptLibrary
 from ..services.prompt_manager import Prompt, default_prompts
-from ..ui.tabs.chat_tab import ChatTab
-from ..ui.tabs.prompts_tab import PromptsTab
-from ..ui.tabs.spelling_tab import SpellingTab
+from ..services.response_cache import ResponseCache
+from ..services.scheduler import RequestScheduler
+from ..ui.dialogs.result_popup import ResultPopupPool
+from ..ui.gui_dispatcher import GuiDispatcher
+from ..ui.tabs.base import BaseTab, LazyTab
+
+_log = logging.getLogger(__name__)
 
 
 class MainWindow(QMainWindow):
+    warm_up_finished = Signal()
+
     def __init__(self, settings: AppSettings):
         super().__init__()
         self.setWindowTitle("AI Hub")
         self.resize(1000, 720)
 
-        qdarktheme.setup_theme("auto")
-
         self._settings = settings
-        self._client = OpenAIClient(settings.openai)
-        self._prompts = list(default_prompts())
+        cache = ResponseCache(settings.cache) if settings.cache.enabled else None
+        self._client = OpenAIClient(settings.openai, cache=cache, backends=settings.backends, routing=settings.routing)
+        self._scheduler = RequestScheduler(settings.scheduler, chunking=settings.chunking)
+        spelling.configure(settings.spelling)
+        with profiler.span("load prompt library"):
+            self._prompts = PromptLibrary.load(settings.prompts)
+        self._spelling_prompt = self._prompts[0] if self._prompts else default_prompts()[0]
+        # Hook, input and scheduler threads reach the UI only through these two.
+        self._gui = GuiDispatcher(self)
+        self._popups = ResultPopupPool(self._gui)
         self._tabs = QTabWidget(self)
         self.setCentralWidget(self._tabs)
 
-        self._chat_tab = ChatTab(self._client)
-        self._prompts_tab = PromptsTab(self._client, self._prompts)
-        self._spelling_tab = SpellingTab(self._client, self._prompts[0])
+        # Tabs are placeholders until first shown; only the current one gets built before the first paint.
+        self._chat_tab = LazyTab("Chat", self._build_chat_tab)
+        self._prompts_tab = LazyTab("Prompts", self._build_prompts_tab)
+        self._spelling_tab = LazyTab("Spelling", self._build_spelling_tab)
+        self._metrics_tab = LazyTab("Metrics", self._build_metrics_tab)
 
         self._tabs.addTab(self._chat_tab, "Chat")
         self._tabs.addTab(self._prompts_tab, "Prompts")
         self._tabs.addTab(self._spelling_tab, "Spelling")
+        self._tabs.addTab(self._metrics_tab, "Metrics")
 
         self._tabs.currentChanged.connect(self._on_tab_changed)
 
+        self._input = None
+        self._hotkeys = None
+        self._hotstrings_engine = None
+        self._api = None
+        self._shut_down = False
+
+    def _build_chat_tab(self) -> BaseTab:
+        from .tabs.chat_tab import ChatTab
+
+        return ChatTab(self._client, self._scheduler, self._settings.conversation)
+
+    def _build_prompts_tab(self) -> BaseTab:
+        from .tabs.prompts_tab import PromptsTab
+
+        return PromptsTab(self._client, self._scheduler, self._prompts, self._popups)
+
+    def _build_spelling_tab(self) -> BaseTab:
+        from .tabs.spelling_tab import SpellingTab
+
+        return SpellingTab(self._client, self._scheduler, self._spelling_prompt)
+
+    def _build_metrics_tab(self) -> BaseTab:
+        from ..services.tracing import tracer
+        from .tabs.metrics_tab import MetricsTab
+
+        return MetricsTab(
+            tracer,
+            {
+                "Scheduler": self._scheduler.stats,
+                "HTTP pool": lambda: self._client.transport_stats,
+                "Response cache": lambda: self._client.cache_stats,
+                "Rate limits": lambda: self._client.rate_limits,
+                "Backends": lambda: self._client.backend_states,
+                "Keyboard hook": lambda: self._input.stats() if self._input else None,
+                "Hotstring injection": lambda: self._hotstrings_engine.injector.stats() if self._hotstrings_engine else None,
+            },
+        )
+
+    def after_first_paint(self) -> None:
+        """Start hotkeys and warm caches once the window is on screen."""
+        profiler.mark("first paint")
+        with profiler.span("start input stack"):
+            self._start_input()
+        with profiler.span("build prompt navigator"):
+            self._hotkeys.warm_up()
+        with profiler.span("build result windows"):
+            self._popups.warm_up()
+        if self._settings.api.enabled:
+            with profiler.span("start local API"):
+                self._start_api()
+        threading.Thread(target=self._warm_up_background, name="ai-hub-warm-up", daemon=True).start()
+
+    def _warm_up_background(self) -> None:
+        with profiler.span("warm up HTTP client (background)"):
+            self._client.warm_up()
+        with profiler.span("load spelling index (background)"):
+            spelling.warm_up()
+        self.warm_up_finished.emit()
+
+    def _start_api(self) -> None:
+        from ..services.local_api import LocalApiServer
+
+        if self._shut_down:
+            return
+        api = LocalApiServer(self._settings.api, self._client, self._scheduler, self._prompts)
+        try:
+            api.start()
+        except OSError as exc:
+            # Most likely the port is taken, e.g. by a second instance; the rest of the app still works.
+            _log.warning("Could not start the local API on %s: %s", api.address, exc)
+            return
+        self._api = api
+
+    def shutdown(self) -> None:
+        """Stop taking input, then the API, the workers and the connections; safe to call more than once."""
+        if self._input is not None:
+            self._input.stop()
+            self._input = None
+        if self._api is not None:
+            self._api.close()
+            self._api = None
+        if not self._shut_down:
+            self._shut_down = True
+            # Queued work is dropped; a call still running fails fast once the client is closed below.
+            self._scheduler.shutdown()
+            self._client.close()
+
+    def _start_input(self) -> None:
+        from ..hotkeys.global_hotkeys import GlobalHotkeys, HotkeyCallbacks
+        from ..hotkeys.hotstrings import HotstringEngine
+        from ..hotkeys.injector import KeystrokeInjector
+        from ..hotkeys.input_dispatcher import InputDispatcher
+        from ..services import selection
+
+        if self._shut_down:
+            # Deferred past first paint; the app may already be quitting.
+            return
+        settings = self._settings
+        selection.configure(settings.selection)
+        self._input = InputDispatcher()
         self._hotkeys = GlobalHotkeys(
             client=self._client,
+            scheduler=self._scheduler,
             prompts=self._prompts,
-            spelling_prompt=self._prompts[0],
+            spelling_prompt=self._spelling_prompt,
+            gui=self._gui,
+            popups=self._popups,
             callbacks=HotkeyCallbacks(focus_hub_tab=self.focus_hub_tab),
             prompt_hotkey=settings.hotkeys.prompt_navigator,
             spelling_hotkey=settings.hotkeys.spelling,
             goto_hotkey=settings.hotkeys.goto_hub,
+            cancel_hotkey=settings.hotkeys.cancel_requests,
+            navigator=settings.navigator,
         )
-        self._hotkeys.start()
+        self._hotkeys.start(self._input)
 
         self._hotstrings_engine = HotstringEngine(
             buffer_size=settings.hotstrings.buffer_size,
             enabled=settings.hotstrings.enabled_by_default,
+            injector=KeystrokeInjector(settings.hotstrings.typing_threshold),
         )
         self._register_default_hotstrings()
-        self._hotstrings_engine.start()
-
-        keyboard = __import__("keyboard")
-        keyboard.add_hotkey(
-            settings.hotkeys.toggle_hotstrings,
-            self._toggle_hotstrings,
-            suppress=False,
-            trigger_on_release=True,
-        )
+        self._hotstrings_engine.start(self._input)
+
+        self._input.add_hotkey(settings.hotkeys.toggle_hotstrings, self._toggle_hotstrings)
+        self._input.start()
 
     def _register_default_hotstrings(self) -> None:
         import time
 
+        from ..hotkeys.hotstrings import AIHotstrings
+
         self._hotstrings_engine.register_text(";sig", "Best regards,\nYour Name")
         self._hotstrings_engine.register_text(";date", lambda: time.strftime("%Y-%m-%d"))
         self._hotstrings_engine.register_text(";time", lambda: time.strftime("%H:%M"))
 
-        ai_hotstrings = AIHotstrings(self._client, self._prompts)
+        ai_hotstrings = AIHotstrings(self._client, self._scheduler, self._prompts)
         self._hotstrings_engine.register_ai(";fix", ai_hotstrings.make_handler(0))
         self._hotstrings_engine.register_ai(";clar", ai_hotstrings.make_handler(1))
         self._hotstrings_engine.register_ai(";short", ai_hotstrings.make_handler(2))
@@ -88,9 +207,12 @@ class MainWindow(QMainWindow):
     def _toggle_hotstrings(self) -> None:
         new_state = not self._hotstrings_engine.enabled
         self._hotstrings_engine.set_enabled(new_state)
+        self._gui.post(self._show_hotstrings_state, new_state)
+
+    def _show_hotstrings_state(self, enabled: bool) -> None:
         from PySide6.QtWidgets import QMessageBox
 
-        QMessageBox.information(self, "AI Hub", f"Hotstrings {'enabled' if new_state else 'disabled'}.")
+        QMessageBox.information(self, "AI Hub", f"Hotstrings {'enabled' if enabled else 'disabled'}.")
 
     def _on_tab_changed(self, index: int) -> None:  # pragma: no cover - UI hook
         for i in range(self._tabs.count()):
@@ -102,8 +224,23 @@ class MainWindow(QMainWindow):
                     widget.on_deactivate()
 
 
-def run_app(settings: AppSettings) -> None:
-    app = QApplication.instance() or QApplication([])
-    window = MainWindow(settings)
-    window.show()
+def run_app(settings: AppSettings, *, profile_startup: bool = False) -> None:
+    with profiler.span("create QApplication"):
+        app = QApplication.instance() or QApplication([])
+    with profiler.span("apply theme"):
+        import qdarktheme
+
+        qdarktheme.setup_theme("auto")
+    with profiler.span("construct MainWindow"):
+        window = MainWindow(settings)
+    with profiler.span("show window"):
+        window.show()
+    if profile_startup:
+        def finish_profile() -> None:
+            profiler.report()
+            app.quit()
+
+        window.warm_up_finished.connect(finish_profile)
+    app.aboutToQuit.connect(window.shutdown)
+    QTimer.singleShot(0, window.after_first_paint)
     app.exec()
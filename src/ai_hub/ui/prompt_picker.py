@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from PySide6.QtCore import QAbstractListModel, QEvent, QModelIndex, QObject, Qt, Signal
+from PySide6.QtWidgets import QAbstractItemView, QLineEdit, QListView, QVBoxLayout, QWidget
+
+from ..services.prompt_library import PromptLibrary
+from ..services.prompt_manager import Prompt
+
+
+_LAYOUT_BATCH = 256
+
+
+class PromptListModel(QAbstractListModel):
+    """Exposes the current search hits of a ``PromptLibrary``; the view only asks for visible rows."""
+
+    def __init__(self, library: PromptLibrary, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._library = library
+        self._rows: list[int] = list(range(len(library)))
+        self._query = ""
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        prompt = self._library[self._rows[index.row()]]
+        if role == Qt.DisplayRole:
+            return prompt.name
+        if role == Qt.ToolTipRole:
+            tags = f"\nTags: {', '.join(prompt.tags)}" if prompt.tags else ""
+            return f"{prompt.prefix.strip()}{tags}"
+        return None
+
+    def set_query(self, query: str) -> None:
+        if query == self._query:
+            return
+        self._query = query
+        self.beginResetModel()
+        self._rows = self._library.search(query)
+        self.endResetModel()
+
+    def prompt_at(self, row: int) -> Prompt:
+        return self._library[self._rows[row]]
+
+
+class PromptPicker(QWidget):
+    """Filter box over a virtualized prompt list; arrow keys and Enter work while typing."""
+
+    activated = Signal()
+    # The current (highlighted) row changed, by typing, arrow keys or mouse.
+    highlighted = Signal()
+
+    def __init__(self, library: PromptLibrary, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.model = PromptListModel(library, self)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.filter_edit = QLineEdit(self)
+        self.filter_edit.setPlaceholderText(f"Search {len(library)} prompts…")
+        self.filter_edit.setClearButtonEnabled(True)
+        self.filter_edit.textChanged.connect(self._on_filter_changed)
+        self.filter_edit.installEventFilter(self)
+        layout.addWidget(self.filter_edit)
+
+        self.view = QListView(self)
+        # Uniform rows skip per-item measuring; batched layout positions the first screenful and defers the rest
+        # to later event-loop turns, so a model reset with 10k rows still fits in one frame.
+        self.view.setUniformItemSizes(True)
+        self.view.setLayoutMode(QListView.Batched)
+        self.view.setBatchSize(_LAYOUT_BATCH)
+        self.view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.view.setModel(self.model)
+        self.view.doubleClicked.connect(lambda _: self.activated.emit())
+        self.view.selectionModel().currentChanged.connect(lambda *_: self.highlighted.emit())
+        layout.addWidget(self.view)
+        self._select_first()
+
+    def reset(self) -> None:
+        self.filter_edit.clear()
+        self._select_first()
+        self.filter_edit.setFocus()
+
+    def current_prompt(self) -> Optional[Prompt]:
+        index = self.view.currentIndex()
+        return self.model.prompt_at(index.row()) if index.isValid() else None
+
+    def selected_prompts(self) -> list[Prompt]:
+        rows = sorted(index.row() for index in self.view.selectionModel().selectedIndexes())
+        return [self.model.prompt_at(row) for row in rows]
+
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:  # pragma: no cover - Qt
+        if watched is self.filter_edit and event.type() == QEvent.KeyPress:
+            key = event.key()
+            if key in (Qt.Key_Return, Qt.Key_Enter):
+                self.activated.emit()
+                return True
+            if key in (Qt.Key_Up, Qt.Key_Down, Qt.Key_PageUp, Qt.Key_PageDown):
+                self.view.keyPressEvent(event)
+                return True
+        return super().eventFilter(watched, event)
+
+    def _on_filter_changed(self, text: str) -> None:
+        self.model.set_query(text)
+        self._select_first()
+
+    def _select_first(self) -> None:
+        if self.model.rowCount():
+            self.view.setCurrentIndex(self.model.index(0))
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-from typing import Protocol
+from typing import Callable, Optional, Protocol
 
-from PySide6.QtWidgets import QWidget
+from PySide6.QtWidgets import QVBoxLayout, QWidget
+
+from ...profiling import profiler
 
 
 class Tab(Protocol):
@@ -23,3 +25,37 @@ class BaseTab(QWidget):
 
     def on_deactivate(self) -> None:  # pragma: no cover - UI hook
         pass
+
+
+class LazyTab(BaseTab):
+    """Placeholder that builds the real tab the first time it is shown."""
+
+    def __init__(self, name: str, factory: Callable[[], BaseTab]):
+        super().__init__()
+        self._name = name
+        self._factory = factory
+        self._tab: Optional[BaseTab] = None
+        self._layout = QVBoxLayout(self)
+        self._layout.setContentsMargins(0, 0, 0, 0)
+
+    @property
+    def built(self) -> bool:
+        return self._tab is not None
+
+    def ensure_built(self) -> BaseTab:
+        if self._tab is None:
+            with profiler.span(f"build {self._name} tab"):
+                self._tab = self._factory()
+            self._layout.addWidget(self._tab)
+        return self._tab
+
+    def showEvent(self, event):  # pragma: no cover - Qt
+        self.ensure_built()
+        super().showEvent(event)
+
+    def on_activate(self) -> None:  # pragma: no cover - UI hook
+        self.ensure_built().on_activate()
+
+    def on_deactivate(self) -> None:  # pragma: no cover - UI hook
+        if self._tab is not None:
+            self._tab.on_deactivate()
@@ -1,24 +1,45 @@
 from __future__ import annotations
 
-import threading
+import time
 
 from PySide6.QtCore import Signal, Slot
-from PySide6.QtWidgets import QLabel, QPushButton, QTextEdit, QVBoxLayout
+from PySide6.QtWidgets import QHBoxLayout, QLabel, QPushButton, QTextEdit, QVBoxLayout
 
-from ...services.openai_client import OpenAIClient
+from ...config import ConversationSettings
+from ...services.conversation import Conversation
+from ...services.openai_client import OpenAIClient, StreamError
+from ...services.scheduler import Priority, RequestHandle, RequestScheduler
+from ...services.tracing import tracer
 from ..tabs.base import BaseTab
+from ..text_view import TextView
+
+
+# Deltas arrive far faster than the eye can follow; batch them so the Qt thread sees ~30 updates/s at most.
+_CHUNK_INTERVAL = 0.033
 
 
 class ChatTab(BaseTab):
     request_started = Signal()
-    request_finished = Signal(str)
-
-    def __init__(self, client: OpenAIClient, system_default: str = "You are a helpful assistant."):
+    request_chunk = Signal(str)
+    # (reply, unsent): *unsent* is the user's message when it did not make it into the conversation.
+    request_finished = Signal(str, str)
+
+    def __init__(
+        self,
+        client: OpenAIClient,
+        scheduler: RequestScheduler,
+        conversation: ConversationSettings,
+        system_default: str = "You are a helpful assistant.",
+    ):
         super().__init__()
         self._client = client
+        self._scheduler = scheduler
+        self._conversation = Conversation(client, scheduler, conversation)
         self._system_default = system_default
+        self._awaiting_first_chunk = False
         self._build_ui()
         self.request_started.connect(self._on_request_started)
+        self.request_chunk.connect(self._on_request_chunk)
         self.request_finished.connect(self._on_request_finished)
 
     def _build_ui(self) -> None:
@@ -35,35 +56,106 @@ class ChatTab(BaseTab):
         self.user_input.setFixedHeight(200)
         layout.addWidget(self.user_input)
 
+        buttons = QHBoxLayout()
         self.send_button = QPushButton("Send", self)
         self.send_button.clicked.connect(self._on_send_clicked)
-        layout.addWidget(self.send_button)
+        buttons.addWidget(self.send_button)
+        self.new_button = QPushButton("New conversation", self)
+        self.new_button.clicked.connect(self._on_new_clicked)
+        buttons.addWidget(self.new_button)
+        layout.addLayout(buttons)
 
         layout.addWidget(QLabel("Response:"))
-        self.response_output = QTextEdit(self)
-        self.response_output.setReadOnly(True)
+        self.response_output = TextView(self)
         layout.addWidget(self.response_output)
 
+        self.status_label = QLabel(self)
+        layout.addWidget(self.status_label)
+        self._update_status()
+
     @Slot()
     def _on_send_clicked(self) -> None:
         message = self.user_input.toPlainText().strip()
         if not message:
             return
         system = self.system_input.toPlainText().strip() or None
+        conversation = self._conversation
+        # Disabled now rather than on request_started, so a second quick click cannot start a second request.
+        self.send_button.setEnabled(False)
+        self.user_input.clear()
+        ran = []
 
-        def run() -> None:
+        def run() -> str:
+            ran.append(True)
             self.request_started.emit()
-            reply = self._client.chat(system, message)
-            self.request_finished.emit(reply)
+            parts: list[str] = []
+            pending: list[str] = []
+            last_emit = 0.0
+            failed = False
+            for delta in self._client.chat_messages_stream(conversation.messages_for(system, message)):
+                # Shown to the user, but a reply cut short by an error must not enter the history.
+                failed = failed or isinstance(delta, StreamError)
+                parts.append(delta)
+                pending.append(delta)
+                now = time.monotonic()
+                if now - last_emit >= _CHUNK_INTERVAL:
+                    self.request_chunk.emit("".join(pending))
+                    pending.clear()
+                    last_emit = now
+            if pending:
+                self.request_chunk.emit("".join(pending))
+            reply = "".join(parts)
+            recorded = bool(reply) and not failed
+            if recorded:
+                conversation.record(message, reply)
+            self.request_finished.emit(reply, "" if recorded else message)
+            return reply
+
+        def dropped(_handle: RequestHandle) -> None:
+            # Cancelled before a worker picked it up: run never reports back.
+            if not ran:
+                self.request_finished.emit("", message)
+
+        with tracer.action("chat tab", prompt="Chat"):
+            handle = self._scheduler.submit(run, priority=Priority.INTERACTIVE, group="chat")
+        handle.add_done_callback(dropped)
 
-        threading.Thread(target=run, daemon=True).start()
+    @Slot()
+    def _on_new_clicked(self) -> None:
+        self._conversation.reset()
+        self.response_output.clear()
+        self._update_status()
 
     @Slot()
     def _on_request_started(self) -> None:
-        self.response_output.setPlainText("Thinking...")
-        self.send_button.setEnabled(False)
+        self.response_output.set_text("Thinking...")
+        self._awaiting_first_chunk = True
 
     @Slot(str)
-    def _on_request_finished(self, reply: str) -> None:
-        self.response_output.setPlainText(reply)
+    def _on_request_chunk(self, chunk: str) -> None:
+        if self._awaiting_first_chunk:
+            self.response_output.clear()
+            self._awaiting_first_chunk = False
+        self.response_output.append_text(chunk)
+
+    @Slot(str, str)
+    def _on_request_finished(self, reply: str, unsent: str) -> None:
+        if self._awaiting_first_chunk:
+            self.response_output.set_text(reply)
+            self._awaiting_first_chunk = False
+        if unsent and not self.user_input.toPlainText().strip():
+            # The reply failed; give the message back so it can be sent again.
+            self.user_input.setPlainText(unsent)
         self.send_button.setEnabled(True)
+        self._update_status()
+
+    def _update_status(self) -> None:
+        stats = self._conversation.stats()
+        if not stats.turns:
+            self.status_label.setText("New conversation")
+            return
+        summary = f", {stats.summarized_turns} summarized" if stats.summarized_turns else ""
+        pending = " (summarizing…)" if stats.summarizing else ""
+        self.status_label.setText(
+            f"{stats.turns} turns{summary}; ~{stats.history_tokens + stats.summary_tokens} tokens of context{pending}"
+        )
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from dataclasses import asdict
+from html import escape
+from pathlib import Path
+from typing import Callable, Mapping, Optional
+
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import (
+    QAbstractItemView,
+    QFileDialog,
+    QHBoxLayout,
+    QLabel,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+)
+
+from ...services.tracing import Tracer
+from ..tabs.base import BaseTab
+
+
+StatsSource = Callable[[], Optional[object]]
+
+_REFRESH_MS = 2000
+_STAGE_COLUMNS = ("Prompt", "Stage", "Count", "p50 ms", "p95 ms", "p99 ms")
+_THROUGHPUT_COLUMNS = ("Prompt", "Completion tokens", "Tokens/s")
+
+
+def _format_stats(name: str, stats: object) -> str:
+    values = asdict(stats) if hasattr(stats, "__dataclass_fields__") else {"value": stats}
+    fields = ", ".join(f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}" for key, value in values.items())
+    return f"<b>{escape(name)}</b>: {fields}"
+
+
+class MetricsTab(BaseTab):
+    """Latency percentiles per prompt and pipeline stage, plus the live counters of each subsystem."""
+
+    def __init__(self, tracer: Tracer, sources: Mapping[str, StatsSource]):
+        super().__init__()
+        self._tracer = tracer
+        self._sources = sources
+        self._timer = QTimer(self)
+        self._timer.setInterval(_REFRESH_MS)
+        self._timer.timeout.connect(self.refresh)
+        self._build_ui()
+
+    def _build_ui(self) -> None:
+        layout = QVBoxLayout(self)
+
+        layout.addWidget(QLabel("Latency by prompt and stage:"))
+        self.stage_table = self._table(_STAGE_COLUMNS)
+        layout.addWidget(self.stage_table, 3)
+
+        layout.addWidget(QLabel("Generation throughput (when the API reports usage):"))
+        self.throughput_table = self._table(_THROUGHPUT_COLUMNS)
+        layout.addWidget(self.throughput_table, 1)
+
+        self.counters = QLabel(self)
+        self.counters.setWordWrap(True)
+        layout.addWidget(self.counters)
+
+        buttons = QHBoxLayout()
+        for label, slot in (
+            ("Refresh", self.refresh),
+            ("Clear", self._on_clear_clicked),
+            ("Export JSONL…", self._on_export_jsonl_clicked),
+            ("Export Chrome trace…", self._on_export_chrome_clicked),
+        ):
+            button = QPushButton(label, self)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+
+    def _table(self, columns: tuple[str, ...]) -> QTableWidget:
+        table = QTableWidget(0, len(columns), self)
+        table.setHorizontalHeaderLabels(columns)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
+        table.horizontalHeader().setStretchLastSection(True)
+        return table
+
+    def on_activate(self) -> None:  # pragma: no cover - UI hook
+        self.refresh()
+        self._timer.start()
+
+    def on_deactivate(self) -> None:  # pragma: no cover - UI hook
+        self._timer.stop()
+
+    def refresh(self) -> None:
+        rows = [
+            (row.prompt, row.stage, str(row.count), f"{row.p50_ms:.1f}", f"{row.p95_ms:.1f}", f"{row.p99_ms:.1f}")
+            for row in self._tracer.summary()
+        ]
+        self._fill(self.stage_table, rows)
+        self._fill(
+            self.throughput_table,
+            [(row.prompt, str(row.completion_tokens), f"{row.tokens_per_second:.1f}") for row in self._tracer.throughput()],
+        )
+        lines = []
+        for name, source in self._sources.items():
+            stats = source()
+            if isinstance(stats, Mapping):
+                # Keyed sources, such as rate limits per API key, get a line per key.
+                lines.extend(_format_stats(f"{name} – {key}", value) for key, value in stats.items())
+            elif stats is not None:
+                lines.append(_format_stats(name, stats))
+        self.counters.setText("<br>".join(lines))
+
+    @staticmethod
+    def _fill(table: QTableWidget, rows: list[tuple[str, ...]]) -> None:
+        table.setRowCount(len(rows))
+        for row_index, row in enumerate(rows):
+            for column, value in enumerate(row):
+                table.setItem(row_index, column, QTableWidgetItem(value))
+
+    def _on_clear_clicked(self) -> None:
+        self._tracer.clear()
+        self.refresh()
+
+    def _on_export_jsonl_clicked(self) -> None:
+        path, _ = QFileDialog.getSaveFileName(self, "Export spans", "ai-hub-trace.jsonl", "JSON Lines (*.jsonl)")
+        if path:
+            self._tracer.export_jsonl(Path(path))
+
+    def _on_export_chrome_clicked(self) -> None:
+        path, _ = QFileDialog.getSaveFileName(self, "Export Chrome trace", "ai-hub-trace.json", "Trace Event JSON (*.json)")
+        if path:
+            self._tracer.export_chrome_trace(Path(path))
@@ -1,58 +1,65 @@
 from __future__ import annotations
 
-import threading
-
-from PySide6.QtWidgets import (
-    QLabel,
-    QListWidget,
-    QListWidgetItem,
-    QPushButton,
-    QVBoxLayout,
-)
-
-from ...services.openai_client import OpenAIClient
-from ...services.prompt_manager import Prompt
+from PySide6.QtWidgets import QLabel, QPushButton, QVBoxLayout
+
+from ...services.openai_client import OpenAIClient, is_error_reply
+from ...services.prompt_library import PromptLibrary
+from ...services.scheduler import RequestScheduler
 from ...services.selection import get_selection, replace_selection
-from ..dialogs.result_popup import ResultPopup
+from ...services.tracing import tracer
+from ..dialogs.comparison_view import ComparisonView
+from ..dialogs.result_popup import ResultPopupPool
+from ..prompt_picker import PromptPicker
 from ..tabs.base import BaseTab
 
 
 class PromptsTab(BaseTab):
-    def __init__(self, client: OpenAIClient, prompts: list[Prompt]):
+    def __init__(self, client: OpenAIClient, scheduler: RequestScheduler, prompts: PromptLibrary, popups: ResultPopupPool):
         super().__init__()
         self._client = client
+        self._scheduler = scheduler
         self._prompts = prompts
+        self._popups = popups
         self._build_ui()
 
     def _build_ui(self) -> None:
         layout = QVBoxLayout(self)
-        layout.addWidget(QLabel("Prompt Navigator — select text in any app, then choose a prompt:"))
+        layout.addWidget(QLabel("Prompt Navigator — select text in any app, then choose a prompt (Ctrl+click several to compare):"))
 
-        self.prompt_list = QListWidget(self)
-        for prompt in self._prompts:
-            QListWidgetItem(prompt.name, self.prompt_list)
-        layout.addWidget(self.prompt_list)
+        self.picker = PromptPicker(self._prompts, self)
+        self.picker.activated.connect(self._on_run_clicked)
+        layout.addWidget(self.picker)
 
         self.run_button = QPushButton("Run on Selection", self)
         self.run_button.clicked.connect(self._on_run_clicked)
         layout.addWidget(self.run_button)
 
     def _on_run_clicked(self) -> None:
-        index = self.prompt_list.currentRow()
-        if index < 0:
+        with tracer.action("prompts tab"):
+            self._run_selected()
+
+    def _run_selected(self) -> None:
+        chosen = self.picker.selected_prompts()
+        if len(chosen) > 1:
+            selection = get_selection().text
+            if selection.strip():
+                ComparisonView.run(self._client, self._scheduler, chosen, selection)
+            return
+
+        prompt = self.picker.current_prompt()
+        if prompt is None:
             return
-        prompt = self._prompts[index]
         selection = get_selection().text
         if not selection.strip():
             return
 
-        def run() -> None:
-            output = self._client.chat(prompt.system or None, prompt.build_message(selection), prompt.temperature)
+        def deliver(output: str) -> None:
             if not output.strip():
                 return
-            if prompt.replace:
+            if prompt.replace and not is_error_reply(output):
                 replace_selection(output)
             else:
-                ResultPopup.show_text(prompt.name, output)
+                # An error is shown, never pasted over the user's text.
+                self._popups.show_text(prompt.name, output)
 
-        threading.Thread(target=run, daemon=True).start()
+        self._scheduler.submit_prompt(self._client, prompt, selection, deliver)
@@ -1,19 +1,25 @@
 from __future__ import annotations
 
-import threading
+import logging
 
 from PySide6.QtWidgets import QLabel, QPushButton, QVBoxLayout
 
-from ...services.openai_client import OpenAIClient
+from ...services.openai_client import OpenAIClient, is_error_reply
 from ...services.prompt_manager import Prompt
+from ...services.scheduler import RequestScheduler
 from ...services.selection import get_selection, replace_selection
+from ...services.tracing import tracer
 from ..tabs.base import BaseTab
 
 
+_log = logging.getLogger(__name__)
+
+
 class SpellingTab(BaseTab):
-    def __init__(self, client: OpenAIClient, spelling_prompt: Prompt):
+    def __init__(self, client: OpenAIClient, scheduler: RequestScheduler, spelling_prompt: Prompt):
         super().__init__()
         self._client = client
+        self._scheduler = scheduler
         self._prompt = spelling_prompt
         self._build_ui()
 
@@ -26,13 +32,18 @@ class SpellingTab(BaseTab):
         layout.addStretch(1)
 
     def _on_fix_clicked(self) -> None:
+        with tracer.action("spelling tab"):
+            self._fix_selection()
+
+    def _fix_selection(self) -> None:
         selection = get_selection().text
         if not selection.strip():
             return
 
-        def run() -> None:
-            output = self._client.chat(self._prompt.system or None, self._prompt.build_message(selection), self._prompt.temperature)
-            if output.strip():
+        def deliver(output: str) -> None:
+            if is_error_reply(output):
+                _log.warning("Spelling fix failed: %s", output)
+            elif output.strip() and output != selection:
                 replace_selection(output)
 
-        threading.Thread(target=run, daemon=True).start()
+        self._scheduler.submit_prompt(self._client, self._prompt, selection, deliver)
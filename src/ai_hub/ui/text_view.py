@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Optional
+
+from PySide6.QtCore import QTimer, Qt
+from PySide6.QtGui import QFontDatabase, QGuiApplication, QKeySequence, QPainter, QTextCursor
+from PySide6.QtWidgets import QAbstractScrollArea, QMenu, QPlainTextEdit, QStackedWidget, QWidget
+
+
+# Above either limit a QTextDocument spends seconds laying out, so the text moves to the paged viewer.
+_VIEWER_CHARS = 256 * 1024
+_LONG_LINE_CHARS = 16 * 1024
+# The editor receives at most this much per insert, and inserts for at most one frame before yielding.
+_BATCH_CHARS = 32 * 1024
+_FRAME_BUDGET = 0.008
+# The paged viewer hard-wraps rows at a fixed width so its row index never depends on the window size.
+_VIEWER_COLUMNS = 200
+_INDEX_BATCH_LINES = 4096
+
+
+class PagedTextViewer(QAbstractScrollArea):
+    """Read-only monospace viewer that paints the visible rows straight from a Python string.
+
+    There is no QTextDocument behind it, so opening a multi-megabyte response costs a row index (built a few
+    thousand lines per event-loop turn) rather than a full layout, and the string is not copied into Qt.
+    """
+
+    def __init__(self, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self._text = ""
+        self._rows: list[int] = [0]
+        # Offset of the first unindexed line; rows from there on are rebuilt as text arrives.
+        self._indexed = 0
+        self._index_timer = QTimer(self)
+        self._index_timer.setInterval(0)
+        self._index_timer.timeout.connect(self._index_some)
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.setFocusPolicy(Qt.StrongFocus)
+
+    def text(self) -> str:
+        return self._text
+
+    def set_text(self, text: str) -> None:
+        """Show *text*; when it extends the current text only the last, possibly unfinished line is re-indexed."""
+        if not text.startswith(self._text):
+            self._rows = [0]
+            self._indexed = 0
+            self.verticalScrollBar().setValue(0)
+        else:
+            del self._rows[self._row_at(self._indexed) + 1 :]
+        self._text = text
+        self._index_some()
+
+    def copy_all(self) -> None:
+        QGuiApplication.clipboard().setText(self._text)
+
+    def paintEvent(self, event):  # pragma: no cover - Qt
+        painter = QPainter(self.viewport())
+        metrics = self.fontMetrics()
+        line_height = metrics.lineSpacing()
+        first = self.verticalScrollBar().value()
+        x = 4 - self.horizontalScrollBar().value()
+        y = metrics.ascent()
+        painter.setPen(self.palette().text().color())
+        for row in range(first, min(len(self._rows), first + self.viewport().height() // line_height + 2)):
+            painter.drawText(x, y, self._row_text(row))
+            y += line_height
+
+    def resizeEvent(self, event):  # pragma: no cover - Qt
+        super().resizeEvent(event)
+        self._update_scrollbars()
+
+    def keyPressEvent(self, event):  # pragma: no cover - Qt
+        if event.matches(QKeySequence.Copy):
+            self.copy_all()
+            return
+        bar = self.verticalScrollBar()
+        steps = {
+            Qt.Key_Up: -1,
+            Qt.Key_Down: 1,
+            Qt.Key_PageUp: -bar.pageStep(),
+            Qt.Key_PageDown: bar.pageStep(),
+            Qt.Key_Home: -len(self._rows),
+            Qt.Key_End: len(self._rows),
+        }
+        if event.key() in steps:
+            bar.setValue(bar.value() + steps[event.key()])
+            return
+        super().keyPressEvent(event)
+
+    def contextMenuEvent(self, event):  # pragma: no cover - Qt
+        menu = QMenu(self)
+        menu.addAction("Copy all", self.copy_all)
+        menu.exec(event.globalPos())
+
+    def _row_text(self, row: int) -> str:
+        end = self._rows[row + 1] if row + 1 < len(self._rows) else len(self._text)
+        return self._text[self._rows[row] : end].rstrip("\r\n").expandtabs(4)
+
+    def _row_at(self, offset: int) -> int:
+        # Rows are appended in order, and the unfinished line starts at the last row boundary <= offset.
+        row = len(self._rows) - 1
+        while row > 0 and self._rows[row] > offset:
+            row -= 1
+        return row
+
+    def _index_some(self) -> None:
+        text, rows, columns = self._text, self._rows, _VIEWER_COLUMNS
+        start = self._indexed
+        for _ in range(_INDEX_BATCH_LINES):
+            end = text.find("\n", start)
+            if end < 0:
+                # The last line may still grow; index its rows without marking it done.
+                rows.extend(range(start + columns, len(text), columns))
+                self._index_timer.stop()
+                break
+            rows.extend(range(start + columns, end, columns))
+            start = end + 1
+            rows.append(start)
+        else:
+            self._index_timer.start()
+        self._indexed = start
+        self._update_scrollbars()
+        self.viewport().update()
+
+    def _update_scrollbars(self) -> None:
+        metrics = self.fontMetrics()
+        visible_rows = max(1, self.viewport().height() // metrics.lineSpacing())
+        vertical = self.verticalScrollBar()
+        vertical.setRange(0, max(0, len(self._rows) - visible_rows))
+        vertical.setPageStep(visible_rows)
+        horizontal = self.horizontalScrollBar()
+        width = metrics.horizontalAdvance("M") * _VIEWER_COLUMNS if self._text else 0
+        horizontal.setRange(0, max(0, width - self.viewport().width()))
+        horizontal.setPageStep(self.viewport().width())
+
+
+class TextView(QStackedWidget):
+    """Read-only output pane that stays responsive for multi-megabyte text.
+
+    Small text goes into a ``QPlainTextEdit`` in bounded batches, one frame's worth per event-loop turn; once
+    the text passes ``_VIEWER_CHARS`` or contains a very long line it moves to a ``PagedTextViewer``. The
+    Python string given to ``set_text``/``append_text`` is the only full copy kept, and ``text()`` returns it.
+    """
+
+    def __init__(self, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self._parts: list[str] = []
+        self._length = 0
+        # Length of the unfinished last line, so a long line streamed in small chunks is still noticed.
+        self._line_run = 0
+        self._pending: deque[str] = deque()
+        self._follow_end = False
+        self._paged = False
+
+        self.editor = QPlainTextEdit(self)
+        self.editor.setReadOnly(True)
+        self.editor.setUndoRedoEnabled(False)
+        self.viewer = PagedTextViewer(self)
+        self.addWidget(self.editor)
+        self.addWidget(self.viewer)
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(0)
+        self._flush_timer.timeout.connect(self._flush)
+
+    @property
+    def paged(self) -> bool:
+        return self._paged
+
+    def text(self) -> str:
+        if len(self._parts) > 1:
+            self._parts[:] = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def clear(self) -> None:
+        self._parts.clear()
+        self._length = 0
+        self._line_run = 0
+        self._pending.clear()
+        self._flush_timer.stop()
+        self.editor.clear()
+        if self._paged:
+            self._paged = False
+            self.viewer.set_text("")
+            self.setCurrentWidget(self.editor)
+
+    def set_text(self, text: str) -> None:
+        """Replace the content, scrolled to the top."""
+        self.clear()
+        self._follow_end = False
+        self._add(text)
+
+    def append_text(self, chunk: str) -> None:
+        """Add *chunk* at the end, following it if the view was already scrolled to the bottom."""
+        bar = (self.viewer if self._paged else self.editor).verticalScrollBar()
+        self._follow_end = bar.value() == bar.maximum()
+        self._add(chunk)
+
+    def _add(self, chunk: str) -> None:
+        if not chunk:
+            return
+        self._parts.append(chunk)
+        self._length += len(chunk)
+        if not self._paged and (self._length > _VIEWER_CHARS or self._longest_line(chunk) > _LONG_LINE_CHARS):
+            self._switch_to_viewer()
+        elif not self._paged:
+            self._pending.append(chunk)
+            if len(chunk) <= _BATCH_CHARS and len(self._pending) == 1:
+                self._flush()
+        if self._pending or self._paged:
+            self._flush_timer.start()
+
+    def _longest_line(self, chunk: str) -> int:
+        last = chunk.rfind("\n")
+        if last < 0:
+            self._line_run += len(chunk)
+            return self._line_run
+        longest = max(self._line_run + chunk.find("\n"), max(map(len, chunk[:last].split("\n"))))
+        self._line_run = len(chunk) - last - 1
+        return max(longest, self._line_run)
+
+    def _switch_to_viewer(self) -> None:
+        self._paged = True
+        self._pending.clear()
+        self.setCurrentWidget(self.viewer)
+        # Freeing the old document takes a while of its own; keep it out of the frame that first paints the viewer.
+        QTimer.singleShot(0, self.editor.clear)
+
+    def _flush(self) -> None:
+        if self._paged:
+            self.viewer.set_text(self.text())
+            if self._follow_end:
+                self.viewer.verticalScrollBar().setValue(self.viewer.verticalScrollBar().maximum())
+            return
+
+        cursor = QTextCursor(self.editor.document())
+        cursor.movePosition(QTextCursor.End)
+        deadline = time.perf_counter() + _FRAME_BUDGET
+        while self._pending and time.perf_counter() < deadline:
+            chunk = self._pending.popleft()
+            if len(chunk) > _BATCH_CHARS:
+                self._pending.appendleft(chunk[_BATCH_CHARS:])
+                chunk = chunk[:_BATCH_CHARS]
+            cursor.insertText(chunk)
+        if self._follow_end:
+            self.editor.verticalScrollBar().setValue(self.editor.verticalScrollBar().maximum())
+        if self._pending:
+            self._flush_timer.start()